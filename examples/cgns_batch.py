@@ -0,0 +1,138 @@
+import os
+import sys
+import json
+import time
+import argparse
+import typing as t
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from cgns_perf import (
+  read_mesh,
+  read_bin_file,
+  cached_nn_index_map,
+  extract_surface,
+  BinDirectory,
+)
+from shared_ring import SharedArray, SlotPool, imap_ordered, ring_slots, worker_state
+from spans import span
+from stress import PrincipalStressEngine
+
+# post-process a directory of .bin snapshots against one mesh: the mesh,
+# index map and surface are built once in this process, the index map and a
+# ring of output slots are shared with a process pool, and finished slots are
+# copied in snapshot order into a time-major (n_snapshots, n_values) .npy
+
+def _init_worker(idx_spec, point_ids_spec, ring_spec, ncol: int, component: str, dtype: str):
+  idx = SharedArray.attach(idx_spec)
+  n = len(idx.array)
+  worker_state.update(
+    idx=idx,
+    ring=SharedArray.attach(ring_spec),
+    point_ids=SharedArray.attach(point_ids_spec) if point_ids_spec is not None else None,
+    ncol=ncol,
+    engine=PrincipalStressEngine(component, dtype, workers=1),
+    values=np.empty((n, ncol), dtype="f8"),
+    scalars=np.empty(n, dtype=dtype),
+  )
+
+def _process_snapshot(slot: int, bin_path: str) -> int:
+  w = worker_state
+  data = read_bin_file(bin_path, w["ncol"])
+  assert data.shape == w["values"].shape, f"{bin_path}: {data.shape} != {w['values'].shape}"
+  np.take(data, w["idx"].array, axis=0, out=w["values"], mode="clip")
+  out = w["ring"].array[slot]
+  if w["point_ids"] is None:
+    w["engine"].compute(w["values"], out=out)
+  else:
+    w["engine"].compute(w["values"], out=w["scalars"])
+    np.take(w["scalars"], w["point_ids"].array, out=out, mode="clip")
+  return slot
+
+def run_batch(
+  mesh_path: str,
+  points_path: str,
+  snapshots: t.Sequence[str],
+  output_path: str,
+  ncol: int = 6,
+  component: str = "SEQV",
+  dtype: t.Any = np.float32,
+  surface: bool = False,
+  workers: int | None = None,
+  tol: float = 1e-6,
+) -> float:
+  """
+  writes `component` of every snapshot to output_path as a (n_snapshots, n)
+  .npy, n being the mesh points or with surface=True the surface vertices.
+  returns the throughput in snapshots per second.
+  """
+  workers = workers or os.cpu_count() or 1
+  dtype = np.dtype(dtype)
+
+  with span("batch_setup"):
+    mesh = read_mesh(mesh_path)
+    points = read_bin_file(points_path, 3)
+    idx, _ = cached_nn_index_map(points, mesh.points, tol, "exact")
+    point_ids = extract_surface(mesh).point_ids if surface else None
+
+  n_out = len(point_ids) if surface else mesh.n_points
+  store = np.lib.format.open_memmap(output_path, mode="w+", dtype=dtype, shape=(len(snapshots), n_out))
+  with open(f"{output_path}.json", "w") as f:
+    json.dump({"component": component, "surface": surface, "snapshots": list(snapshots)}, f, indent=2)
+
+  n_slots = ring_slots(workers)
+  shared_idx = SharedArray.from_array(np.ascontiguousarray(idx, dtype=np.intp))
+  shared_ids = SharedArray.from_array(point_ids) if surface else None
+  ring = SharedArray((n_slots, n_out), dtype)
+  try:
+    s = time.perf_counter()
+    initargs = (
+      shared_idx.spec(),
+      shared_ids.spec() if shared_ids else None,
+      ring.spec(),
+      ncol, component, dtype.str,
+    )
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=initargs) as pool:
+      slots = SlotPool(n_slots)
+      # written out in snapshot order, a slot is free again once copied
+      for k, slot in imap_ordered(pool, slots, _process_snapshot, [(path,) for path in snapshots]):
+        with span("batch_write", snapshot=k):
+          store[k] = ring.array[slot]
+        slots.release(slot)
+    store.flush()
+    elapsed = time.perf_counter() - s
+  finally:
+    for shared in (shared_idx, shared_ids, ring):
+      if shared is not None:
+        shared.close(unlink=True)
+
+  throughput = len(snapshots) / elapsed if elapsed > 0 else float("inf")
+  print(f"{len(snapshots)} snapshots in {elapsed:.2f} seconds, {throughput:.1f} snapshots/s")
+  return throughput
+
+def main(argv: t.List[str] | None = None) -> int:
+  parser = argparse.ArgumentParser(description="principal stress of many .bin snapshots against one mesh")
+  parser.add_argument("mesh", help="CGNS (or any pyvista readable) mesh")
+  parser.add_argument("points", help=".bin with the solver node coordinates, 3 columns")
+  parser.add_argument("snapshots", help="directory of .bin snapshots")
+  parser.add_argument("output", help="output .npy")
+  parser.add_argument("--ncol", type=int, default=6)
+  parser.add_argument("--component", default="SEQV")
+  parser.add_argument("--float64", action="store_true", help="store float64 instead of float32")
+  parser.add_argument("--surface", action="store_true", help="only keep the surface vertices")
+  parser.add_argument("--workers", type=int)
+  args = parser.parse_args(argv)
+
+  snapshots = BinDirectory(args.snapshots, args.ncol).paths
+  run_batch(
+    args.mesh, args.points, snapshots, args.output,
+    ncol=args.ncol,
+    component=args.component,
+    dtype=np.float64 if args.float64 else np.float32,
+    surface=args.surface,
+    workers=args.workers,
+  )
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
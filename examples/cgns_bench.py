@@ -0,0 +1,204 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import resource
+import tempfile
+import typing as t
+import numpy as np
+import pyvista as pv
+from cgns_perf import (
+  read_mesh,
+  read_bin_file,
+  write_bin_file,
+  nn_index_map,
+  extract_surface,
+  export_surface_buffers,
+  SurfaceCache,
+  SnapshotApplier,
+)
+from cgns_h5 import write_cgns_zone
+
+SIZES = {
+  "10k": 10_000,
+  "1M": 1_000_000,
+  "10M": 10_000_000,
+}
+
+def make_mesh(n_points: int, kind: str = "hex") -> pv.UnstructuredGrid:
+  """structured block of roughly n_points points as hexahedra, or split into tetrahedra"""
+  k = max(2, round(n_points ** (1/3)))
+  mesh = pv.ImageData(dimensions=(k, k, k), spacing=(1/(k-1),)*3).cast_to_unstructured_grid()
+  if kind == "tet":
+    mesh = mesh.triangulate()
+  elif kind != "hex":
+    raise ValueError(f"unknown mesh kind {kind!r}, expect 'hex' or 'tet'")
+  return mesh
+
+def make_case(data_dir: str, size: str, kind: str = "hex", seed: int = 0) -> t.Tuple[str, str]:
+  """
+  write the synthetic mesh as CGNS/HDF5, the format the pipeline reads, and a
+  snapshot holding its points in a shuffled (solver) order as .bin, reusing
+  files from earlier runs
+  """
+  os.makedirs(data_dir, exist_ok=True)
+  mesh_path = os.path.join(data_dir, f"{kind}_{size}.cgns")
+  bin_path = os.path.join(data_dir, f"{kind}_{size}.bin")
+  if not (os.path.exists(mesh_path) and os.path.exists(bin_path)):
+    mesh = make_mesh(SIZES[size], kind)
+    rng = np.random.default_rng(seed)
+    write_bin_file(bin_path, np.asarray(mesh.points)[rng.permutation(mesh.n_points)])
+    write_cgns_zone(mesh_path, mesh)
+  return mesh_path, bin_path
+
+def _reset_peak_rss():
+  # linux only, resets VmHWM so each stage reports its own peak
+  try:
+    with open("/proc/self/clear_refs", "w") as f:
+      f.write("5")
+  except OSError:
+    pass
+
+def _peak_rss_mb() -> float:
+  try:
+    with open("/proc/self/status") as f:
+      for line in f:
+        if line.startswith("VmHWM:"):
+          return int(line.split()[1]) / 1024
+  except OSError:
+    pass
+  # process lifetime peak, kilobytes on linux and bytes on macos
+  rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  return rss / (1 << 20) if sys.platform == "darwin" else rss / 1024
+
+def run_stage(fn: t.Callable[[], t.Any], repeat: int) -> t.Tuple[t.Any, t.Dict[str, float]]:
+  times = []
+  ret = None
+  _reset_peak_rss()
+  for _ in range(repeat):
+    s = time.perf_counter()
+    ret = fn()
+    times.append(time.perf_counter() - s)
+  stats = {
+    "median": float(np.median(times)),
+    "p95": float(np.percentile(times, 95)),
+    "min": float(np.min(times)),
+    "peak_rss_mb": _peak_rss_mb(),
+  }
+  return ret, stats
+
+def bench_case(mesh_path: str, bin_path: str, repeat: int, method: str = "exact") -> t.Dict[str, t.Any]:
+  stats: t.Dict[str, t.Dict[str, float]] = {}
+
+  def read():
+    mesh = read_mesh(mesh_path)
+    point_data = read_bin_file(bin_path, 3)
+    # fault the mapped pages in, otherwise this only times the header read
+    float(point_data.sum())
+    return mesh, point_data
+  (mesh, point_data), stats["read"] = run_stage(read, repeat)
+  points = np.asarray(mesh.points)
+
+  (idx, _), stats["index_map"] = run_stage(lambda: nn_index_map(point_data, points, 1e-6, method), repeat)
+
+  with tempfile.TemporaryDirectory() as cache_dir:
+    cache = SurfaceCache(cache_dir)
+    surface, stats["surface"] = run_stage(lambda: extract_surface(mesh, cache, rebuild=True), repeat)
+    _, stats["surface_cached"] = run_stage(lambda: extract_surface(mesh, cache), repeat)
+
+  _, stats["face_export"] = run_stage(lambda: export_surface_buffers(surface, points), repeat)
+
+  applier = SnapshotApplier(mesh, idx)
+  surface_scalars = np.empty(surface.n_points, dtype=applier.scalars.dtype)
+  def step():
+    applier.apply_file(bin_path)
+    surface.scatter(applier.scalars, out=surface_scalars)
+  _, stats["step"] = run_stage(step, repeat)
+
+  return {
+    "n_points": mesh.n_points,
+    "n_cells": mesh.n_cells,
+    "n_surface_points": surface.n_points,
+    "stages": stats,
+  }
+
+# stages faster than this are scheduler and timer noise, never flagged
+NOISE_FLOOR = 10e-3
+
+def compare(results: t.Dict[str, t.Any], baseline: t.Dict[str, t.Any], threshold: float) -> t.List[str]:
+  """
+  regressions over `threshold` (0.1 = 10% slower) against a stored run. both
+  the median and the best run must be slower, one noisy repeat moves the
+  median of a short run but not the min
+  """
+  regressions = []
+  for case, ret in results["cases"].items():
+    base_case = baseline.get("cases", {}).get(case)
+    if base_case is None:
+      print(f"{case}: not in baseline")
+      continue
+    for stage, cur in ret["stages"].items():
+      base = base_case["stages"].get(stage)
+      if base is None or base["median"] <= 0 or base["min"] <= 0:
+        continue
+      ratio = cur["median"] / base["median"]
+      min_ratio = cur["min"] / base["min"]
+      slow = ratio > 1 + threshold and min_ratio > 1 + threshold and cur["median"] > NOISE_FLOOR
+      flag = "REGRESSION" if slow else ""
+      print(f"{case:>12} {stage:>15} {base['median']:9.4f}s -> {cur['median']:9.4f}s {ratio:6.2f}x (min {min_ratio:5.2f}x) {flag}")
+      if flag:
+        regressions.append(f"{case}/{stage}")
+  return regressions
+
+def main(argv: t.List[str] | None = None) -> int:
+  parser = argparse.ArgumentParser(description="benchmark the CGNS + snapshot pipeline on synthetic meshes")
+  parser.add_argument("--sizes", nargs="+", default=["10k", "1M"], choices=list(SIZES))
+  parser.add_argument("--kinds", nargs="+", default=["hex", "tet"], choices=["hex", "tet"])
+  parser.add_argument("--repeat", type=int, default=5)
+  parser.add_argument("--method", default="exact", choices=["tree", "exact"])
+  parser.add_argument("--data-dir", default="./data/bench")
+  parser.add_argument("--output", help="write the results json here")
+  parser.add_argument("--baseline", help="compare against a results json from an earlier run")
+  parser.add_argument("--threshold", type=float, default=0.10)
+  args = parser.parse_args(argv)
+
+  results: t.Dict[str, t.Any] = {
+    "meta": {
+      "repeat": args.repeat,
+      "method": args.method,
+      "python": platform.python_version(),
+      "numpy": np.__version__,
+      "pyvista": pv.__version__,
+      "machine": platform.machine(),
+      "cpu_count": os.cpu_count(),
+    },
+    "cases": {},
+  }
+  for kind in args.kinds:
+    for size in args.sizes:
+      name = f"{kind}_{size}"
+      print(f"Benchmarking {name}")
+      mesh_path, bin_path = make_case(args.data_dir, size, kind)
+      results["cases"][name] = bench_case(mesh_path, bin_path, args.repeat, args.method)
+
+  out = json.dumps(results, indent=2)
+  if args.output:
+    with open(args.output, "w") as f:
+      f.write(out)
+  else:
+    print(out)
+
+  if args.baseline:
+    with open(args.baseline) as f:
+      baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+      print(f"{len(regressions)} regressions: {', '.join(regressions)}")
+      return 1
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
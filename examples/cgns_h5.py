@@ -0,0 +1,314 @@
+import h5py
+import numpy as np
+import pyvista as pv
+import vtk
+import typing as t
+from dataclasses import dataclass
+from vtk.util import numpy_support
+from spans import traced
+
+# CGNS/HDF5 reader that goes straight to the one zone we need instead of
+# letting vtkCGNSReader build every base, zone and BC block first.
+#
+# every CGNS node is an hdf5 group with "label"/"name"/"type" attributes and
+# its value in a " data" dataset (leading space), arrays in fortran order so
+# the dimensions show up reversed in h5py.
+
+# CGNS ElementType_t -> (nodes per element, dimension, vtk cell type)
+ELEMENT_TYPES: t.Dict[int, t.Tuple[int, int, int]] = {
+  2: (1, 0, vtk.VTK_VERTEX),                # NODE
+  3: (2, 1, vtk.VTK_LINE),                  # BAR_2
+  4: (3, 1, vtk.VTK_QUADRATIC_EDGE),        # BAR_3
+  5: (3, 2, vtk.VTK_TRIANGLE),              # TRI_3
+  6: (6, 2, vtk.VTK_QUADRATIC_TRIANGLE),    # TRI_6
+  7: (4, 2, vtk.VTK_QUAD),                  # QUAD_4
+  8: (8, 2, vtk.VTK_QUADRATIC_QUAD),        # QUAD_8
+  9: (9, 2, vtk.VTK_BIQUADRATIC_QUAD),      # QUAD_9
+  10: (4, 3, vtk.VTK_TETRA),                # TETRA_4
+  11: (10, 3, vtk.VTK_QUADRATIC_TETRA),     # TETRA_10
+  12: (5, 3, vtk.VTK_PYRAMID),              # PYRA_5
+  14: (6, 3, vtk.VTK_WEDGE),                # PENTA_6
+  17: (8, 3, vtk.VTK_HEXAHEDRON),           # HEXA_8
+  18: (20, 3, vtk.VTK_QUADRATIC_HEXAHEDRON), # HEXA_20
+}
+MIXED = 20
+# (dimension, vtk cell type) indexed by CGNS element type, for MIXED sections
+_TYPE_TABLE = np.zeros((max(ELEMENT_TYPES) + 1, 2), dtype=np.int64)
+for _code, (_npe, _dim, _vtk_type) in ELEMENT_TYPES.items():
+  _TYPE_TABLE[_code] = (_dim, _vtk_type)
+# node permutations where the CGNS and VTK orderings differ
+VTK_NODE_ORDER: t.Dict[int, np.ndarray] = {
+  # CGNS puts the vertical mid-edge nodes before the top ones
+  18: np.r_[0:12, 16:20, 12:16],
+}
+
+@dataclass
+class ZoneInfo:
+  base: str
+  name: str
+  zone_type: str
+  cell_dim: int
+  n_vertices: int
+  n_cells: int
+  # hdf5 path of the zone group
+  path: str
+
+def _attr(node: h5py.Group, key: str) -> str:
+  value = node.attrs.get(key, b"")
+  if isinstance(value, np.ndarray):
+    value = value.tobytes()
+  if isinstance(value, bytes):
+    value = value.split(b"\x00", 1)[0].decode("ascii", "replace")
+  return str(value).strip()
+
+def _children(node: h5py.Group, label: str) -> t.List[h5py.Group]:
+  return [
+    child for child in node.values()
+    if isinstance(child, h5py.Group) and _attr(child, "label") == label
+  ]
+
+def _string(node: h5py.Group) -> str:
+  return node[" data"][()].tobytes().decode("ascii", "replace").strip("\x00 ")
+
+def _zone_info(base: h5py.Group, zone: h5py.Group) -> ZoneInfo:
+  cell_dim = int(base[" data"][()].ravel()[0])
+  sizes = zone[" data"][()].ravel()
+  zone_types = _children(zone, "ZoneType_t")
+  zone_type = _string(zone_types[0]) if zone_types else "Unstructured"
+  n_vertices = n_cells = 0
+  if zone_type == "Unstructured":
+    n_vertices, n_cells = int(sizes[0]), int(sizes[1])
+  else:
+    # structured: vertex sizes then cell sizes per index dimension
+    dim = len(sizes) // 3
+    n_vertices, n_cells = int(np.prod(sizes[:dim])), int(np.prod(sizes[dim:2*dim]))
+  return ZoneInfo(_attr(base, "name") or base.name, _attr(zone, "name") or zone.name,
+                  zone_type, cell_dim, n_vertices, n_cells, zone.name)
+
+def list_zones(path: str) -> t.List[ZoneInfo]:
+  """bases and zones of a CGNS/HDF5 file, only the small header datasets are read"""
+  with h5py.File(path, "r") as f:
+    return [
+      _zone_info(base, zone)
+      for base in _children(f, "CGNSBase_t")
+      for zone in _children(base, "Zone_t")
+    ]
+
+def _select_zone(f: h5py.File, base: int | str, zone: int | str) -> t.Tuple[h5py.Group, h5py.Group]:
+  bases = _children(f, "CGNSBase_t")
+  b = bases[base] if isinstance(base, int) else next(g for g in bases if _attr(g, "name") == base)
+  zones = _children(b, "Zone_t")
+  z = zones[zone] if isinstance(zone, int) else next(g for g in zones if _attr(g, "name") == zone)
+  return b, z
+
+def _read_coordinates(zone: h5py.Group, n_vertices: int) -> np.ndarray:
+  grids = [g for g in _children(zone, "GridCoordinates_t") if _attr(g, "name") == "GridCoordinates"]
+  grid = grids[0] if grids else _children(zone, "GridCoordinates_t")[0]
+  points = np.zeros((n_vertices, 3), dtype=np.float64)
+  for i, axis in enumerate(("CoordinateX", "CoordinateY", "CoordinateZ")):
+    if axis in grid:
+      # read straight into the strided column, no temporary per axis
+      grid[axis][" data"].read_direct(points, dest_sel=np.s_[:, i])
+  return points
+
+def _mixed_section(conn: np.ndarray, start_offset: np.ndarray | None, n_elem: int):
+  """split a MIXED connectivity (type code before every element) into types, offsets and nodes"""
+  if start_offset is None:
+    # CGNS < 4 has no ElementStartOffset, the offsets need a sequential walk
+    start_offset = np.empty(n_elem + 1, dtype=np.int64)
+    pos = 0
+    for i in range(n_elem):
+      start_offset[i] = pos
+      code = int(conn[pos])
+      if code not in ELEMENT_TYPES:
+        raise NotImplementedError(f"unsupported CGNS element type {code} in MIXED section")
+      pos += 1 + ELEMENT_TYPES[code][0]
+    start_offset[n_elem] = pos
+  codes = conn[start_offset[:-1]]
+  keep = np.ones(len(conn), dtype=bool)
+  keep[start_offset[:-1]] = False
+  offsets = start_offset - np.arange(n_elem + 1)
+  return codes, offsets, conn[keep]
+
+def _read_sections(zone: h5py.Group, cell_dim: int, volume_only: bool):
+  """(vtk types, offsets, 0-based connectivity) of every selected Elements_t section"""
+  parts = []
+  # h5py lists groups alphabetically, cell ids follow the element ranges
+  sections = [(s["ElementRange"][" data"][()].ravel(), s) for s in _children(zone, "Elements_t")]
+  sections.sort(key=lambda item: int(item[0][0]))
+  for erange, section in sections:
+    code = int(section[" data"][()].ravel()[0])
+    n_elem = int(erange[1] - erange[0] + 1)
+    conn_node = section["ElementConnectivity"][" data"]
+
+    if code == MIXED:
+      offset_node = section.get("ElementStartOffset")
+      start_offset = offset_node[" data"][()].astype(np.int64) if offset_node is not None else None
+      conn = conn_node[()].astype(np.int64, copy=False)
+      codes, offsets, conn = _mixed_section(conn, start_offset, n_elem)
+      known = np.isin(codes, list(ELEMENT_TYPES))
+      if not known.all():
+        raise NotImplementedError(f"unsupported CGNS element type {codes[~known][0]} in MIXED section")
+      for c, order in VTK_NODE_ORDER.items():
+        sel = np.flatnonzero(codes == c)
+        if sel.size:
+          pos = offsets[sel][:, None] + np.arange(len(order))
+          conn[pos] = conn[pos[:, order]]
+      types = _TYPE_TABLE[codes, 1].astype(np.uint8)
+      if volume_only:
+        keep = _TYPE_TABLE[codes, 0] == cell_dim
+        if not keep.all():
+          sizes = np.diff(offsets)
+          conn = conn[np.repeat(keep, sizes)]
+          types = types[keep]
+          offsets = np.concatenate(([0], np.cumsum(sizes[keep])))
+      conn -= 1
+      parts.append((types, offsets, conn))
+      continue
+
+    if code not in ELEMENT_TYPES:
+      raise NotImplementedError(f"unsupported CGNS element type {code}")
+    npe, dim, vtk_type = ELEMENT_TYPES[code]
+    if volume_only and dim != cell_dim:
+      continue
+    conn = conn_node[()].astype(np.int64, copy=False)
+    assert conn.size == n_elem * npe, f"{section.name}: {conn.size} != {n_elem}*{npe}"
+    conn -= 1
+    if code in VTK_NODE_ORDER:
+      conn = conn.reshape(n_elem, npe)[:, VTK_NODE_ORDER[code]].ravel()
+    types = np.full(n_elem, vtk_type, dtype=np.uint8)
+    offsets = np.arange(0, (n_elem + 1) * npe, npe, dtype=np.int64)
+    parts.append((types, offsets, conn))
+  return parts
+
+def _concat_sections(parts):
+  if len(parts) == 1:
+    return parts[0]
+  types = np.concatenate([p[0] for p in parts])
+  conn = np.concatenate([p[2] for p in parts])
+  offsets = [np.zeros(1, dtype=np.int64)]
+  base = 0
+  for _, off, c in parts:
+    offsets.append(off[1:] + base)
+    base += len(c)
+  return types, np.concatenate(offsets), conn
+
+@traced()
+def read_cgns_zone(
+  path: str,
+  zone: int | str = 0,
+  base: int | str = 0,
+  volume_only: bool = True,
+) -> pv.UnstructuredGrid:
+  """
+  one unstructured zone of a CGNS/HDF5 file as a vtkUnstructuredGrid, built
+  from GridCoordinates and the Elements_t sections with zero-copy numpy_to_vtk.
+  volume_only keeps just the sections of the base's cell dimension, which is
+  what vtkCGNSReader puts in the zone's internal block.
+  polyhedral (NGON_n/NFACE_n) and the less common high-order sections raise
+  NotImplementedError.
+  """
+  with h5py.File(path, "r") as f:
+    b, z = _select_zone(f, base, zone)
+    info = _zone_info(b, z)
+    if info.zone_type != "Unstructured":
+      raise NotImplementedError(f"{info.path}: {info.zone_type} zones are not supported")
+    points = _read_coordinates(z, info.n_vertices)
+    parts = _read_sections(z, info.cell_dim, volume_only)
+  if not parts:
+    raise ValueError(f"{info.path}: no element sections of dimension {info.cell_dim}")
+  types, offsets, conn = _concat_sections(parts)
+
+  vtk_points = vtk.vtkPoints()
+  vtk_points.SetData(numpy_support.numpy_to_vtk(points, deep=False))
+  cells = vtk.vtkCellArray()
+  cells.SetData(
+    numpy_support.numpy_to_vtkIdTypeArray(offsets, deep=False),
+    numpy_support.numpy_to_vtkIdTypeArray(conn, deep=False),
+  )
+  vtk_types = numpy_support.numpy_to_vtk(types, deep=False, array_type=vtk.VTK_UNSIGNED_CHAR)
+
+  ugrid = vtk.vtkUnstructuredGrid()
+  ugrid.SetPoints(vtk_points)
+  ugrid.SetCells(vtk_types, cells)
+  return pv.wrap(ugrid)
+
+# writing: just enough of the CGNS/HDF5 layout for the reader above and for
+# vtkCGNSReader, used for synthetic test and benchmark meshes
+
+# vtk cell type -> CGNS ElementType_t
+CGNS_ELEMENT_TYPES: t.Dict[int, int] = {vtk_type: code for code, (_, _, vtk_type) in ELEMENT_TYPES.items()}
+# axis aligned vtk cells (what ImageData casts to) -> (vtk type, node order)
+_LATTICE_CELLS: t.Dict[int, t.Tuple[int, np.ndarray]] = {
+  vtk.VTK_PIXEL: (vtk.VTK_QUAD, np.array([0, 1, 3, 2])),
+  vtk.VTK_VOXEL: (vtk.VTK_HEXAHEDRON, np.array([0, 1, 3, 2, 4, 5, 7, 6])),
+}
+
+def _fixed(value: str, n: int) -> np.bytes_:
+  return np.bytes_(value.encode().ljust(n, b"\0"))
+
+def _write_node(parent: h5py.Group, name: str, label: str, data_type: str = "MT", data: np.ndarray | None = None) -> h5py.Group:
+  node = parent.create_group(name)
+  node.attrs.create("name", _fixed(name, 33), dtype="S33")
+  node.attrs.create("label", _fixed(label, 33), dtype="S33")
+  node.attrs.create("type", _fixed(data_type, 3), dtype="S3")
+  node.attrs.create("flags", np.array([1], dtype=np.int32))
+  if data is not None:
+    node.create_dataset(" data", data=data)
+  return node
+
+def _write_section(zone: h5py.Group, name: str, vtk_type: int, first: int, conn: np.ndarray) -> int:
+  """Elements_t section of the (n, nodes per cell) 0-based conn, returns the next element id"""
+  if vtk_type in _LATTICE_CELLS:
+    vtk_type, order = _LATTICE_CELLS[vtk_type]
+    conn = conn[:, order]
+  code = CGNS_ELEMENT_TYPES.get(vtk_type)
+  if code is None:
+    raise NotImplementedError(f"vtk cell type {vtk_type} has no CGNS element type")
+  if code in VTK_NODE_ORDER:
+    conn = conn[:, np.argsort(VTK_NODE_ORDER[code])]
+  section = _write_node(zone, name, "Elements_t", "I4", np.array([code, 0], dtype=np.int32))
+  _write_node(section, "ElementRange", "IndexRange_t", "I8", np.array([first, first + len(conn) - 1], dtype=np.int64))
+  _write_node(section, "ElementConnectivity", "DataArray_t", "I8", (conn + 1).ravel().astype(np.int64))
+  return first + len(conn)
+
+@traced()
+def write_cgns_zone(
+  path: str,
+  mesh: pv.UnstructuredGrid,
+  boundary: t.Sequence[t.Tuple[str, int, np.ndarray]] = (),
+):
+  """
+  write mesh as the one unstructured zone of a CGNS/HDF5 file, each run of
+  cells of one type as an Elements_t section. boundary adds (name, vtk cell
+  type, (n, nodes per cell) point ids) sections after the cells, vtkCGNSReader
+  shows them as patches.
+  """
+  types = np.asarray(mesh.celltypes)
+  offsets = np.asarray(mesh.cell_offsets)
+  conn = np.asarray(mesh.cell_connectivity, dtype=np.int64)
+  codes = [CGNS_ELEMENT_TYPES.get(_LATTICE_CELLS.get(v, (v,))[0]) for v in np.unique(types).tolist()]
+  if None in codes:
+    raise NotImplementedError(f"vtk cell types {np.unique(types).tolist()} include one without a CGNS element type")
+  cell_dim = max((ELEMENT_TYPES[code][1] for code in codes), default=3)
+  points = np.asarray(mesh.points, dtype=np.float64)
+  with h5py.File(path, "w") as f:
+    f.attrs.create("name", _fixed("HDF5 MotherNode", 33), dtype="S33")
+    f.attrs.create("label", _fixed("Root Node of HDF5 File", 33), dtype="S33")
+    f.attrs.create("type", _fixed("MT", 3), dtype="S3")
+    f.create_dataset(" format", data=np.frombuffer(b"IEEE_LITTLE_64\0", dtype=np.int8))
+    f.create_dataset(" hdf5version", data=np.frombuffer(_fixed("HDF5 Version 1.8.17", 33), dtype=np.int8))
+    _write_node(f, "CGNSLibraryVersion", "CGNSLibraryVersion_t", "R4", np.array([4.2], dtype=np.float32))
+    base = _write_node(f, "Base", "CGNSBase_t", "I4", np.array([cell_dim, 3], dtype=np.int32))
+    zone = _write_node(base, "Zone", "Zone_t", "I8", np.array([[len(points), mesh.n_cells, 0]], dtype=np.int64))
+    _write_node(zone, "ZoneType", "ZoneType_t", "C1", np.frombuffer(b"Unstructured", dtype=np.int8))
+    coords = _write_node(zone, "GridCoordinates", "GridCoordinates_t")
+    for i, axis in enumerate("XYZ"):
+      _write_node(coords, f"Coordinate{axis}", "DataArray_t", "R8", points[:, i].copy())
+    starts = np.r_[0, np.flatnonzero(np.diff(types)) + 1, len(types)]
+    first = 1
+    for k, (lo, hi) in enumerate(zip(starts[:-1], starts[1:])):
+      cells = conn[offsets[lo]:offsets[hi]].reshape(hi - lo, -1)
+      first = _write_section(zone, f"Elements{k + 1}", int(types[lo]), first, cells)
+    for name, vtk_type, cells in boundary:
+      first = _write_section(zone, name, int(vtk_type), first, np.asarray(cells, dtype=np.int64))
@@ -0,0 +1,202 @@
+import threading
+import typing as t
+from collections import OrderedDict
+from dataclasses import dataclass
+import numpy as np
+
+# fields computed from other fields of a frame (velocity magnitude, unit
+# vectors, ...) declared once and evaluated on demand:
+#
+#   fields = DerivedFields()
+#   fields.stack("Velocity", ("SV_U", "SV_V", 0.0))
+#   fields.magnitude("VelocityMag", ("SV_U", "SV_V"))
+#   mag = fields.get(frame_idx, "VelocityMag", lambda name: cell_arrays[name])
+#
+# results are computed with in-place ufuncs into buffers owned by the
+# registry and memoized per (frame, field), so looping over frames already
+# seen costs a dict lookup. evicted buffers are reused for the next results,
+# an array returned by get() is only valid until a later get() evicts it.
+
+# an input is a field name or a constant, e.g. the missing w of a 2D case
+Input = t.Union[str, float]
+Source = t.Callable[[str], np.ndarray]
+
+@dataclass
+class DerivedField:
+  name: str
+  inputs: t.Tuple[Input, ...]
+  # 1 for scalars, vectors have shape (n, n_component)
+  n_component: int
+  # compute(arrays, out, scratch): arrays are the resolved inputs, constants
+  # stay floats. scratch(shape) hands out a temporary of the output dtype
+  compute: t.Callable[[t.List[np.ndarray | float], np.ndarray, t.Callable[..., np.ndarray]], None]
+
+def _sum_of_squares(arrays, out, scratch):
+  if len(arrays) == 1 and np.ndim(arrays[0]) == 2:
+    # one (n, k) vector field
+    v = arrays[0]
+    np.einsum("ij,ij->i", v, v, out=out)
+    return
+  np.multiply(arrays[0], arrays[0], out=out)
+  tmp = scratch(out.shape)
+  for a in arrays[1:]:
+    if np.isscalar(a):
+      out += a * a
+      continue
+    np.multiply(a, a, out=tmp)
+    np.add(out, tmp, out=out)
+
+def _magnitude(arrays, out, scratch):
+  _sum_of_squares(arrays, out, scratch)
+  np.sqrt(out, out=out)
+
+def _stack(arrays, out, scratch):
+  for i, a in enumerate(arrays):
+    out[:, i] = a
+
+def _normalized(arrays, out, scratch):
+  if len(arrays) == 1:
+    out[...] = arrays[0]
+  else:
+    _stack(arrays, out, scratch)
+  mag = scratch(out.shape[:1])
+  np.einsum("ij,ij->i", out, out, out=mag)
+  np.sqrt(mag, out=mag)
+  # zero vectors stay zero instead of turning into nan
+  np.divide(out, mag[:, None], out=out, where=mag[:, None] > 0)
+
+class DerivedFields:
+  """
+  registry of derived fields plus the per (frame, field) memo. budget_bytes
+  bounds the memoized results, least recently used go first.
+  """
+  def __init__(self, budget_bytes: int = 256 << 20, dtype: t.Any = None):
+    self.fields: t.Dict[str, DerivedField] = {}
+    self.budget_bytes = budget_bytes
+    # None: result type of the inputs
+    self.dtype = None if dtype is None else np.dtype(dtype)
+    self.hits = 0
+    self.misses = 0
+    self._memo: "OrderedDict[t.Tuple[t.Hashable, str], np.ndarray]" = OrderedDict()
+    self._nbytes = 0
+    # evicted buffers by (shape, dtype), reused before allocating
+    self._free: t.Dict[t.Tuple[t.Tuple[int, ...], np.dtype], t.List[np.ndarray]] = {}
+    self._scratch: t.Dict[t.Tuple[t.Tuple[int, ...], np.dtype], np.ndarray] = {}
+    # nesting of get() calls, derived inputs of a field must survive until it is computed
+    self._depth = 0
+    self._lock = threading.RLock()
+
+  def register(self, field: DerivedField) -> DerivedField:
+    if field.name in field.inputs:
+      raise ValueError(f"{field.name}: derived field depends on itself")
+    self.fields[field.name] = field
+    # results computed with the old definition are stale
+    self.invalidate(name=field.name)
+    return field
+
+  def magnitude(self, name: str, inputs: t.Sequence[Input]) -> DerivedField:
+    """euclidean norm of scalar components, or of one (n, k) vector field"""
+    return self.register(DerivedField(name, tuple(inputs), 1, _magnitude))
+
+  def stack(self, name: str, inputs: t.Sequence[Input]) -> DerivedField:
+    """(n, len(inputs)) vector field from scalar components"""
+    return self.register(DerivedField(name, tuple(inputs), len(inputs), _stack))
+
+  def normalized(self, name: str, inputs: t.Sequence[Input], n_component: int | None = None) -> DerivedField:
+    """unit vectors from scalar components, or from one vector field with n_component components"""
+    inputs = tuple(inputs)
+    if len(inputs) == 1 and n_component is None:
+      raise ValueError(f"{name}: n_component is needed to normalize a vector field")
+    return self.register(DerivedField(name, inputs, n_component or len(inputs), _normalized))
+
+  def expression(
+    self,
+    name: str,
+    inputs: t.Sequence[Input],
+    fn: t.Callable[..., t.Any],
+    n_component: int = 1,
+  ) -> DerivedField:
+    """
+    fn(*arrays, out=out) writes the field into out, typically a ufunc or a
+    chain of them, e.g. expression("Speed2D", ("SV_U", "SV_V"), np.hypot)
+    """
+    def compute(arrays, out, scratch):
+      fn(*arrays, out=out)
+    return self.register(DerivedField(name, tuple(inputs), n_component, compute))
+
+  def __contains__(self, name: str) -> bool:
+    return name in self.fields
+
+  def get(self, frame: t.Hashable, name: str, source: Source) -> np.ndarray:
+    """
+    the derived field `name` of `frame`, source(field) returns the frame's
+    base arrays. frame is any hashable key, e.g. the frame index
+    """
+    key = (frame, name)
+    with self._lock:
+      ret = self._memo.get(key)
+      if ret is not None:
+        self._memo.move_to_end(key)
+        self.hits += 1
+        return ret
+      self.misses += 1
+      field = self.fields[name]
+      self._depth += 1
+      try:
+        arrays = [self._resolve(frame, a, source) for a in field.inputs]
+        n = next((len(a) for a in arrays if not np.isscalar(a)), None)
+        if n is None:
+          raise ValueError(f"{name}: needs at least one array input")
+        dtype = self.dtype or np.result_type(*[a for a in arrays if not np.isscalar(a)])
+        shape = (n,) if field.n_component == 1 else (n, field.n_component)
+        out = self._alloc(shape, dtype)
+        field.compute(arrays, out, lambda s: self._scratch_buffer(s, dtype))
+      finally:
+        self._depth -= 1
+      self._memo[key] = out
+      self._nbytes += out.nbytes
+      if self._depth == 0:
+        self._evict(keep=key)
+      return out
+
+  def _resolve(self, frame: t.Hashable, value: Input, source: Source) -> np.ndarray | float:
+    if not isinstance(value, str):
+      return float(value)
+    if value in self.fields:
+      return self.get(frame, value, source)
+    return np.asarray(source(value))
+
+  def _alloc(self, shape: t.Tuple[int, ...], dtype: np.dtype) -> np.ndarray:
+    free = self._free.get((shape, np.dtype(dtype)))
+    if free:
+      return free.pop()
+    return np.empty(shape, dtype=dtype)
+
+  def _scratch_buffer(self, shape: t.Tuple[int, ...], dtype: np.dtype) -> np.ndarray:
+    key = (tuple(shape), np.dtype(dtype))
+    buf = self._scratch.get(key)
+    if buf is None:
+      buf = self._scratch[key] = np.empty(shape, dtype=dtype)
+    return buf
+
+  def _evict(self, keep: t.Tuple[t.Hashable, str]):
+    while self._nbytes > self.budget_bytes and len(self._memo) > 1:
+      victim = next(iter(self._memo))
+      if victim == keep:
+        break
+      buf = self._memo.pop(victim)
+      self._nbytes -= buf.nbytes
+      self._free.setdefault((buf.shape, buf.dtype), []).append(buf)
+
+  def invalidate(self, frame: t.Hashable | None = None, name: str | None = None):
+    """drop memoized results of a frame, of a field, or everything"""
+    with self._lock:
+      for key in list(self._memo):
+        if (frame is None or key[0] == frame) and (name is None or key[1] == name):
+          buf = self._memo.pop(key)
+          self._nbytes -= buf.nbytes
+          self._free.setdefault((buf.shape, buf.dtype), []).append(buf)
+
+  @property
+  def nbytes(self) -> int:
+    return self._nbytes
@@ -1,66 +1,37 @@
 import pyvista as pv
 import numpy as np
-import h5py
 import glob
 import typing as t
-from dataclasses import dataclass
+from fluent_io import FluentData, ScatterPlan, load_dat_file
+from derived import DerivedFields
+from fluent_case import read_case
 
-@dataclass
-class FluentData:
-  mtime:float
-  phase_count:int
-  cells:t.List[t.Dict[str, np.ndarray]] # multiple phases
-  faces:t.List[t.Dict[str, np.ndarray]] # multiple phases
-
-# load CFD Fluent .dat.h5 file
-def load_dat_file(dat_filename:str) -> FluentData:
-  ret: FluentData = FluentData(mtime=0, phase_count=0, cells=[], faces=[])
-  with h5py.File(dat_filename, "r") as f:
-    keys = list(f.keys())
-    assert "results" in keys, f"'results' group not found in {dat_filename}"
-    assert "settings" in keys, f"'settings' group not found in {dat_filename}"
-    results = f["results"]
-    settings = f["settings"]
-    data = results["1"] 
-    for phase_key in data.keys():
-      ret.phase_count += 1
-      phase = data[phase_key]
-      cells = phase["cells"]
-      faces = phase["faces"]
-      cell_data = {}
-      for key, value in cells.items():
-        values = value
-        if isinstance(value, h5py.Dataset):
-          values = np.array(value)
-        if isinstance(value, h5py.Group):
-          values = np.array(value["1"])
-        cell_data[key] = values
-      face_data = {}
-      for key, value in faces.items():
-        values = value
-        if isinstance(value, h5py.Dataset):
-          values = np.array(value)
-        if isinstance(value, h5py.Group):
-          values = np.array(value["1"])
-        face_data[key] = values
-      ret.cells.append(cell_data)
-      ret.faces.append(face_data)
-
-    # mtime = f.attrs.get("mtime", 0)
-    # data = {key: np.array(value) for key, value in f.items()}
-  return ret
+# put the cell fields of a .dat.h5 on mesh, every section at its minId/maxId
+# cells through one ScatterPlan, so multi-zone cases land on the right cells
+def attach_cell_data(
+  mesh:pv.DataSet,
+  dat_filename:str,
+  fields:t.Collection[str] | None = None,
+  dtype:t.Any = None,
+) -> FluentData:
+  dat = load_dat_file(dat_filename, fields, dtype, lazy=False)
+  plan = ScatterPlan.from_frame(dat, mesh.n_cells)
+  for name, arr in dat.cell_data.items():
+    mesh.cell_data[name] = plan.assemble(arr, arr.sections[0].array.dtype)
+  return dat
 
 def main():
   # read case file, optionaly with a data file if there is a *.dat.h5
   filename = "./data/Fluent-result/FFF-5.cas.h5" 
   # filename = "./data/3D-Pipe/FFF.1-1.cas.h5" 
-  reader = pv.get_reader(filename)
-  blocks = reader.read()
-  mesh = blocks[0]
+  # topology from the <case>.topology.npz sidecar after the first run
+  mesh = read_case(filename)
+  # the case's own data file, the fields pv.get_reader used to attach
+  attach_cell_data(mesh, filename.replace(".cas.h5", ".dat.h5"), fields=("SV_U", "SV_V", "SV_P"))
 
   # load dat files
   dat_files = sorted(glob.glob("./data/Fluent-result/FFF*.dat.h5"))
-  dats = [load_dat_file(f) for f in dat_files]
+  dats = [load_dat_file(f, fields=("SV_U", "SV_V", "SV_P")) for f in dat_files]
   
   # create an interactive plotter
   plotter = pv.Plotter()
@@ -72,22 +43,16 @@ def main():
   #   print(f"Cell Data Array: {key}, dtype={array.dtype}, shape={array.shape}, values={array[:10]}...")
 
   # merge u,v,w
-  sv_u = mesh.cell_data["SV_U"]
-  sv_v = mesh.cell_data["SV_V"]
   # construct the w component as the mesh z coordinate
-  z = mesh.points[0][2]
-  sv_w = np.full_like(sv_u, z)
-  # sv_w = mesh.cell_data["SV_W"]
-  # vel = np.stack((sv_u, sv_v, sv_w), axis=-1)
-  vel = np.stack((sv_u, sv_v, sv_w), axis=-1)
-  vel_mag = np.linalg.norm(vel, axis=-1)
-  vel /= np.expand_dims(vel_mag, axis=-1)
-  vel_inverted = -1 * vel.copy()
+  z = float(mesh.points[0][2])
+  derived = DerivedFields()
+  derived.normalized("Velocity", ("SV_U", "SV_V", z))
+  derived.expression("Velocity_Inverted", ("Velocity",), np.negative, n_component=3)
+  derived.magnitude("Velocity_Mag", ("SV_U", "SV_V", z))
 
   # assign velocity vector to the mesh
-  mesh.cell_data["Velocity"] = vel
-  mesh.cell_data["Velocity_Inverted"] = vel_inverted
-  mesh.cell_data["Velocity_Mag"] = vel_mag
+  for name in ("Velocity", "Velocity_Inverted", "Velocity_Mag"):
+    mesh.cell_data[name] = derived.get(0, name, mesh.cell_data.__getitem__)
 
   # add mesh with the first available scalar field
   # first_scalar = next(iter(mesh.cell_data.keys()), None)
@@ -0,0 +1,318 @@
+import os
+import sys
+import time
+import typing as t
+import h5py
+import numpy as np
+import pyvista as pv
+import vtk
+from vtk.util import numpy_support
+from spans import span, traced
+
+# Fluent .cas.h5 mesh reader working on the /meshes/1 arrays directly instead
+# of vtkFLUENTCFFReader's per cell loops:
+#
+#   nodes/coords/<k>        (n_nodes, dim) coordinates, sections by minId/maxId
+#   faces/nodes/<k>         nnodes per face + the flat node list, 1-based
+#   faces/c0, faces/c1      cells on either side of each face, c1 only on interior faces
+#   cells/ctype/<k>         elementType attr, or per cell cell-types when it is 0 (mixed)
+#
+# face nodes follow the right-hand rule with the normal pointing into c0, so
+# reversing the faces seen from c1 makes every face of a cell point inwards and
+# the cell's vtk node order falls out of face 0 and its neighbours.
+#
+# cells only come as faces, rebuilding their connectivity is most of the read.
+# the result is kept in a sidecar <case>.topology.npz and reused while the case
+# file's mtime and size are unchanged, only the coordinates are read again.
+
+TOPOLOGY_SUFFIX = ".topology.npz"
+TOPOLOGY_VERSION = 1
+
+# Fluent element type -> (faces per cell, vtk cell type)
+CELL_TYPES: t.Dict[int, t.Tuple[int, int]] = {
+  1: (3, vtk.VTK_TRIANGLE),
+  2: (4, vtk.VTK_TETRA),
+  3: (4, vtk.VTK_QUAD),
+  4: (6, vtk.VTK_HEXAHEDRON),
+  5: (5, vtk.VTK_PYRAMID),
+  6: (5, vtk.VTK_WEDGE),
+}
+MIXED = 0
+POLYHEDRON = 7
+# faces of the supported cells have at most 4 nodes
+MAX_FACE_NODES = 4
+
+def _sections(group: h5py.Group) -> t.List[t.Tuple[int, int, h5py.Group | h5py.Dataset]]:
+  """(0-based start, stop, node) of the numbered sections of a group, in id order"""
+  ret = []
+  for name, node in group.items():
+    if not name.isdigit():
+      continue
+    ret.append((int(node.attrs["minId"][0]) - 1, int(node.attrs["maxId"][0]), node))
+  ret.sort(key=lambda s: s[0])
+  return ret
+
+def _read_points(mesh: h5py.Group) -> np.ndarray:
+  n_nodes = int(mesh.attrs["nodeCount"][0])
+  points = np.zeros((n_nodes, 3), dtype=np.float64)
+  for start, stop, dset in _sections(mesh["nodes/coords"]):
+    dim = dset.shape[1]
+    # 2D cases have no z, it stays 0
+    dset.read_direct(points, dest_sel=np.s_[start:stop, :dim])
+  return points
+
+def _read_faces(mesh: h5py.Group, n_faces: int):
+  """(n_faces, MAX_FACE_NODES) 0-based face nodes padded with -1, nodes per face, c0, c1 (0-based, -1 none)"""
+  nnodes = np.zeros(n_faces, dtype=np.int64)
+  faces = np.full((n_faces, MAX_FACE_NODES), -1, dtype=np.int64)
+  for start, stop, group in _sections(mesh["faces/nodes"]):
+    counts = group["nnodes"][()].astype(np.int64)
+    if counts.max(initial=0) > MAX_FACE_NODES:
+      raise NotImplementedError(f"{group.name}: faces with {counts.max()} nodes, polyhedral meshes are not supported")
+    nodes = group["nodes"][()].astype(np.int64) - 1
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    k = np.arange(MAX_FACE_NODES)
+    used = k < counts[:, None]
+    # [offset + k] for the used slots of each face
+    faces[start:stop][used] = nodes[(offsets[:, None] + k)[used]]
+    nnodes[start:stop] = counts
+  cells = []
+  for side in ("c0", "c1"):
+    c = np.full(n_faces, -1, dtype=np.int64)
+    for start, stop, dset in _sections(mesh[f"faces/{side}"]):
+      c[start:stop] = dset[()].astype(np.int64) - 1
+    cells.append(c)
+  return faces, nnodes, cells[0], cells[1]
+
+def _read_cell_types(mesh: h5py.Group, n_cells: int) -> np.ndarray:
+  ctype = np.full(n_cells, -1, dtype=np.int64)
+  for start, stop, group in _sections(mesh["cells/ctype"]):
+    element_type = int(group.attrs["elementType"][0])
+    if element_type == MIXED:
+      ctype[start:stop] = group["cell-types"][()]
+    else:
+      ctype[start:stop] = element_type
+  return ctype
+
+def _oriented_faces(faces: np.ndarray, nnodes: np.ndarray, c0: np.ndarray, c1: np.ndarray, n_cells: int):
+  """
+  cell -> faces in CSR form: (starts, counts, face nodes, nodes per face) with
+  every face's nodes ordered so its normal points into the cell
+  """
+  interior = np.flatnonzero(c1 >= 0)
+  cell = np.concatenate((c0, c1[interior]))
+  face = np.concatenate((np.arange(len(c0)), interior))
+  flip = np.concatenate((np.zeros(len(c0), dtype=bool), np.ones(len(interior), dtype=bool)))
+  if cell.min(initial=0) < 0:
+    raise ValueError(f"{np.count_nonzero(c0 < 0)} faces without a c0 cell")
+  order = np.argsort(cell, kind="stable")
+  face, flip = face[order], flip[order]
+  counts = np.bincount(cell, minlength=n_cells)
+  starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+  n = nnodes[face]
+  nodes = faces[face]
+  # seen from c1: reverse the used slots, node k of n becomes node n-1-k
+  flipped = np.flatnonzero(flip)
+  fn = n[flipped, None]
+  k = np.arange(MAX_FACE_NODES)
+  src = np.where(k < fn, fn - 1 - k, k)
+  nodes[flipped] = np.take_along_axis(nodes[flipped], src, axis=1)
+  return starts, counts, nodes, n
+
+def _not_in(values: np.ndarray, sets: np.ndarray) -> np.ndarray:
+  """(m, k) mask of values[i, j] not in sets[i]"""
+  return ~(values[:, :, None] == sets[:, None, :]).any(-1)
+
+def _first(mask: np.ndarray) -> np.ndarray:
+  """column of the first True per row, every row must have one"""
+  if not mask.any(1).all():
+    raise ValueError("inconsistent cell faces")
+  return mask.argmax(1)
+
+def _partners(base: np.ndarray, top: np.ndarray, nodes: np.ndarray, n: np.ndarray) -> np.ndarray:
+  """top node joined by an edge to each base node, from the edges of the cells' faces"""
+  m = len(base)
+  k = np.arange(MAX_FACE_NODES)
+  nxt = np.where(k + 1 < n[..., None], k + 1, 0)
+  valid = k < n[..., None]
+  u = nodes
+  v = np.take_along_axis(nodes, nxt, axis=-1)
+  # both directions, faces run either way around a shared edge
+  u = np.where(valid, u, -1).reshape(m, -1)
+  v = np.where(valid, v, -1).reshape(m, -1)
+  u, v = np.concatenate((u, v), 1), np.concatenate((v, u), 1)
+  v_in_top = ~_not_in(v, top)
+  ret = np.empty_like(base)
+  rows = np.arange(m)
+  for j in range(base.shape[1]):
+    col = _first((u == base[:, j:j + 1]) & v_in_top)
+    ret[:, j] = v[rows, col]
+  return ret
+
+def _cell_nodes(element_type: int, nodes: np.ndarray, n: np.ndarray) -> np.ndarray:
+  """
+  (m, nodes per cell) vtk ordered nodes of m cells of one type from their
+  (m, n_faces, MAX_FACE_NODES) inward oriented faces and nodes per face
+  """
+  m = len(nodes)
+  rows = np.arange(m)
+  if element_type in (1, 3):
+    # 2D: inward edges run counter-clockwise around the cell
+    a, b = nodes[:, 0, 0], nodes[:, 0, 1]
+    ab = np.stack((a, b), 1)
+    if element_type == 1:
+      other = nodes[:, 1, :2]
+      c = other[rows, _first(_not_in(other, ab))]
+      return np.stack((a, b, c), 1)
+    edges = nodes[:, 1:, :2]
+    # the edge sharing no node with a-b, it runs c -> d
+    disjoint = _not_in(edges.reshape(m, -1), ab).reshape(m, 3, 2).all(-1)
+    cd = edges[rows, _first(disjoint)]
+    return np.concatenate((ab, cd), 1)
+
+  if element_type == 2:
+    # base normal points at the fourth node
+    abc = nodes[:, 0, :3]
+    other = nodes[:, 1, :3]
+    d = other[rows, _first(_not_in(other, abc))]
+    return np.concatenate((abc, d[:, None]), 1)
+
+  if element_type == 5:
+    base = nodes[rows, _first(n == 4), :4]
+    tri = nodes[rows, _first(n == 3), :3]
+    apex = tri[rows, _first(_not_in(tri, base))]
+    return np.concatenate((base, apex[:, None]), 1)
+
+  if element_type == 4:
+    base = nodes[:, 0, :4]
+    quads = nodes[:, 1:, :4]
+    disjoint = _not_in(quads.reshape(m, -1), base).reshape(m, 5, 4).all(-1)
+    top = quads[rows, _first(disjoint)]
+    return np.concatenate((base, _partners(base, top, nodes, n)), 1)
+
+  if element_type == 6:
+    first = _first(n == 3)
+    second = _first((n == 3) & (np.arange(n.shape[1]) != first[:, None]))
+    # like the hexahedron, the base normal points at the other triangle
+    base = nodes[rows, first, :3]
+    top = nodes[rows, second, :3]
+    return np.concatenate((base, _partners(base, top, nodes, n)), 1)
+
+  raise NotImplementedError(f"unsupported Fluent element type {element_type}")
+
+def _build_topology(mesh: h5py.Group) -> t.Dict[str, np.ndarray]:
+  """vtk cell types, offsets and 0-based connectivity of every cell, in cell id order"""
+  n_cells = int(mesh.attrs["cellCount"][0])
+  n_faces = int(mesh.attrs["faceCount"][0])
+  with span("case_read_faces"):
+    faces, nnodes, c0, c1 = _read_faces(mesh, n_faces)
+    ctype = _read_cell_types(mesh, n_cells)
+  unknown = np.setdiff1d(np.unique(ctype), list(CELL_TYPES))
+  if unknown.size:
+    what = "polyhedral" if POLYHEDRON in unknown else f"element type {unknown[0]}"
+    raise NotImplementedError(f"{mesh.name}: {what} cells are not supported")
+
+  starts, counts, nodes, n = _oriented_faces(faces, nnodes, c0, c1, n_cells)
+  types = np.empty(n_cells, dtype=np.uint8)
+  sizes = np.empty(n_cells, dtype=np.int64)
+  cell_nodes: t.Dict[int, np.ndarray] = {}
+  with span("case_cell_nodes"):
+    for element_type, (n_cell_faces, vtk_type) in CELL_TYPES.items():
+      cells = np.flatnonzero(ctype == element_type)
+      if not cells.size:
+        continue
+      bad = counts[cells] != n_cell_faces
+      if bad.any():
+        raise ValueError(f"{mesh.name}: cell {cells[bad][0] + 1} has {counts[cells[bad][0]]} faces, expected {n_cell_faces}")
+      entries = starts[cells, None] + np.arange(n_cell_faces)
+      conn = _cell_nodes(element_type, nodes[entries], n[entries])
+      cell_nodes[element_type] = conn
+      types[cells] = vtk_type
+      sizes[cells] = conn.shape[1]
+
+  offsets = np.zeros(n_cells + 1, dtype=np.int64)
+  np.cumsum(sizes, out=offsets[1:])
+  connectivity = np.empty(offsets[-1], dtype=np.int64)
+  for element_type, conn in cell_nodes.items():
+    cells = np.flatnonzero(ctype == element_type)
+    connectivity[(offsets[cells, None] + np.arange(conn.shape[1])).ravel()] = conn.ravel()
+  return {"types": types, "offsets": offsets, "connectivity": connectivity}
+
+def topology_path(case_file: str) -> str:
+  return f"{case_file}{TOPOLOGY_SUFFIX}"
+
+def _case_key(case_file: str) -> np.ndarray:
+  st = os.stat(case_file)
+  return np.array([TOPOLOGY_VERSION, st.st_mtime_ns, st.st_size], dtype=np.int64)
+
+def _load_topology(path: str, key: np.ndarray) -> t.Dict[str, np.ndarray] | None:
+  try:
+    with np.load(path) as f:
+      if not np.array_equal(f["key"], key):
+        return None
+      return {name: f[name] for name in ("types", "offsets", "connectivity")}
+  except (OSError, KeyError, ValueError):
+    return None
+
+def _write_topology(path: str, key: np.ndarray, topology: t.Dict[str, np.ndarray]):
+  # np.savez appends .npz to names without it
+  tmp = f"{path}.tmp.npz"
+  try:
+    np.savez(tmp, key=key, **topology)
+    os.replace(tmp, path)
+  except OSError:
+    # read-only case directory, the next open rebuilds
+    if os.path.exists(tmp):
+      os.remove(tmp)
+
+@traced()
+def read_case(case_file: str, cache: bool = True, rebuild: bool = False) -> pv.UnstructuredGrid:
+  """
+  the mesh of a .cas.h5 as one vtkUnstructuredGrid, cells in Fluent cell id
+  order so cell arrays of the .dat.h5 files line up with it. the topology is
+  read from the sidecar cache when it is current (cache=True), rebuild=True
+  ignores it. polyhedral meshes raise NotImplementedError.
+  """
+  key = _case_key(case_file)
+  topology = None
+  if cache and not rebuild:
+    topology = _load_topology(topology_path(case_file), key)
+  with h5py.File(case_file, "r") as f:
+    mesh = f["meshes/1"]
+    points = _read_points(mesh)
+    if topology is None:
+      topology = _build_topology(mesh)
+      if cache:
+        _write_topology(topology_path(case_file), key, topology)
+
+  vtk_points = vtk.vtkPoints()
+  vtk_points.SetData(numpy_support.numpy_to_vtk(points, deep=False))
+  cells = vtk.vtkCellArray()
+  cells.SetData(
+    numpy_support.numpy_to_vtkIdTypeArray(topology["offsets"], deep=False),
+    numpy_support.numpy_to_vtkIdTypeArray(topology["connectivity"], deep=False),
+  )
+  vtk_types = numpy_support.numpy_to_vtk(topology["types"], deep=False, array_type=vtk.VTK_UNSIGNED_CHAR)
+
+  ugrid = vtk.vtkUnstructuredGrid()
+  ugrid.SetPoints(vtk_points)
+  ugrid.SetCells(vtk_types, cells)
+  return pv.wrap(ugrid)
+
+def main(argv: t.List[str] | None = None) -> int:
+  argv = sys.argv[1:] if argv is None else argv
+  case_file = argv[0] if argv else "./data/Fluent-result/FFF-5.cas.h5"
+  s = time.perf_counter()
+  mesh = read_case(case_file, rebuild=True)
+  built = time.perf_counter() - s
+  s = time.perf_counter()
+  read_case(case_file)
+  cached = time.perf_counter() - s
+  print(mesh)
+  print(f"topology built in {built*1000:.1f} ms, from {os.path.basename(topology_path(case_file))} in {cached*1000:.1f} ms")
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
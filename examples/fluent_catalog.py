@@ -0,0 +1,158 @@
+import os
+import sys
+import json
+import glob
+import bisect
+import typing as t
+from dataclasses import dataclass, asdict
+import h5py
+import numpy as np
+import sexpdata
+
+# frame catalog of a Fluent project: step, flow time and cell fields of every
+# .dat.h5, read from the /settings s-expressions and the results headers once
+# and kept in a small json index next to the files. an entry is reused while
+# the file's mtime and size are unchanged, so reopening a long series costs a
+# stat per file instead of an hdf5 open and an s-expression parse.
+
+CATALOG_NAME = "catalog.json"
+CATALOG_VERSION = 1
+
+@dataclass
+class CatalogEntry:
+  # relative to the project directory in the index, absolute once loaded
+  path: str
+  step: int
+  flow_time: float
+  # array names as load_dat_file reports them, phase prefixed past phase 1
+  fields: t.List[str]
+  mtime_ns: int
+  size: int
+
+def phase_array_name(name: str, iphase: int) -> str:
+  """array name of field `name` of the 1-based phase iphase"""
+  return name if iphase == 1 else f"phase_{iphase-1}-{name}"
+
+def _sexp_value(value: t.Any) -> t.Any:
+  if isinstance(value, sexpdata.Symbol):
+    return str(value)
+  if isinstance(value, list):
+    return [_sexp_value(v) for v in value]
+  return value
+
+def data_variables(f: h5py.File) -> t.Dict[str, t.Any]:
+  """/settings/Data Variables of an open .dat.h5 as {name: value}, e.g. flow-time, time-step"""
+  raw = f["/settings/Data Variables"][0]
+  # (version ((name value) (name value) ...))
+  packed = sexpdata.loads(raw.decode("ascii"))
+  ret: t.Dict[str, t.Any] = {}
+  for item in packed[1]:
+    if isinstance(item, list) and item and isinstance(item[0], sexpdata.Symbol):
+      ret[str(item[0])] = _sexp_value(item[1] if len(item) == 2 else item[1:])
+  return ret
+
+def cell_fields(f: h5py.File) -> t.List[str]:
+  """cell array names of every phase from the results' field lists, no data is read"""
+  ret = []
+  iphase = 1
+  phase = f.get(f"/results/1/phase-{iphase}", None)
+  while phase:
+    cells = phase.get("cells", None)
+    if cells is not None and "fields" in cells:
+      names = cells["fields"][()][0].decode().split(";")
+      ret.extend(phase_array_name(n, iphase) for n in names if n and n in cells)
+    iphase += 1
+    phase = f.get(f"/results/1/phase-{iphase}", None)
+  return ret
+
+def read_entry(path: str) -> CatalogEntry:
+  st = os.stat(path)
+  with h5py.File(path, "r") as f:
+    variables = data_variables(f)
+    fields = cell_fields(f)
+  return CatalogEntry(
+    path=path,
+    step=int(variables.get("time-step", -1)),
+    flow_time=float(variables.get("flow-time", np.nan)),
+    fields=fields,
+    mtime_ns=st.st_mtime_ns,
+    size=st.st_size,
+  )
+
+def _load_index(index_path: str) -> t.Dict[str, CatalogEntry]:
+  try:
+    with open(index_path) as f:
+      index = json.load(f)
+  except (OSError, ValueError):
+    return {}
+  if index.get("version") != CATALOG_VERSION:
+    return {}
+  field_sets = index.get("field_sets", [])
+  ret = {}
+  for e in index.get("entries", []):
+    e["fields"] = list(field_sets[e["fields"]])
+    ret[e["path"]] = CatalogEntry(**e)
+  return ret
+
+def _write_index(index_path: str, entries: t.List[CatalogEntry]):
+  # every frame of a run usually has the same fields, store each list once
+  field_sets: t.Dict[t.Tuple[str, ...], int] = {}
+  rows = []
+  for e in entries:
+    row = asdict(e)
+    row["fields"] = field_sets.setdefault(tuple(e.fields), len(field_sets))
+    rows.append(row)
+  tmp = f"{index_path}.tmp"
+  with open(tmp, "w") as f:
+    json.dump({"version": CATALOG_VERSION, "field_sets": [list(k) for k in field_sets], "entries": rows}, f)
+  os.replace(tmp, index_path)
+
+def build_catalog(
+  project_dir: str,
+  pattern: str = "*.dat.h5",
+  index_path: str | None = None,
+) -> t.List[CatalogEntry]:
+  """
+  entries of every file matching pattern, in playback order (flow time, then
+  step). files added or changed since the index was written are read again
+  and the index is rewritten, removed files drop out.
+  """
+  index_path = index_path or os.path.join(project_dir, CATALOG_NAME)
+  cached = _load_index(index_path)
+  entries: t.List[CatalogEntry] = []
+  changed = False
+  for path in glob.glob(os.path.join(project_dir, pattern)):
+    rel = os.path.relpath(path, project_dir)
+    st = os.stat(path)
+    entry = cached.pop(rel, None)
+    if entry is None or entry.mtime_ns != st.st_mtime_ns or entry.size != st.st_size:
+      entry = read_entry(path)
+      entry.path = rel
+      changed = True
+    entries.append(entry)
+  # files that disappeared
+  changed = changed or bool(cached)
+
+  # untimed files (flow time nan) go last
+  entries.sort(key=lambda e: (np.isnan(e.flow_time), e.flow_time, e.step, e.path))
+  if changed:
+    _write_index(index_path, entries)
+  for e in entries:
+    e.path = os.path.join(project_dir, e.path)
+  return entries
+
+def frame_at(flow_times: t.Sequence[float], flow_time: float) -> int:
+  """index of the last frame at or before flow_time, clamped to the series"""
+  i = bisect.bisect_right(flow_times, flow_time) - 1
+  return min(max(i, 0), len(flow_times) - 1)
+
+def main(argv: t.List[str] | None = None) -> int:
+  argv = sys.argv[1:] if argv is None else argv
+  project_dir = argv[0] if argv else "./data/Fluent-result"
+  for e in build_catalog(project_dir):
+    print(f"{os.path.basename(e.path):>24} step={e.step:<6} t={e.flow_time:<12g} {len(e.fields)} fields")
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
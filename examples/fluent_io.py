@@ -0,0 +1,267 @@
+import h5py
+import numpy as np
+import typing as t
+from dataclasses import dataclass
+from spans import traced
+from fluent_store import FluentStore, open_store, split_frame_ref
+from fluent_catalog import phase_array_name
+
+# reading the cell fields of Fluent .dat.h5 files (or frames of a packed
+# fluent_store series) into FluentData, and the ScatterPlan that puts their
+# sections onto the mesh's cells. shared by the playback (time_series), the
+# single-file viewer (fluent) and the decoding processes (fluent_parallel).
+
+class LazyArray:
+  """
+  one hdf5 dataset that is only read on first access. shape and dtype come
+  from the dataset header, the file is reopened for the read so thousands of
+  frames don't hold thousands of open handles
+  """
+  def __init__(self, filename:str, path:str, shape:t.Tuple[int, ...], dtype:t.Any):
+    self.filename = filename
+    self.path = path
+    self.shape = tuple(shape)
+    self.dtype = np.dtype(dtype)
+    self._array: np.ndarray | None = None
+
+  @classmethod
+  def from_dataset(cls, dset:h5py.Dataset, dtype:t.Any = None, filename:str | None = None) -> "LazyArray":
+    # only numeric data is converted, strings keep their on-disk type
+    if dtype is None or dset.dtype.kind not in "fiu":
+      dtype = dset.dtype
+    return cls(filename or dset.file.filename, dset.name, dset.shape, dtype)
+
+  @property
+  def loaded(self) -> bool:
+    return self._array is not None
+
+  @property
+  def nbytes(self) -> int:
+    return int(np.prod(self.shape)) * self.dtype.itemsize
+
+  def read(self) -> np.ndarray:
+    if self._array is None:
+      with h5py.File(self.filename, "r") as f:
+        array = np.empty(self.shape, dtype=self.dtype)
+        # hdf5 converts while reading, no float64 temporary for float32 output
+        f[self.path].read_direct(array)
+      self._array = array
+    return self._array
+
+  def release(self):
+    self._array = None
+
+  def __array__(self, dtype=None, copy=None):
+    array = self.read()
+    return array if dtype is None else array.astype(dtype, copy=False)
+
+  def __repr__(self):
+    return f"LazyArray({self.filename}:{self.path}, shape={self.shape}, dtype={self.dtype}, loaded={self.loaded})"
+
+@dataclass
+class Section:
+  # 1-based cell ids, data[k] belongs to cell min_id + k
+  min_id:int
+  max_id:int
+  data:np.ndarray | LazyArray
+
+  @property
+  def array(self) -> np.ndarray:
+    if isinstance(self.data, LazyArray):
+      return self.data.read()
+    return self.data
+
+@dataclass
+class NamedArray:
+  name:str
+  n_component:int
+  # one per cell zone the field is stored for
+  sections:t.List[Section]
+
+  @property
+  def array(self) -> np.ndarray:
+    """the whole field when its sections tile cells 1..n, use a ScatterPlan otherwise"""
+    if len(self.sections) == 1 and self.sections[0].min_id == 1:
+      return self.sections[0].array
+    ordered = sorted(self.sections, key=lambda s: s.min_id)
+    next_id = 1
+    for section in ordered:
+      if section.min_id != next_id:
+        raise ValueError(f"{self.name}: sections do not tile the cells, first gap at cell {next_id}")
+      next_id = section.max_id + 1
+    return np.concatenate([section.array for section in ordered])
+
+  @property
+  def nbytes(self) -> int:
+    return sum(section.data.nbytes for section in self.sections)
+
+@dataclass
+class FluentData:
+  phase_count:int
+  cell_data:t.Dict[str,NamedArray]
+
+  @property
+  def nbytes(self) -> int:
+    return sum(v.nbytes for v in self.cell_data.values())
+
+  def release(self):
+    """drop the data read by LazyArray sections, they read again on next access"""
+    for v in self.cell_data.values():
+      for section in v.sections:
+        if isinstance(section.data, LazyArray):
+          section.data.release()
+
+@dataclass
+class ScatterPlan:
+  """
+  where each section of each field lands in the mesh's cell arrays. built once
+  per case from the minId/maxId of one frame, every frame after that is checked
+  against it and copied with one slice assignment per section
+  """
+  n_cells:int
+  # field -> (n_component, 0-based [start, stop) cell range per section)
+  fields:t.Dict[str, t.Tuple[int, t.List[t.Tuple[int, int]]]]
+
+  @classmethod
+  def from_frame(cls, dat:FluentData, n_cells:int) -> "ScatterPlan":
+    fields = {}
+    for name, arr in dat.cell_data.items():
+      ranges = []
+      for section in arr.sections:
+        if not 1 <= section.min_id <= section.max_id <= n_cells:
+          raise ValueError(f"{name}: section cells [{section.min_id}, {section.max_id}] outside the mesh's {n_cells} cells")
+        ranges.append((section.min_id - 1, section.max_id))
+      ordered = sorted(ranges)
+      for (_, stop), (start, _) in zip(ordered, ordered[1:]):
+        if start < stop:
+          raise ValueError(f"{name}: sections overlap at cell {start + 1}")
+      fields[name] = (arr.n_component, ranges)
+    return cls(n_cells, fields)
+
+  def shape(self, name:str) -> t.Tuple[int, ...]:
+    n_component = self.fields[name][0]
+    return (self.n_cells,) if n_component == 1 else (self.n_cells, n_component)
+
+  def _check(self, arr:NamedArray) -> t.List[t.Tuple[int, int]]:
+    if arr.name not in self.fields:
+      raise ValueError(f"{arr.name}: not in the scatter plan")
+    n_component, ranges = self.fields[arr.name]
+    if arr.n_component != n_component:
+      raise ValueError(f"{arr.name}: {arr.n_component} components, plan has {n_component}")
+    if len(arr.sections) != len(ranges):
+      raise ValueError(f"{arr.name}: {len(arr.sections)} sections, plan has {len(ranges)}")
+    for (start, stop), section in zip(ranges, arr.sections):
+      if (section.min_id - 1, section.max_id) != (start, stop):
+        raise ValueError(f"{arr.name}: section cells [{section.min_id}, {section.max_id}] moved, plan has [{start + 1}, {stop}]")
+    return ranges
+
+  def scatter(self, arr:NamedArray, out:np.ndarray):
+    """copy every section of arr into out, the (n_cells[, n_component]) cell array"""
+    ranges = self._check(arr)
+    shape = self.shape(arr.name)
+    if out.shape != shape:
+      raise ValueError(f"{arr.name}: output shape {out.shape}, expected {shape}")
+    for (start, stop), section in zip(ranges, arr.sections):
+      data = section.array
+      if data.shape != (stop - start,) + shape[1:]:
+        raise ValueError(f"{arr.name}: section shape {data.shape}, expected {(stop - start,) + shape[1:]}")
+      out[start:stop] = data
+
+  def assemble(self, arr:NamedArray, dtype:t.Any) -> np.ndarray:
+    """arr as a new contiguous cell array, or its only section when that already is one"""
+    dtype = np.dtype(dtype)
+    ranges = self._check(arr)
+    if ranges == [(0, self.n_cells)]:
+      data = arr.sections[0].array
+      if data.dtype == dtype and data.shape == self.shape(arr.name) and data.flags.c_contiguous:
+        return data
+    out = np.zeros(self.shape(arr.name), dtype=dtype)
+    self.scatter(arr, out)
+    return out
+
+def _load_store_frame(store:FluentStore, index:int, fields:t.Collection[str] | None, dtype:t.Any) -> FluentData:
+  arrays = store.frame(index, fields, dtype)
+  cell_data = {
+    name: NamedArray(name, store.n_components(name), [Section(1, len(array), array)])
+    for name, array in arrays.items()
+  }
+  return FluentData(phase_count=store.phase_count, cell_data=cell_data)
+
+# load CFD Fluent .dat.h5 file
+# dat_filename may also be a "<store>#<index>" frame of a packed series (see
+# fluent_store), those are read straight away
+# fields: allowlist of array names ("SV_U", "phase_1-SV_VOF", ...), None loads everything
+# dtype: convert numeric fields while reading, None keeps the on-disk type
+# lazy: hand back LazyArray handles that read on first access
+@traced()
+def load_dat_file(
+  dat_filename:str,
+  fields:t.Collection[str] | None = None,
+  dtype:t.Any = None,
+  lazy:bool = True,
+) -> FluentData:
+  ref = split_frame_ref(dat_filename)
+  if ref is not None:
+    return _load_store_frame(open_store(ref[0]), ref[1], fields, dtype)
+
+  ret: FluentData = FluentData(phase_count=0, cell_data={})
+  wanted = set(fields) if fields is not None else None
+  # FIXME: mtime should be stored on some directory inside h5
+
+  with h5py.File(dat_filename, "r") as f:
+    # f.visititems(print_group)
+    # import sys
+    # sys.exit(0)
+
+    obj_info = f["/results/1"]
+    settings = f["/settings"]
+    # datvars = f["/settings/Data Variables"][0].decode("ascii")
+    if obj_info:
+      iphase: int = 1
+      phase = f.get(f"/results/1/phase-{iphase}", None)
+      while phase:
+        ret.phase_count += 1
+        group_cell = phase.get("cells", None)
+        assert group_cell
+        dset = group_cell.get("fields", None)
+        assert dset
+        fields_raw = dset[()][0].decode()
+        v_str = fields_raw.split(";")
+
+        for section_name in v_str:
+          array_name = phase_array_name(section_name, iphase)
+          # skip before touching the group, walking unused fields is most of the cost
+          if wanted is not None and array_name not in wanted:
+            continue
+          if section_name in group_cell:
+            groupdata = group_cell[section_name]
+            section_name = array_name
+            n_sections = int(groupdata.attrs["nSections"][0])
+            if n_sections == 0:
+              # listed but written for no cell zone, there is nothing to place
+              continue
+            sections: t.List[Section] = []
+            n_components = None
+            for i_section in range(1, n_sections+1):
+              dset = groupdata[str(i_section)]
+              min_id = int(dset.attrs["minId"][0])
+              max_id = int(dset.attrs["maxId"][0])
+              data = LazyArray.from_dataset(dset, dtype, dat_filename)
+              if data.shape[0] != max_id - min_id + 1:
+                raise ValueError(f"{dat_filename}: {dset.name} has {data.shape[0]} rows for cells [{min_id}, {max_id}]")
+              section_components = 1 if len(data.shape) == 1 else data.shape[-1]
+              if n_components is None:
+                n_components = section_components
+              elif section_components != n_components:
+                raise ValueError(f"{dat_filename}: {dset.name} has {section_components} components, section 1 has {n_components}")
+              if not lazy:
+                data.read()
+              sections.append(Section(min_id, max_id, data))
+
+            # insert into cell_data
+            ret.cell_data[section_name] = NamedArray(section_name, n_components, sections)
+
+        # advance
+        iphase += 1
+        phase = f.get(f"/results/1/phase-{iphase}", None)
+  return ret
@@ -0,0 +1,175 @@
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+import typing as t
+from concurrent.futures import Future, ProcessPoolExecutor
+import numpy as np
+from fluent_catalog import build_catalog
+from spans import span
+from fluent_io import ScatterPlan, load_dat_file
+from shared_ring import SharedArray, SlotPool, imap_ordered, ring_slots, submit_slot, worker_state
+
+# Fluent frames decoded in a process pool: hdf5 reads and gzip decompression
+# hold the GIL, threads only overlap the waits. every worker opens its
+# .dat.h5, reads the sections and scatters them straight into a slot of a
+# shared-memory ring (one block per field, (n_slots, n_cells[, n_components])),
+# and returns the slot number. the render process sees the slot as numpy
+# views, only paths and ints cross the process boundary.
+#
+#   loader = ParallelFrameLoader(dat_files, plan, fields, n_slots=64)
+#   slot = loader.load(i)           # blocks until frame i is decoded
+#   arrays = loader.arrays(slot)    # {name: view into shared memory}
+#   loader.release(slot)            # the slot is reused by a later load
+
+def _init_worker(n_cells:int, plan_fields:t.Dict, fields:t.List[str], dtype:str, specs:t.Dict[str, t.Tuple[str, t.Tuple[int, ...], str]]):
+  worker_state.update(
+    plan=ScatterPlan(n_cells, plan_fields),
+    fields=fields,
+    dtype=np.dtype(dtype),
+    ring={name: SharedArray.attach(spec) for name, spec in specs.items()},
+  )
+
+def _decode_frame(slot:int, dat_file:str) -> int:
+  w = worker_state
+  # sections are read converted to the ring dtype, then copied into the slot
+  dat = load_dat_file(dat_file, w["fields"], w["dtype"])
+  for name, ring in w["ring"].items():
+    arr = dat.cell_data.get(name)
+    if arr is None:
+      raise ValueError(f"{dat_file}: field {name} not found")
+    w["plan"].scatter(arr, ring.array[slot])
+  return slot
+
+class ParallelFrameLoader:
+  """
+  decodes frames of dat_files (plain .dat.h5 or store frame refs) with
+  `workers` processes into n_slots shared-memory slots. a slot stays owned by
+  the caller until release(), load() blocks while every slot is taken.
+  fields defaults to every field of the plan.
+  """
+  def __init__(
+    self,
+    dat_files:t.Sequence[str],
+    plan:ScatterPlan,
+    fields:t.Collection[str] | None = None,
+    dtype:t.Any = np.float32,
+    n_slots:int | None = None,
+    workers:int | None = None,
+  ):
+    self.dat_files = list(dat_files)
+    self.plan = plan
+    self.fields = list(fields) if fields is not None else list(plan.fields)
+    missing = set(self.fields) - set(plan.fields)
+    if missing:
+      raise ValueError(f"fields not in the scatter plan: {', '.join(sorted(missing))}")
+    self.dtype = np.dtype(dtype)
+    self.workers = workers or os.cpu_count() or 1
+    self.n_slots = n_slots or ring_slots(self.workers)
+    self._ring = {
+      name: SharedArray((self.n_slots,) + plan.shape(name), self.dtype)
+      for name in self.fields
+    }
+    self._slots = SlotPool(self.n_slots)
+    specs = {name: ring.spec() for name, ring in self._ring.items()}
+    # spawn, not fork: the render process runs prefetch threads that may hold
+    # hdf5 or vtk locks at fork time
+    self._pool = ProcessPoolExecutor(
+      self.workers,
+      mp_context=multiprocessing.get_context("spawn"),
+      initializer=_init_worker,
+      # the plan as plain data, the class may live in __main__ of this process
+      initargs=(plan.n_cells, plan.fields, self.fields, self.dtype.str, specs),
+    )
+
+  @property
+  def frame_nbytes(self) -> int:
+    """bytes of one slot, all fields"""
+    return sum(ring.array[0].nbytes for ring in self._ring.values())
+
+  def release(self, slot:int):
+    self._slots.release(slot)
+
+  def submit(self, index:int) -> "Future[int]":
+    """start decoding frame index, the future yields its slot"""
+    # a failed decode never hands its slot out
+    return submit_slot(self._pool, self._slots, _decode_frame, self.dat_files[index])
+
+  def load(self, index:int) -> int:
+    """decode frame index and return its slot"""
+    with span("parallel_decode", frame=index):
+      return self.submit(index).result()
+
+  def arrays(self, slot:int) -> t.Dict[str, np.ndarray]:
+    """views of a slot, valid until the slot is released"""
+    return {name: ring.array[slot] for name, ring in self._ring.items()}
+
+  def imap(self, indices:t.Iterable[int]) -> t.Iterator[t.Tuple[int, int]]:
+    """
+    (index, slot) of every frame in order, with all workers busy. the caller
+    releases each slot when done with it, at most n_slots are out at once
+    """
+    indices = list(indices)
+    # one frame in flight per worker, the other slots stay free for load()
+    # callers and for what the caller of imap holds
+    ordered = imap_ordered(self._pool, self._slots, _decode_frame, [(self.dat_files[i],) for i in indices], self.workers)
+    try:
+      for k, slot in ordered:
+        yield indices[k], slot
+    finally:
+      # abandoned early, the slots the caller never saw go back now
+      ordered.close()
+
+  def close(self):
+    self._pool.shutdown(wait=True, cancel_futures=True)
+    for ring in self._ring.values():
+      ring.close(unlink=True)
+    self._ring = {}
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+    return False
+
+def main(argv:t.List[str] | None = None) -> int:
+  parser = argparse.ArgumentParser(description="decode a Fluent .dat.h5 series serially and with a process pool")
+  parser.add_argument("project_dir", nargs="?", default="./data/Fluent-result")
+  parser.add_argument("--fields", nargs="+", default=["SV_U", "SV_V", "SV_P"])
+  parser.add_argument("--workers", type=int)
+  args = parser.parse_args(argv)
+
+  dat_files = [e.path for e in build_catalog(args.project_dir)]
+  first = load_dat_file(dat_files[0], args.fields)
+  n_cells = max(s.max_id for arr in first.cell_data.values() for s in arr.sections)
+  plan = ScatterPlan.from_frame(first, n_cells)
+
+  s = time.perf_counter()
+  serial = []
+  for dat_file in dat_files:
+    dat = load_dat_file(dat_file, args.fields, np.float32)
+    serial.append({name: plan.assemble(arr, np.float32) for name, arr in dat.cell_data.items()})
+  serial_s = time.perf_counter() - s
+
+  with ParallelFrameLoader(dat_files, plan, args.fields, workers=args.workers) as loader:
+    # keep the worker start-up (imports, shared memory attach) out of the timing
+    for _, slot in loader.imap(range(min(loader.workers, len(dat_files)))):
+      loader.release(slot)
+    s = time.perf_counter()
+    for index, slot in loader.imap(range(len(dat_files))):
+      for name, array in loader.arrays(slot).items():
+        assert np.array_equal(array, serial[index][name]), f"{dat_files[index]}: {name} differs"
+      loader.release(slot)
+    parallel_s = time.perf_counter() - s
+    workers = loader.workers
+
+  n = len(dat_files)
+  print(f"serial:   {n} frames in {serial_s:.2f} s, {n / serial_s:.1f} frames/s")
+  print(f"parallel: {n} frames in {parallel_s:.2f} s, {n / parallel_s:.1f} frames/s with {workers} workers")
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
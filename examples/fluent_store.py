@@ -0,0 +1,294 @@
+import os
+import sys
+import glob
+import json
+import argparse
+import threading
+import typing as t
+import h5py
+import numpy as np
+from fluent_catalog import build_catalog, data_variables
+
+# a Fluent .dat.h5 series packed into one time-major store: every cell field is
+# a single (n_frames, n_cells[, n_components]) array plus a step / flow time
+# index, so playback opens one file instead of one per step and the history of
+# a cell is a strided read instead of a pass over every file.
+#
+# two layouts:
+#   series.h5        hdf5, chunked and compressed, fields under /cells
+#   series/          directory of <field>.npy (memory mapped on read) + index.json
+#
+# frames inside a store are addressed as "<store path>#<frame index>" so the
+# FrameInfo.dat_file of a playback can point either at a .dat.h5 or at a store
+# frame, fluent_io.load_dat_file reads both.
+
+STORE_VERSION = 1
+FRAME_REF_SEP = "#"
+# default store name looked up next to the .dat.h5 files
+STORE_NAME = "series.h5"
+
+def frame_ref(store_path: str, index: int) -> str:
+  return f"{store_path}{FRAME_REF_SEP}{index}"
+
+def split_frame_ref(name: str) -> t.Tuple[str, int] | None:
+  """(store path, frame index) when name addresses a store frame, None for plain files"""
+  path, sep, index = name.rpartition(FRAME_REF_SEP)
+  if not sep or not index.isdigit():
+    return None
+  return path, int(index)
+
+def _chunk_shape(n_frames: int, shape: t.Tuple[int, ...], itemsize: int, frames_per_chunk: int, target_bytes: int):
+  # a whole frame is n_cells / cells_per_chunk chunks, a cell history is
+  # n_frames / frames_per_chunk chunks. ~1 MiB chunks keep both reasonable and
+  # compress well, the chunk cache covers the frames that share a chunk
+  tc = max(1, min(n_frames, frames_per_chunk))
+  row = int(np.prod(shape[1:], dtype=np.int64)) * itemsize
+  cc = max(1, min(shape[0], target_bytes // (tc * row)))
+  return (tc, cc) + tuple(shape[1:])
+
+class FluentStore:
+  """read side of a packed series, either layout"""
+  def __init__(self, path: str, chunk_cache_mb: int = 64):
+    self.path = path
+    self._h5: h5py.File | None = None
+    self._npy: t.Dict[str, np.ndarray] = {}
+    if os.path.isdir(path):
+      with open(os.path.join(path, "index.json")) as f:
+        index = json.load(f)
+      for name in index["fields"]:
+        self._npy[name] = np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+      self.steps = np.asarray(index["steps"], dtype=np.int64)
+      self.flow_times = np.asarray(index["flow_times"], dtype=np.float64)
+      self.sources: t.List[str] = index["sources"]
+      self.phase_count = int(index["phase_count"])
+      self.fill_value = float(index.get("fill_value", np.nan))
+    else:
+      # a frame read decompresses every frame sharing its chunks, keep them
+      # around for the next ticks
+      self._h5 = h5py.File(path, "r", rdcc_nbytes=chunk_cache_mb << 20, rdcc_nslots=100003)
+      index = self._h5["index"]
+      self.steps = index["steps"][()]
+      self.flow_times = index["flow_times"][()]
+      self.sources = [s.decode() for s in index["sources"][()]]
+      self.phase_count = int(self._h5.attrs["phase_count"])
+      self.fill_value = float(self._h5.attrs.get("fill_value", np.nan))
+    # h5py group lookups cost more than the reads, resolve the fields once
+    self._fields: t.Dict[str, h5py.Dataset | np.ndarray] = (
+      dict(self._h5["cells"].items()) if self._h5 is not None else self._npy
+    )
+    self._lock = threading.Lock()
+
+  @property
+  def n_frames(self) -> int:
+    return len(self.steps)
+
+  @property
+  def fields(self) -> t.List[str]:
+    return list(self._fields)
+
+  def _field(self, name: str) -> h5py.Dataset | np.ndarray:
+    return self._fields[name]
+
+  def n_components(self, name: str) -> int:
+    shape = self._fields[name].shape
+    return 1 if len(shape) == 2 else shape[-1]
+
+  def frame(self, index: int, fields: t.Collection[str] | None = None, dtype: t.Any = None) -> t.Dict[str, np.ndarray]:
+    """cell arrays of one frame, fields=None reads them all"""
+    if not 0 <= index < self.n_frames:
+      raise IndexError(f"frame {index} out of range [0, {self.n_frames})")
+    names = self._fields if fields is None else [n for n in fields if n in self._fields]
+    ret = {}
+    with self._lock:
+      for name in names:
+        src = self._field(name)
+        out = np.empty(src.shape[1:], dtype=dtype or src.dtype)
+        if isinstance(src, h5py.Dataset):
+          src.read_direct(out, np.s_[index])
+        else:
+          out[...] = src[index]
+        ret[name] = out
+    return ret
+
+  def history(self, name: str, cells: t.Sequence[int] | np.ndarray) -> np.ndarray:
+    """(n_frames, len(cells)[, n_components]) values of the given 0-based cells over time"""
+    cells = np.asarray(cells, dtype=np.int64)
+    # h5py wants increasing indices without repeats
+    unique, inverse = np.unique(cells, return_inverse=True)
+    with self._lock:
+      values = self._field(name)[:, unique]
+    return values[:, inverse]
+
+  def frame_refs(self) -> t.List[str]:
+    return [frame_ref(self.path, i) for i in range(self.n_frames)]
+
+  def close(self):
+    if self._h5 is not None:
+      self._h5.close()
+      self._h5 = None
+    self._npy.clear()
+    self._fields = {}
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+    return False
+
+# stores opened through open_store stay open for the process, playback reads
+# one frame per tick and should not reopen the file every time
+_stores: t.Dict[str, FluentStore] = {}
+_stores_lock = threading.Lock()
+
+def open_store(path: str) -> FluentStore:
+  key = os.path.abspath(path)
+  with _stores_lock:
+    store = _stores.get(key)
+    if store is None:
+      store = _stores[key] = FluentStore(path)
+    return store
+
+def pack_series(
+  dat_files: t.Sequence[str],
+  output: str,
+  fields: t.Collection[str] | None = None,
+  dtype: t.Any = np.float32,
+  compression: str | None = "gzip",
+  frames_per_chunk: int = 16,
+  chunk_bytes: int = 1 << 20,
+  n_cells: int | None = None,
+  fill_value: float = np.nan,
+) -> str:
+  """
+  pack dat_files (in playback order) into a store at output, a directory of
+  .npy when output has no .h5 suffix. fields and dtype as in load_dat_file.
+  every field is stored for cells 1..n_cells (the case's cell count, default
+  the highest cell id of the first frame), the sections are placed by a
+  ScatterPlan of the first frame and cells of zones a field is not stored for
+  hold fill_value. frames are written frames_per_chunk at a time so each hdf5
+  chunk is compressed once, that many frames of every field are held in memory.
+  """
+  # fluent_io reads stores through this module, import it only when packing
+  from fluent_io import ScatterPlan, load_dat_file
+
+  dtype = np.dtype(dtype)
+  n_frames = len(dat_files)
+  if n_frames == 0:
+    raise ValueError("no .dat.h5 files to pack")
+  steps = np.zeros(n_frames, dtype=np.int64)
+  flow_times = np.full(n_frames, np.nan)
+
+  first = load_dat_file(dat_files[0], fields, dtype, lazy=False)
+  if fields is not None:
+    missing = set(fields) - set(first.cell_data)
+    if missing:
+      raise ValueError(f"{dat_files[0]}: fields not found: {', '.join(sorted(missing))}")
+  if n_cells is None:
+    n_cells = max((s.max_id for arr in first.cell_data.values() for s in arr.sections), default=0)
+  plan = ScatterPlan.from_frame(first, n_cells)
+  shapes = {name: plan.shape(name) for name in first.cell_data}
+
+  as_h5 = output.endswith(".h5")
+  arrays: t.Dict[str, t.Any] = {}
+  h5 = None
+  if as_h5:
+    h5 = h5py.File(output, "w")
+    h5.attrs["version"] = STORE_VERSION
+    h5.attrs["phase_count"] = first.phase_count
+    h5.attrs["fill_value"] = fill_value
+    cells = h5.create_group("cells")
+    for name, shape in shapes.items():
+      arrays[name] = cells.create_dataset(
+        name, (n_frames,) + shape, dtype=dtype,
+        chunks=_chunk_shape(n_frames, shape, dtype.itemsize, frames_per_chunk, chunk_bytes),
+        compression=compression, shuffle=compression is not None,
+      )
+  else:
+    os.makedirs(output, exist_ok=True)
+    for name, shape in shapes.items():
+      arrays[name] = np.lib.format.open_memmap(
+        os.path.join(output, f"{name}.npy"), mode="w+", dtype=dtype, shape=(n_frames,) + shape
+      )
+
+  try:
+    # every frame has the sections of the first, cells outside them keep the fill
+    buffers = {name: np.full((frames_per_chunk,) + shape, fill_value, dtype=dtype) for name, shape in shapes.items()}
+    for block in range(0, n_frames, frames_per_chunk):
+      block_files = dat_files[block:block + frames_per_chunk]
+      for k, dat_file in enumerate(block_files):
+        i = block + k
+        dat = first if i == 0 else load_dat_file(dat_file, list(shapes), dtype, lazy=False)
+        for name in shapes:
+          values = dat.cell_data.get(name)
+          if values is None:
+            raise ValueError(f"{dat_file}: field {name} not found")
+          try:
+            plan.scatter(values, buffers[name][k])
+          except ValueError as e:
+            raise ValueError(f"{dat_file}: {e}") from None
+        with h5py.File(dat_file, "r") as f:
+          variables = data_variables(f)
+        steps[i] = int(variables.get("time-step", i))
+        flow_times[i] = float(variables.get("flow-time", np.nan))
+      n = len(block_files)
+      for name in shapes:
+        arrays[name][block:block + n] = buffers[name][:n]
+
+    sources = [os.path.basename(p) for p in dat_files]
+    if h5 is not None:
+      index = h5.create_group("index")
+      index["steps"] = steps
+      index["flow_times"] = flow_times
+      index["sources"] = np.array(sources, dtype=h5py.string_dtype())
+    else:
+      for arr in arrays.values():
+        arr.flush()
+      with open(os.path.join(output, "index.json"), "w") as f:
+        json.dump({
+          "version": STORE_VERSION,
+          "phase_count": first.phase_count,
+          "fill_value": fill_value,
+          "fields": list(shapes),
+          "steps": steps.tolist(),
+          "flow_times": flow_times.tolist(),
+          "sources": sources,
+        }, f, indent=2)
+  finally:
+    if h5 is not None:
+      h5.close()
+  return output
+
+def main(argv: t.List[str] | None = None) -> int:
+  parser = argparse.ArgumentParser(description="pack a Fluent .dat.h5 series into one time-major store")
+  parser.add_argument("project_dir", help="directory with the *.dat.h5 files")
+  parser.add_argument("--output", help=f"store path, .h5 or a directory (default <project_dir>/{STORE_NAME})")
+  parser.add_argument("--fields", nargs="+", help="only pack these cell fields")
+  parser.add_argument("--float64", action="store_true", help="store float64 instead of float32")
+  parser.add_argument("--no-compression", action="store_true")
+  parser.add_argument("--frames-per-chunk", type=int, default=16)
+  args = parser.parse_args(argv)
+
+  # flow time order, the file names don't sort reliably across restarts
+  dat_files = [e.path for e in build_catalog(args.project_dir)]
+  output = args.output or os.path.join(args.project_dir, STORE_NAME)
+  # the fields cover the case's cells, zones without a field are filled
+  cas_files = sorted(glob.glob(os.path.join(args.project_dir, "*.cas.h5")))
+  n_cells = None
+  if cas_files:
+    with h5py.File(cas_files[0], "r") as f:
+      n_cells = int(f["meshes/1"].attrs["cellCount"][0])
+  pack_series(
+    dat_files, output,
+    n_cells=n_cells,
+    fields=args.fields,
+    dtype=np.float64 if args.float64 else np.float32,
+    compression=None if args.no_compression else "gzip",
+    frames_per_chunk=args.frames_per_chunk,
+  )
+  print(f"packed {len(dat_files)} frames into {output}")
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
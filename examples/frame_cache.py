@@ -0,0 +1,255 @@
+import time
+import threading
+import typing as t
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from spans import span
+
+# LRU cache of decoded frames for playback: get(i) returns frame i and queues
+# the next `prefetch` frames in the playback direction on a thread pool, so the
+# render loop only waits when the loaders fall behind.
+#
+#   cache = FrameCache(lambda i: load(paths[i]), len(paths), budget_bytes=512 << 20)
+#   frame = cache.get(i)
+#
+# a frame that is still read after other get() calls (blended with its
+# neighbours, bound to vtk) is pinned: get(i, pin=True) ... unpin(i). pinned
+# frames are never evicted, so on_evict never hands out buffers in use.
+
+T = t.TypeVar("T")
+
+@dataclass
+class CacheStats:
+  hits: int = 0
+  # frame was still being prefetched, get() waited for it
+  late_hits: int = 0
+  misses: int = 0
+  evictions: int = 0
+  # seconds get() spent blocked on loads
+  stall_s: float = 0.0
+  max_stall_s: float = 0.0
+
+  @property
+  def requests(self) -> int:
+    return self.hits + self.late_hits + self.misses
+
+  @property
+  def hit_rate(self) -> float:
+    return self.hits / self.requests if self.requests else 0.0
+
+  def __str__(self) -> str:
+    return (
+      f"{self.requests} requests, hit rate {self.hit_rate:.1%} "
+      f"({self.hits} hits, {self.late_hits} late, {self.misses} misses), "
+      f"{self.evictions} evictions, stalled {self.stall_s*1000:.1f} ms "
+      f"(max {self.max_stall_s*1000:.1f} ms)"
+    )
+
+class FrameCache(t.Generic[T]):
+  """
+  loader(i) decodes frame i, sizeof(frame) is its footprint in bytes. frames
+  are evicted least recently used first once the budget is exceeded, the
+  frame just returned by get() and pinned frames are never evicted.
+  on_evict(frame) is called for every frame that leaves the cache, e.g. to
+  hand its buffers back to a pool.
+  """
+  def __init__(
+    self,
+    loader: t.Callable[[int], T],
+    n_frames: int,
+    budget_bytes: int,
+    sizeof: t.Callable[[T], int] | None = None,
+    prefetch: int = 4,
+    workers: int = 2,
+    loop: bool = True,
+    on_evict: t.Callable[[T], None] | None = None,
+  ):
+    self.loader = loader
+    self.n_frames = n_frames
+    self.budget_bytes = budget_bytes
+    self.sizeof = sizeof or (lambda frame: getattr(frame, "nbytes", 0))
+    self.prefetch = prefetch
+    # wrap around at the ends like the playback loop does
+    self.loop = loop
+    self.on_evict = on_evict
+    self.stats = CacheStats()
+    self._frames: "OrderedDict[int, t.Tuple[T, int]]" = OrderedDict()
+    self._pending: t.Dict[int, Future] = {}
+    # index -> number of get(pin=True) without their unpin()
+    self._pins: t.Dict[int, int] = {}
+    self._nbytes = 0
+    self._current = -1
+    self._direction = 1
+    self._lock = threading.Lock()
+    self._pool = ThreadPoolExecutor(workers, thread_name_prefix="frame_prefetch")
+
+  @property
+  def nbytes(self) -> int:
+    return self._nbytes
+
+  def __len__(self) -> int:
+    return len(self._frames)
+
+  def __contains__(self, index: int) -> bool:
+    return index in self._frames
+
+  def get(self, index: int, advance: bool = True, pin: bool = False) -> T:
+    """
+    frame `index`, loading it if needed. advance=False fetches a frame needed
+    next to the current one (e.g. to interpolate) without moving the playback
+    position, the prefetch direction or the prefetch window. pin=True keeps
+    the frame cached until a matching unpin(index)
+    """
+    if not 0 <= index < self.n_frames:
+      raise IndexError(f"frame {index} out of range [0, {self.n_frames})")
+    if advance and self._current >= 0 and index != self._current:
+      step = index - self._current
+      if self.loop and abs(step) > self.n_frames // 2:
+        # wrapped around, e.g. last -> first is a step forward
+        step = -step
+      self._direction = 1 if step > 0 else -1
+    if advance:
+      self._current = index
+
+    with self._lock:
+      # before the load, the insert must not evict it
+      if pin:
+        self._pins[index] = self._pins.get(index, 0) + 1
+      entry = self._frames.get(index)
+      if entry is not None:
+        self._frames.move_to_end(index)
+        self.stats.hits += 1
+      future = self._pending.get(index)
+
+    if entry is None:
+      s = time.perf_counter()
+      try:
+        with span("frame_cache_stall", frame=index):
+          if future is not None:
+            self.stats.late_hits += 1
+            frame = future.result()
+          else:
+            self.stats.misses += 1
+            frame = self._load(index)
+      except BaseException:
+        if pin:
+          self.unpin(index)
+        raise
+      stall = time.perf_counter() - s
+      self.stats.stall_s += stall
+      self.stats.max_stall_s = max(self.stats.max_stall_s, stall)
+    else:
+      frame = entry[0]
+
+    if advance:
+      self._schedule(index)
+    return frame
+
+  def unpin(self, index: int):
+    """undo one get(index, pin=True), the frame may be evicted once no pin is left"""
+    with self._lock:
+      count = self._pins.get(index, 0)
+      if count <= 0:
+        raise ValueError(f"frame {index} is not pinned")
+      if count > 1:
+        self._pins[index] = count - 1
+        return
+      del self._pins[index]
+      # it may have been kept over budget, drop what is too much now
+      evicted = self._evict()
+    self._released(evicted)
+
+  def pinned(self, index: int) -> bool:
+    return index in self._pins
+
+  def _ahead(self, index: int) -> t.List[int]:
+    ret = []
+    for k in range(1, self.prefetch + 1):
+      i = index + k * self._direction
+      if self.loop:
+        i %= self.n_frames
+      elif not 0 <= i < self.n_frames:
+        break
+      if i != index:
+        ret.append(i)
+    return ret
+
+  def _schedule(self, index: int):
+    with self._lock:
+      for i in self._ahead(index):
+        if i not in self._frames and i not in self._pending:
+          self._pending[i] = self._pool.submit(self._load, i)
+
+  def _load(self, index: int) -> T:
+    with self._lock:
+      entry = self._frames.get(index)
+    if entry is not None:
+      return entry[0]
+    try:
+      with span("frame_load", frame=index):
+        frame = self.loader(index)
+    except BaseException:
+      # let the next get() retry instead of re-raising a stale future
+      with self._lock:
+        self._pending.pop(index, None)
+      raise
+    return self._insert(index, frame)
+
+  def _insert(self, index: int, frame: T) -> T:
+    """add a loaded frame, returns the cached one"""
+    nbytes = int(self.sizeof(frame))
+    evicted: t.List[T] = []
+    with self._lock:
+      self._pending.pop(index, None)
+      entry = self._frames.get(index)
+      if entry is not None:
+        # loaded twice (a get() miss raced the prefetch), keep the first copy
+        evicted.append(frame)
+        frame = entry[0]
+      else:
+        self._frames[index] = (frame, nbytes)
+        self._nbytes += nbytes
+        evicted += self._evict(index)
+    self._released(evicted)
+    return frame
+
+  def _evict(self, keep: int | None = None) -> t.List[T]:
+    """under the lock, drop least recently used frames until the budget holds"""
+    evicted: t.List[T] = []
+    while self._nbytes > self.budget_bytes and len(self._frames) > 1:
+      # keep what is on screen, what was just loaded and what is pinned, drop the oldest of the rest
+      victim = next((i for i in self._frames if i not in (self._current, keep) and i not in self._pins), None)
+      if victim is None:
+        break
+      victim_frame, victim_bytes = self._frames.pop(victim)
+      self._nbytes -= victim_bytes
+      self.stats.evictions += 1
+      evicted.append(victim_frame)
+    return evicted
+
+  def _released(self, frames: t.List[T]):
+    # outside the lock, on_evict may block or call back into the cache
+    if self.on_evict is not None:
+      for frame in frames:
+        self.on_evict(frame)
+
+  def clear(self):
+    """drop every frame, pinned ones too: only once nothing reads them anymore"""
+    with self._lock:
+      self._pins.clear()
+      frames = [entry[0] for entry in self._frames.values()]
+      self._frames.clear()
+      self._nbytes = 0
+    self._released(frames)
+
+  def close(self):
+    self._pool.shutdown(wait=True, cancel_futures=True)
+    self.clear()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+    return False
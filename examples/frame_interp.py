@@ -0,0 +1,200 @@
+import typing as t
+import numpy as np
+from frame_cache import FrameCache
+from fluent_catalog import frame_at
+
+# cell arrays at any playback time, blended from the frames around it:
+#
+#   interp = FrameInterpolator(cache, flow_times, lambda frame: frame.cell_arrays, "cubic")
+#   arrays = interp.sample(flow_time)   # {name: array}, same buffers every call
+#
+# frames come from the frame cache, so only the two (linear) or four (cubic)
+# frames around the playback time have to be resident, they are pinned while
+# sample() reads them. results are written with in-place ufuncs into buffers
+# owned by the interpolator, an array returned by sample() is overwritten by
+# the next sample().
+
+METHODS = ("linear", "cubic")
+
+class _Scratch:
+  """per (shape, dtype) temporaries of the cubic blend"""
+  def __init__(self, shape:t.Tuple[int, ...], dtype:np.dtype):
+    self.d0, self.d1, self.d2, self.m1, self.m2, self.tmp = (np.empty(shape, dtype=dtype) for _ in range(6))
+    self.mask = np.empty(shape, dtype=bool)
+
+def _pchip_slope(da:np.ndarray, db:np.ndarray, ha:float, hb:float, out:np.ndarray, s:_Scratch):
+  """
+  Fritsch-Carlson slope at a knot between secants da and db (weighted harmonic
+  mean), 0 where the secants change sign so the blend never overshoots
+  """
+  w1, w2 = 2*hb + ha, hb + 2*ha
+  with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+    np.divide(w1, da, out=out)
+    np.divide(w2, db, out=s.tmp)
+    out += s.tmp
+    np.divide(w1 + w2, out, out=out)
+  np.multiply(da, db, out=s.tmp)
+  # also catches the inf / nan from flat secants
+  np.less_equal(s.tmp, 0, out=s.mask)
+  np.copyto(out, 0, where=s.mask)
+
+class FrameInterpolator:
+  """
+  times are the frames' flow times in playback order, arrays(frame) returns a
+  frame's {name: cell array}. method "linear" blends the two bracketing
+  frames, "cubic" is a monotone (pchip) Hermite blend over four frames, it
+  keeps the curvature of the series without overshooting past the frames'
+  values, e.g. no negative volume fractions.
+  """
+  def __init__(
+    self,
+    cache:FrameCache,
+    times:t.Sequence[float],
+    arrays:t.Callable[[t.Any], t.Dict[str, np.ndarray]],
+    method:str = "linear",
+  ):
+    if method not in METHODS:
+      raise ValueError(f"unknown interpolation {method!r}, expected one of {METHODS}")
+    times = np.asarray(times, dtype=np.float64)
+    if len(times) != cache.n_frames:
+      raise ValueError(f"{len(times)} times for {cache.n_frames} frames")
+    if not np.all(np.isfinite(times)) or np.any(np.diff(times) < 0):
+      raise ValueError("frame times must be finite and non decreasing")
+    self.cache = cache
+    self.times = times
+    self.arrays = arrays
+    self.method = method
+    self._times_list = times.tolist()
+    self._out: t.Dict[str, np.ndarray] = {}
+    self._scratch: t.Dict[t.Tuple[t.Tuple[int, ...], np.dtype], _Scratch] = {}
+
+  def bracket(self, time:float) -> t.Tuple[int, int, float]:
+    """(i, j, s): the value at time is frames i and j blended by s in [0, 1]"""
+    n = len(self.times)
+    i = frame_at(self._times_list, time)
+    j = min(i + 1, n - 1)
+    h = self.times[j] - self.times[i]
+    if h <= 0:
+      # past either end of the series or a repeated time step
+      return i, i, 0.0
+    return i, j, float(np.clip((time - self.times[i]) / h, 0.0, 1.0))
+
+  def _neighbour(self, i:int, step:int) -> int | None:
+    k = i + step
+    while 0 <= k < len(self.times) and self.times[k] == self.times[i]:
+      k += step
+    return k if 0 <= k < len(self.times) else None
+
+  def _buffer(self, name:str, like:np.ndarray) -> np.ndarray:
+    out = self._out.get(name)
+    if out is None or out.shape != like.shape or out.dtype != like.dtype:
+      out = self._out[name] = np.empty_like(like)
+    return out
+
+  def _scratch_for(self, like:np.ndarray) -> _Scratch:
+    key = (like.shape, like.dtype)
+    s = self._scratch.get(key)
+    if s is None:
+      s = self._scratch[key] = _Scratch(like.shape, like.dtype)
+    return s
+
+  def sample(self, time:float) -> t.Dict[str, np.ndarray]:
+    """every array of the frames blended at time, into the interpolator's buffers"""
+    # frames are pinned until the blend is written, fetching the next one may
+    # otherwise evict them and hand their buffers to another load
+    pinned: t.List[int] = []
+    try:
+      return self._sample(time, pinned)
+    finally:
+      for k in pinned:
+        self.cache.unpin(k)
+
+  def _get(self, k:int, pinned:t.List[int], advance:bool = False) -> t.Dict[str, np.ndarray]:
+    frame = self.cache.get(k, advance=advance, pin=True)
+    pinned.append(k)
+    return self.arrays(frame)
+
+  def _sample(self, time:float, pinned:t.List[int]) -> t.Dict[str, np.ndarray]:
+    i, j, s = self.bracket(time)
+    # i is the playback position for the cache's prefetch, the rest are neighbours
+    a = self._get(i, pinned, advance=True)
+    if j == i or s == 0.0:
+      return {name: self._copy(name, arr) for name, arr in a.items()}
+    b = self._get(j, pinned)
+    if self.method == "linear":
+      return {name: self._linear(name, arr, b[name], s) for name, arr in a.items()}
+
+    # outer neighbours, past repeated time steps. at the ends of the series the
+    # missing secant repeats the middle one
+    k0 = self._neighbour(i, -1)
+    k3 = self._neighbour(j, 1)
+    p = self._get(k0, pinned) if k0 is not None else None
+    q = self._get(k3, pinned) if k3 is not None else None
+    h0 = self.times[i] - self.times[k0] if k0 is not None else 0.0
+    h1 = self.times[j] - self.times[i]
+    h2 = self.times[k3] - self.times[j] if k3 is not None else 0.0
+    return {
+      name: self._cubic(
+        name, p[name] if p is not None else None, arr, b[name], q[name] if q is not None else None,
+        h0, h1, h2, s,
+      )
+      for name, arr in a.items()
+    }
+
+  def _copy(self, name:str, a:np.ndarray) -> np.ndarray:
+    out = self._buffer(name, a)
+    np.copyto(out, a)
+    return out
+
+  def _linear(self, name:str, a:np.ndarray, b:np.ndarray, s:float) -> np.ndarray:
+    # a + s * (b - a)
+    out = self._buffer(name, a)
+    np.subtract(b, a, out=out)
+    out *= s
+    out += a
+    return out
+
+  def _cubic(
+    self, name:str,
+    p:np.ndarray | None, a:np.ndarray, b:np.ndarray, q:np.ndarray | None,
+    h0:float, h1:float, h2:float, s:float,
+  ) -> np.ndarray:
+    out = self._buffer(name, a)
+    sc = self._scratch_for(a)
+    # secants before, across and after the interval
+    np.subtract(b, a, out=sc.d1)
+    sc.d1 /= h1
+    if p is not None:
+      np.subtract(a, p, out=sc.d0)
+      sc.d0 /= h0
+    else:
+      np.copyto(sc.d0, sc.d1)
+      h0 = h1
+    if q is not None:
+      np.subtract(q, b, out=sc.d2)
+      sc.d2 /= h2
+    else:
+      np.copyto(sc.d2, sc.d1)
+      h2 = h1
+    _pchip_slope(sc.d0, sc.d1, h0, h1, sc.m1, sc)
+    _pchip_slope(sc.d1, sc.d2, h1, h2, sc.m2, sc)
+
+    # cubic hermite basis
+    s2, s3 = s*s, s*s*s
+    h00 = 2*s3 - 3*s2 + 1
+    h10 = s3 - 2*s2 + s
+    h01 = -2*s3 + 3*s2
+    h11 = s3 - s2
+    np.multiply(a, h00, out=out)
+    np.multiply(b, h01, out=sc.tmp)
+    out += sc.tmp
+    sc.m1 *= h10 * h1
+    out += sc.m1
+    sc.m2 *= h11 * h1
+    out += sc.m2
+    return out
+
+  def release(self):
+    """drop the output and scratch buffers, they are allocated again on the next sample()"""
+    self._out.clear()
+    self._scratch.clear()
@@ -0,0 +1,41 @@
+import sys
+import time
+import numpy as np
+from cgns_perf import nn_index_map
+
+def make_points(n: int, noise: float = 0.0, seed: int = 0):
+  """A: n random points, B: the same points shuffled with optional jitter"""
+  rng = np.random.default_rng(seed)
+  A = rng.random((n, 3))
+  perm = rng.permutation(n)
+  B = A[perm]
+  if noise > 0:
+    B = B + rng.uniform(-noise, noise, B.shape)
+  return A, B
+
+def bench(n: int, noise: float = 0.0, repeat: int = 3):
+  A, B = make_points(n, noise)
+  results = {}
+  for method in ("tree", "exact"):
+    times = []
+    for _ in range(repeat):
+      s = time.perf_counter()
+      idx, dist = nn_index_map(A, B, 1e-6, method)
+      times.append(time.perf_counter() - s)
+    results[method] = (idx, min(times))
+  same = np.array_equal(results["tree"][0], results["exact"][0])
+  t_tree, t_exact = results["tree"][1], results["exact"][1]
+  print(
+    f"n={n:>10} noise={noise:.0e} tree={t_tree:.2f}s exact={t_exact:.2f}s "
+    f"speedup={t_tree/t_exact:.1f}x same_idx={same}"
+  )
+
+def main():
+  sizes = [int(a) for a in sys.argv[1:]] or [1_000_000, 10_000_000]
+  for n in sizes:
+    bench(n)
+    bench(n, noise=1e-12)
+
+
+if __name__ == "__main__":
+  main()
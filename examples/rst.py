@@ -2,6 +2,7 @@ from ansys.mapdl import reader as pymapdl_reader
 from ansys.mapdl.reader import examples
 import numpy as np
 import pyvista as pv
+from rst_results import principal_stress
 
 def main():
   # filename = "data/file_final.rst"
@@ -12,7 +13,9 @@ def main():
   grid = ret.grid
   nsets = ret.nsets
   point_data = grid.point_data
-  point_data["pstress"] = ret.principal_nodal_stress(0)[1][:,4]
+  # SEQV of every set, the colour scale holds for the whole run
+  seqv, stats = principal_stress(ret, "SEQV")
+  point_data["pstress"] = seqv[0]
 
   # split
   comp_names = ret.node_components.keys()
@@ -36,7 +39,7 @@ def main():
   #   pl.add_mesh(comp, scalars="pstress")
   for n in vtk_names:
     mesh = pv.read(n)
-    pl.add_mesh(mesh, scalars="pstress")
+    pl.add_mesh(mesh, scalars="pstress", clim=stats.clim())
     break
   pl.show()
 
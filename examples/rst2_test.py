@@ -3,6 +3,7 @@ from ansys.mapdl.reader import examples
 import numpy as np
 
 import pyvista as pv
+from rst_results import displacements, DeformedView
 
 def main():
   # filename = "data/file.rst"
@@ -88,39 +89,17 @@ def main():
   # ret.plot_nodal_temperature(0, 'x', label='PlasticStrain')
   # ret.plot_principal_nodal_stress(3, 'x', label='PlasticStrain')
 
-  # Get the initial (undeformed) points
-  # ret.grid is a PyVista UnstructuredGrid
-  original_points = ret.grid.points 
-
-  # Get the total number of result sets (time steps)
-  number_of_steps = ret.nsets
-
-  print(f"Total steps found: {number_of_steps}")
-
-  # Loop through each step (index starts at 0)
-  for step_index in range(number_of_steps):
-    # 1. Fetch the nodal displacement for this step
-    # nnum: node numbers, disp_data: the displacement vectors (x, y, z)
-    # The '0' usually refers to the first result type, which is displacement
-    nnum, disp_data = ret.nodal_solution(step_index)
-    disp_data = disp_data[:, 0:3]
-    
-    # 2. Calculate the deformed (rotated) coordinates
-    # Note: disp_data is usually (N, 3), matching original_points shape
-    current_deformed_points = original_points + disp_data
-    
+  # every set's displacement in one float32 array, one grid whose points are
+  # rewritten per set instead of a grid copy per set
+  disp = displacements(ret)
+  view = DeformedView(ret.grid, disp)
+  print(f"Total steps found: {view.nsets}")
+  for step_index in range(view.nsets):
+    deformed_grid = view.show(step_index)
     print(f"Step {step_index}: Gear rotated.")
-    print(f" - Sample Old Point: {original_points[-1]}")
-    print(f" - Sample Displacement: {disp_data[-1]}")
-    print(f" - Sample New Point: {current_deformed_points[-1]}")
-    
-    # --- OPTIONAL: If you want to update the PyVista grid object ---
-    # Create a copy so you don't overwrite the original reference mesh
-    deformed_grid = ret.grid.copy()
-    deformed_grid.points = current_deformed_points
-    
-    # Now 'deformed_grid' is the actual rotated geometry for this step
-    # You can save it or plot it:
+    print(f" - Sample Old Point: {view.base[-1]}")
+    print(f" - Sample Displacement: {disp[step_index, -1]}")
+    print(f" - Sample New Point: {deformed_grid.points[-1]}")
     # deformed_grid.save(f"step_{step_index}.vtk")
 
   # steps
@@ -1,30 +1,106 @@
 from ansys.mapdl import reader as pymapdl_reader
 from ansys.mapdl.reader import examples
 import numpy as np
+import matplotlib
 
 import vtk
+import sys
 import time
+from vtk.util import numpy_support
 from dataclasses import dataclass
 import typing as t
+from rst_results import displacements, principal_stress
 
 @dataclass
 class Frame:
   index:int
   timestep:float
-  xml:str
-
-def render_worker():
-  global clock_begin
-  global clock_started
-
-  c = vtk.vtkCylinderSource()
-  c.SetResolution(8)
-  c.Update()
-
-  reader = vtk.vtkXMLPolyDataReader()
-  reader.ReadFromInputStringOn()
-
-  # mapper.SetInputConnection(c.GetOutputPort())
+  # views into the FrameStore's time-major buffers
+  points:np.ndarray
+  colors:np.ndarray
+
+class FrameStore:
+  """
+  the surface topology once, every frame's points (float32) and Colors (uint8
+  rgb) in two time-major arrays. polydata is what the mapper renders, its
+  points and Colors wrap two buffers that show() overwrites, so switching
+  frames is two memcpys instead of an xml parse and a new mapper input
+  """
+  def __init__(self, surface:vtk.vtkPolyData, n_frames:int):
+    n_points = surface.GetNumberOfPoints()
+    self.timesteps = np.zeros(n_frames, dtype=np.float64)
+    self.points = np.zeros((n_frames, n_points, 3), dtype=np.float32)
+    self.colors = np.zeros((n_frames, n_points, 3), dtype=np.uint8)
+
+    self._points = numpy_support.vtk_to_numpy(surface.GetPoints().GetData()).astype(np.float32)
+    self._colors = np.zeros((n_points, 3), dtype=np.uint8)
+    self._vtk_points = vtk.vtkPoints()
+    self._vtk_points.SetData(numpy_support.numpy_to_vtk(self._points, deep=False))
+    self._vtk_colors = numpy_support.numpy_to_vtk(self._colors, deep=False, array_type=vtk.VTK_UNSIGNED_CHAR)
+    self._vtk_colors.SetName("Colors")
+    # cells are shared with surface, points and colors are ours
+    self.polydata = vtk.vtkPolyData()
+    self.polydata.CopyStructure(surface)
+    self.polydata.SetPoints(self._vtk_points)
+    self.polydata.GetPointData().AddArray(self._vtk_colors)
+    self.current = -1
+
+  def __len__(self) -> int:
+    return len(self.timesteps)
+
+  @property
+  def nbytes(self) -> int:
+    return self.points.nbytes + self.colors.nbytes
+
+  def frame(self, index:int) -> Frame:
+    return Frame(index, float(self.timesteps[index]), self.points[index], self.colors[index])
+
+  def frame_at(self, elapsed:float) -> int:
+    """last frame at or before elapsed, -1 before the first one"""
+    return int(np.searchsorted(self.timesteps, elapsed, side="right")) - 1
+
+  def show(self, index:int):
+    if index == self.current:
+      return
+    np.copyto(self._points, self.points[index])
+    np.copyto(self._colors, self.colors[index])
+    # only the two arrays changed, the mapper re-uploads them on the next render
+    self._vtk_points.Modified()
+    self._vtk_colors.Modified()
+    self.current = index
+
+def _color_table(name:str) -> np.ndarray:
+  """(256, 3) uint8 rgb of a matplotlib colormap"""
+  cmap = matplotlib.colormaps[name]
+  return (cmap(np.linspace(0, 1, 256))[:, :3] * 255).astype(np.uint8)
+
+def build_frame_store(ret:t.Any, surface:vtk.vtkPolyData, colormap:str = "viridis", component:str | None = None) -> FrameStore:
+  """
+  deformed surface points of every result set, surface comes from
+  grid.extract_surface(pass_pointid=True). colored by displacement magnitude,
+  or by a principal stress component (S1 S2 S3 SINT SEQV) between its 1st and
+  99th percentile over the whole run
+  """
+  ids = numpy_support.vtk_to_numpy(surface.GetPointData().GetArray("vtkOriginalPointIds")).astype(np.intp)
+  store = FrameStore(surface, ret.nsets)
+  base = np.asarray(ret.grid.points)[ids]
+  disp = displacements(ret, nodes=ids)
+  np.add(base, disp, out=store.points)
+  store.timesteps[:] = ret.time_values[:ret.nsets]
+  if component is None:
+    values = np.linalg.norm(disp, axis=2)
+    lo, hi = float(values.min()), float(values.max())
+  else:
+    values, stats = principal_stress(ret, component, nodes=ids)
+    lo, hi = stats.clim()
+  # one color scale over the whole animation
+  scaled = np.clip(values, lo, hi)
+  scaled -= lo
+  scaled *= 255 / (hi - lo) if hi > lo else 0
+  np.take(_color_table(colormap), scaled.astype(np.intp), axis=0, out=store.colors)
+  return store
+
+def _make_pipeline(polydata:vtk.vtkPolyData):
   mapper = vtk.vtkPolyDataMapper()
   # mapper.SetArrayName("Colors")
   # mapper.SetScalarModeToUsePointData()
@@ -33,7 +109,7 @@ def render_worker():
   mapper.SetScalarMode(vtk.VTK_SCALAR_MODE_USE_POINT_FIELD_DATA)
   # mapper.SetScalarMode(vtk.VTK_SCALAR_MODE_USE_POINT_DATA) # only active scalar
   mapper.SetColorModeToDirectScalars()
-  mapper.SetInputData(c.GetOutput(0))
+  mapper.SetInputData(polydata)
   actor = vtk.vtkActor()
   actor.SetMapper(mapper)
 
@@ -47,156 +123,47 @@ def render_worker():
   ren.AddActor(actor)
   win.SetSize(1024,512)
 
-  def update_callback(caller:vtk.vtkObject, event_id:int):
-    # NOTE: do this to release python GIL lock
-    time.sleep(0)
-
-  # iren.AddObserver("TimerEvent", update_callback)
   iren.SetInteractorStyle(vtk.vtkInteractorStyleTrackballCamera())
   iren.Initialize()
-  # timer_id = iren.CreateRepeatingTimer(1)
-  # iren.Start()
-
-  while not stop_evt.is_set():
-    try:
-      with lck:
-        # Testing
-        # for idx, f in enumerate(frames):
-        #   prev = None
-        #   if idx > 0: prev = frames[idx-1]
-        #   next = None
-        #   if idx < (len(frames)-1): next = frames[idx+1]
-        #   if prev: assert f.timestep > prev.timestep
-        #   if next: assert f.timestep < next.timestep
-
-        if clock_started:
-          elapsed = time.perf_counter()-clock_begin
-          # time_scale = 0.10
-          time_scale = 1.5
-          elapsed = elapsed*time_scale
-
-          # duration = frames[-1].timestep
-          duration = 4.0
-          if elapsed > duration:
-            while elapsed > duration:
-              elapsed -= duration
-            if elapsed < 0: elapsed = 0
-            clock_begin = time.perf_counter()
-
-          # FIXME: use TemporalInterpolator
-          # find the frame
-          frame = None
-          frame_idx = -1
-          for idx, f in enumerate(frames):
-            if (elapsed) < f.timestep:
-              print(f"{elapsed} => {f.timestep}")
-              # assert False
-              break
-            else:
-              frame = f 
-              frame_idx = idx
-
-          if frame:
-            print(f"Frame {frame_idx} picked")
-            reader.SetInputString(frame.xml)
-            reader.Update()
-            mapper.SetInputData(reader.GetOutput())
-            mapper.Modified()
-            mapper.Update()
-          
-        iren.ProcessEvents()
-        win.Render()
-        # NOTE: do this to release python GIL lock
-        time.sleep(0)
-        # iren.Start()
-        # iren.DestroyTimer(timer_id)
-    except Exception as e:
-      print(e)
-      raise
-
-def main():
-  frames:t.List[Frame] = []
-
+  return mapper, win, iren
+
+def _loop_time(clock_begin:float, time_scale:float, duration:float) -> t.Tuple[float, float]:
+  """(elapsed animation time, clock_begin restarted when the loop wrapped)"""
+  elapsed = (time.perf_counter()-clock_begin)*time_scale
+  if elapsed > duration:
+    elapsed %= duration
+    clock_begin = time.perf_counter()
+  return elapsed, clock_begin
+
+def main(argv:t.List[str] | None = None):
+  argv = sys.argv[1:] if argv is None else argv
   # read file
-  filename = "data/file-nocompression.rst"
+  filename = argv[0] if argv else "data/file-nocompression.rst"
   ret = pymapdl_reader.read_binary(filename)
 
-  # parse frame
-  grid = ret.grid
+  # parse frames, the surface is all that is drawn
+  surface = ret.grid.extract_surface(pass_pointid=True)
+  store = build_frame_store(ret, surface, component=argv[1] if len(argv) > 1 else None)
+  print(f"{len(store)} frames, {store.nbytes / (1 << 20):.1f} MiB")
 
   ###################
   ## Render
+  mapper, win, iren = _make_pipeline(store.polydata)
 
-  mapper.SetInputConnection(c.GetOutputPort())
-  mapper = vtk.vtkPolyDataMapper()
-  # mapper.SetArrayName("Colors")
-  # mapper.SetScalarModeToUsePointData()
-  mapper.SetScalarVisibility(1)
-  mapper.SelectColorArray("Colors")
-  mapper.SetScalarMode(vtk.VTK_SCALAR_MODE_USE_POINT_FIELD_DATA)
-  # mapper.SetScalarMode(vtk.VTK_SCALAR_MODE_USE_POINT_DATA) # only active scalar
-  mapper.SetColorModeToDirectScalars()
-  mapper.SetInputData(c.GetOutput(0))
-  actor = vtk.vtkActor()
-  actor.SetMapper(mapper)
-
-  # render
-  ren = vtk.vtkRenderer()
-  ren.SetBackground(0.9, 0.9, 0.9)
-  win = vtk.vtkRenderWindow()
-  win.AddRenderer(ren)
-  iren = vtk.vtkRenderWindowInteractor()
-  iren.SetRenderWindow(win)
-  ren.AddActor(actor)
-  win.SetSize(1024,512)
-
-  # iren.AddObserver("TimerEvent", update_callback)
-  iren.SetInteractorStyle(vtk.vtkInteractorStyleTrackballCamera())
-  iren.Initialize()
-  # timer_id = iren.CreateRepeatingTimer(1)
-  # iren.Start()
-
+  time_scale = 1.0
+  # the animation loops over the solution time
+  duration = float(store.timesteps[-1]) or 4.0
   clock_begin = time.perf_counter()
-  while 1:
-    elapsed = time.perf_counter()-clock_begin
-    time_scale = 1.0
-    elapsed = elapsed*time_scale
-
-    # duration = frames[-1].timestep
-    duration = 4.0
-    if elapsed > duration:
-      while elapsed > duration:
-        elapsed -= duration
-      if elapsed < 0: elapsed = 0
-      clock_begin = time.perf_counter()
-
-    # FIXME: use TemporalInterpolator
-    # find the frame
-    frame = None
-    frame_idx = -1
-    for idx, f in enumerate(frames):
-      if (elapsed) < f.timestep:
-        print(f"{elapsed} => {f.timestep}")
-        # assert False
-        break
-      else:
-        frame = f 
-        frame_idx = idx
-
-    if frame:
-      print(f"Frame {frame_idx} picked")
-      reader.SetInputString(frame.xml)
-      reader.Update()
-      mapper.SetInputData(reader.GetOutput())
-      mapper.Modified()
-      mapper.Update()
-    
-  iren.ProcessEvents()
-  win.Render()
-  # NOTE: do this to release python GIL lock
-  time.sleep(0)
-  # iren.Start()
-    # iren.DestroyTimer(timer_id)
+  while not iren.GetDone():
+    elapsed, clock_begin = _loop_time(clock_begin, time_scale, duration)
+    # last frame at or before elapsed
+    frame_idx = store.frame_at(elapsed)
+    if frame_idx >= 0:
+      store.show(frame_idx)
+    iren.ProcessEvents()
+    win.Render()
+    # NOTE: do this to release python GIL lock
+    time.sleep(0)
 
 if __name__ == "__main__":
-  main()
\ No newline at end of file
+  main()
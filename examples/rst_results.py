@@ -0,0 +1,342 @@
+import os
+import sys
+import json
+import hashlib
+import time
+import typing as t
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import vtk
+import pyvista as pv
+from vtk.util import numpy_support
+from ansys.mapdl import reader as pymapdl_reader
+from shared_ring import SharedArray, SlotPool, imap_ordered, ring_slots, worker_state
+from spans import span
+from stress import PrincipalStressEngine
+
+# whole-run results of an ANSYS .rst in time-major arrays: one
+# (nsets, npts, 3) float32 displacement array instead of a nodal_solution()
+# call, a grid copy and a points sum per set. big runs go to a .npy that is
+# memory mapped on the next open, with the .rst mtime and size next to it in
+# <npy>.json to tell when it is stale.
+#
+#   disp = displacements(ret, path="data/file_disp.npy")
+#   view = DeformedView(ret.grid, disp)
+#   view.show(set_index, scale=100)   # rewrites the points in place
+#
+# principal stress goes the same way, one (nsets, npts) array (filled by a
+# process pool for long runs), with the global range and percentiles gathered
+# while the sets come in, so a colour scale needs no second pass:
+#
+#   seqv, stats = principal_stress(ret, "SEQV", path="data/file_seqv.npy")
+#   lo, hi = stats.clim()   # 1st and 99th percentile
+
+CACHE_VERSION = 1
+# every pool worker opens the .rst again, below this many sets that costs more
+# than it saves
+POOL_MIN_SETS = 32
+
+def _rst_key(filename: str) -> t.Dict[str, t.Any]:
+  st = os.stat(filename)
+  return {"version": CACHE_VERSION, "rst": os.path.abspath(filename), "mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+def _cached_npy(
+  path: str,
+  key: t.Dict[str, t.Any],
+  shape: t.Tuple[int, ...],
+  dtype: t.Any,
+) -> t.Tuple[np.ndarray, t.Dict[str, t.Any] | None]:
+  """
+  the .npy at path memory mapped read only and its <path>.json when that holds
+  every entry of key, otherwise a new writable .npy of shape and None. the json
+  may carry more than the key (e.g. stats), fill the array and _save_key it
+  """
+  try:
+    with open(f"{path}.json") as f:
+      cached = json.load(f)
+    if all(k in cached and cached[k] == v for k, v in key.items()):
+      return np.load(path, mmap_mode="r"), cached
+  except (OSError, ValueError):
+    pass
+  return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape), None
+
+def _save_key(out: np.ndarray, path: str, key: t.Dict[str, t.Any]):
+  out.flush()
+  # written last, a half written .npy never looks current
+  with open(f"{path}.json", "w") as f:
+    json.dump(key, f, indent=2)
+
+def _fill(ret: t.Any, out: np.ndarray, nodes: np.ndarray | None, treat_nan_as_zero: bool):
+  npts = ret.grid.n_points
+  for i in range(ret.nsets):
+    nnum, disp = ret.nodal_displacement(i)
+    assert len(nnum) == npts, f"set {i}: {len(nnum)} nodes, grid has {npts} points"
+    # rotational dofs, if any, come after ux uy uz
+    out[i] = disp[:, :3] if nodes is None else disp[nodes, :3]
+    if treat_nan_as_zero:
+      np.nan_to_num(out[i], copy=False)
+
+def displacements(
+  ret: t.Any,
+  nodes: np.ndarray | None = None,
+  path: str | None = None,
+  treat_nan_as_zero: bool = True,
+) -> np.ndarray:
+  """
+  (nsets, npts, 3) float32 nodal displacement of every result set, in grid
+  point order, or only the grid points `nodes` (e.g. vtkOriginalPointIds of a
+  surface). with path the array is a .npy memory map that later calls reuse
+  while the .rst is unchanged
+  """
+  npts = ret.grid.n_points if nodes is None else len(nodes)
+  shape = (ret.nsets, npts, 3)
+  if nodes is not None:
+    nodes = np.asarray(nodes, dtype=np.intp)
+  if path is None:
+    out = np.empty(shape, dtype=np.float32)
+    _fill(ret, out, nodes, treat_nan_as_zero)
+    return out
+
+  key = _rst_key(ret.filename)
+  key["shape"] = list(shape)
+  key["treat_nan_as_zero"] = treat_nan_as_zero
+  key["nodes"] = None if nodes is None else hashlib.sha1(nodes.tobytes()).hexdigest()
+  out, cached = _cached_npy(path, key, shape, np.float32)
+  if cached is None:
+    _fill(ret, out, nodes, treat_nan_as_zero)
+    _save_key(out, path, key)
+  return out
+
+class DeformedView:
+  """
+  a copy of grid sharing its cells whose points are one float32 buffer,
+  show() writes base + scale * displacement[set] into it. the grid is built
+  once, showing a set touches nothing but the points
+  """
+  def __init__(self, grid: pv.DataSet, displacement: np.ndarray):
+    assert displacement.shape[1:] == (grid.n_points, 3), f"{displacement.shape} for {grid.n_points} points"
+    self.displacement = displacement
+    self.base = np.asarray(grid.points, dtype=np.float32)
+    self.points = self.base.copy()
+    self._vtk_points = numpy_support.numpy_to_vtk(self.points, deep=False)
+    # a shallow copy shares grid's vtkPoints too, give it its own
+    self.grid = grid.copy(deep=False)
+    points = vtk.vtkPoints()
+    points.SetData(self._vtk_points)
+    self.grid.SetPoints(points)
+    self.current: t.Tuple[int, float] | None = None
+
+  @property
+  def nsets(self) -> int:
+    return len(self.displacement)
+
+  def show(self, index: int, scale: float = 1.0) -> pv.DataSet:
+    if self.current == (index, scale):
+      return self.grid
+    np.multiply(self.displacement[index], scale, out=self.points)
+    self.points += self.base
+    self._vtk_points.Modified()
+    self.current = (index, scale)
+    return self.grid
+
+class RangeStats:
+  """
+  streaming min, max and approximate percentiles of everything passed to
+  update(). values are counted in `bins` equal bins that double in width
+  whenever new values fall outside them, so a percentile is off by at most one
+  bin, (max - min) / bins * 2
+  """
+  def __init__(self, bins: int = 4096):
+    assert bins >= 2 and bins % 2 == 0, "bins must be even"
+    self.counts = np.zeros(bins, dtype=np.int64)
+    self.lo = 0.0
+    self.width = 0.0
+    self.min = np.inf
+    self.max = -np.inf
+
+  @property
+  def count(self) -> int:
+    return int(self.counts.sum())
+
+  def _grow(self, vmin: float, vmax: float):
+    n = len(self.counts)
+    if self.width == 0.0:
+      self.lo = vmin
+      # all equal so far, any positive width does
+      self.width = (vmax - vmin) / n or max(abs(vmin), 1.0) * 1e-6
+    while vmin < self.lo or vmax >= self.lo + n * self.width:
+      # merge bin pairs into the half the data is in, the new half is empty
+      merged = self.counts.reshape(-1, 2).sum(axis=1)
+      self.counts[:] = 0
+      if vmin < self.lo:
+        self.counts[n // 2:] = merged
+        self.lo -= n * self.width
+      else:
+        self.counts[:n // 2] = merged
+      self.width *= 2
+
+  def update(self, values: np.ndarray):
+    if values.size == 0:
+      return
+    vmin, vmax = float(values.min()), float(values.max())
+    self._grow(vmin, vmax)
+    self.min = min(self.min, vmin)
+    self.max = max(self.max, vmax)
+    n = len(self.counts)
+    idx = ((values.ravel() - self.lo) / self.width).astype(np.intp)
+    np.clip(idx, 0, n - 1, out=idx)
+    self.counts += np.bincount(idx, minlength=n)
+
+  def percentile(self, q: float) -> float:
+    """q in [0, 100], linear within the bin it falls in"""
+    total = self.count
+    if not total:
+      raise ValueError("no values")
+    target = q / 100 * total
+    cum = np.cumsum(self.counts)
+    i = min(int(np.searchsorted(cum, target, side="left")), len(cum) - 1)
+    below = cum[i - 1] if i else 0
+    frac = (target - below) / self.counts[i] if self.counts[i] else 0.0
+    return float(np.clip(self.lo + (i + frac) * self.width, self.min, self.max))
+
+  def clim(self, lower: float = 1.0, upper: float = 99.0) -> t.Tuple[float, float]:
+    """colour limits, percentiles so a few hot nodes do not wash out the scale"""
+    return self.percentile(lower), self.percentile(upper)
+
+  def to_dict(self) -> t.Dict[str, t.Any]:
+    return {"lo": self.lo, "width": self.width, "min": self.min, "max": self.max, "counts": self.counts.tolist()}
+
+  @classmethod
+  def from_dict(cls, d: t.Dict[str, t.Any]) -> "RangeStats":
+    ret = cls(len(d["counts"]))
+    ret.counts[:] = d["counts"]
+    ret.lo, ret.width, ret.min, ret.max = d["lo"], d["width"], d["min"], d["max"]
+    return ret
+
+def _pool_workers(workers: int | None, n_sets: int) -> int:
+  """processes for n_sets sets, 0 computes in the calling process"""
+  if workers is None:
+    cpus = os.cpu_count() or 1
+    workers = cpus if n_sets >= POOL_MIN_SETS and cpus > 1 else 0
+  return min(workers, n_sets)
+
+def _set_worker_state(ret: t.Any, component: str, dtype: str, nodes: np.ndarray | None, ring_spec):
+  worker_state.update(
+    ret=ret,
+    engine=PrincipalStressEngine(component, dtype, workers=1),
+    nodes=nodes,
+    ring=SharedArray.attach(ring_spec) if ring_spec else None,
+  )
+
+def _init_worker(filename: str, component: str, dtype: str, nodes: np.ndarray | None, ring_spec):
+  # a pool worker opens its own reader, the caller's does not pickle
+  _set_worker_state(pymapdl_reader.read_binary(filename), component, dtype, nodes, ring_spec)
+
+def _principal_set(rnum: int, out: np.ndarray):
+  w = worker_state
+  # Sx Sy Sz Sxy Syz Sxz averaged at the nodes, NaN where no element has stress
+  _, stress = w["ret"].nodal_stress(rnum)
+  if w["nodes"] is not None:
+    stress = stress[w["nodes"]]
+  w["engine"].compute(stress, out=out)
+
+def _principal_slot(slot: int, rnum: int) -> int:
+  _principal_set(rnum, worker_state["ring"].array[slot])
+  return slot
+
+def principal_stress(
+  ret: t.Any,
+  component: str = "SEQV",
+  nodes: np.ndarray | None = None,
+  sets: t.Sequence[int] | None = None,
+  path: str | None = None,
+  dtype: t.Any = np.float32,
+  workers: int | None = None,
+  bins: int = 4096,
+) -> t.Tuple[np.ndarray, RangeStats]:
+  """
+  (len(sets), npts) principal stress `component` (S1 S2 S3 SINT SEQV) of the
+  result sets `sets` (default all), with NaN as 0 like treat_nan_as_zero, and
+  the RangeStats of all of it. sets are computed by `workers` processes, each
+  with its own reader, into a ring of shared slots that are copied out in set
+  order. workers=0 computes in this process, None does so for fewer than
+  POOL_MIN_SETS sets and uses one process per core otherwise. with path the
+  array is a .npy memory map and the stats go into <npy>.json, a later call
+  with the same arguments on an unchanged .rst only opens them
+  """
+  sets = list(range(ret.nsets) if sets is None else sets)
+  dtype = np.dtype(dtype)
+  if nodes is not None:
+    nodes = np.asarray(nodes, dtype=np.intp)
+  npts = ret.grid.n_points if nodes is None else len(nodes)
+  shape = (len(sets), npts)
+
+  key = None
+  if path is not None:
+    key = _rst_key(ret.filename)
+    key.update(
+      component=component,
+      shape=list(shape),
+      dtype=dtype.str,
+      sets=hashlib.sha1(np.asarray(sets, dtype=np.int64).tobytes()).hexdigest(),
+      nodes=None if nodes is None else hashlib.sha1(nodes.tobytes()).hexdigest(),
+    )
+    store, cached = _cached_npy(path, key, shape, dtype)
+    if cached is not None:
+      return store, RangeStats.from_dict(cached["stats"])
+  else:
+    store = np.empty(shape, dtype=dtype)
+
+  stats = RangeStats(bins)
+  workers = _pool_workers(workers, len(sets))
+  if workers == 0:
+    # the caller's reader, opening the .rst again costs more than small runs
+    _set_worker_state(ret, component, dtype.str, nodes, None)
+    try:
+      for i, rnum in enumerate(sets):
+        with span("rst_principal", set=rnum):
+          _principal_set(rnum, out=store[i])
+        stats.update(store[i])
+    finally:
+      worker_state.clear()
+  else:
+    n_slots = ring_slots(workers)
+    ring = SharedArray((n_slots, npts), dtype)
+    try:
+      initargs = (ret.filename, component, dtype.str, nodes, ring.spec())
+      with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=initargs) as pool:
+        slots = SlotPool(n_slots)
+        # copy out in set order, the stats see each set once
+        for k, slot in imap_ordered(pool, slots, _principal_slot, [(rnum,) for rnum in sets]):
+          with span("rst_principal_write", set=sets[k]):
+            store[k] = ring.array[slot]
+            stats.update(store[k])
+          slots.release(slot)
+    finally:
+      ring.close(unlink=True)
+
+  if key is not None:
+    _save_key(store, path, dict(key, stats=stats.to_dict()))
+  return store, stats
+
+def main(argv: t.List[str] | None = None) -> int:
+  argv = sys.argv[1:] if argv is None else argv
+  filename = argv[0] if argv else "data/file_final.rst"
+  ret = pymapdl_reader.read_binary(filename)
+  s = time.perf_counter()
+  disp = displacements(ret, path=f"{os.path.splitext(filename)[0]}_disp.npy")
+  print(f"{ret.nsets} sets x {disp.shape[1]} points in {time.perf_counter() - s:.3f} s, {disp.nbytes / (1 << 20):.1f} MiB")
+  view = DeformedView(ret.grid, disp)
+  s = time.perf_counter()
+  for i in range(view.nsets):
+    view.show(i, scale=100)
+  print(f"scrubbed {view.nsets} sets, {(time.perf_counter() - s) / max(1, view.nsets) * 1000:.3f} ms per set")
+  s = time.perf_counter()
+  seqv, stats = principal_stress(ret, "SEQV", path=f"{os.path.splitext(filename)[0]}_seqv.npy")
+  lo, hi = stats.clim()
+  print(f"SEQV of {len(seqv)} sets in {time.perf_counter() - s:.3f} s, range [{stats.min:.4g}, {stats.max:.4g}], clim [{lo:.4g}, {hi:.4g}]")
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,160 @@
+import threading
+import typing as t
+from collections import deque
+from concurrent.futures import Executor, Future, wait, FIRST_COMPLETED
+import numpy as np
+from multiprocessing import shared_memory
+
+# numpy arrays in shared memory for process pools: the creating process
+# allocates them, workers attach by name from spec(), only names and shapes
+# cross the process boundary. results go through a ring of slots, the
+# leading axis of one or more SharedArrays: a worker fills a slot and returns
+# its number, the caller reads it in task order and releases it.
+#
+#   slots = SlotPool(ring_slots(workers))
+#   for k, slot in imap_ordered(pool, slots, fill, [(path,) for path in paths]):
+#     out[k] = ring.array[slot]
+#     slots.release(slot)
+
+# per process state of a pool worker, filled once by the pool's initializer
+# and read by the task functions. a worker process serves one pool, so the
+# modules share the dict. the pool already uses every core, work inside a
+# worker runs on one thread
+worker_state: t.Dict[str, t.Any] = {}
+
+def ring_slots(workers: int) -> int:
+  """
+  slots for a ring fed by `workers` processes: two per worker keeps everyone
+  busy while the caller copies the oldest slot out
+  """
+  return 2 * workers
+
+class SharedArray:
+  """numpy array over a multiprocessing.shared_memory block"""
+  def __init__(self, shape: t.Tuple[int, ...], dtype: t.Any, name: str | None = None):
+    self.shape = tuple(shape)
+    self.dtype = np.dtype(dtype)
+    nbytes = max(1, int(np.prod(self.shape)) * self.dtype.itemsize)
+    if name is None:
+      self.shm = shared_memory.SharedMemory(create=True, size=nbytes)
+    else:
+      # workers only attach, the creating process owns unlink()
+      self.shm = shared_memory.SharedMemory(name=name, track=False)
+    self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self.shm.buf)
+
+  @classmethod
+  def attach(cls, spec: t.Tuple[str, t.Tuple[int, ...], str]) -> "SharedArray":
+    """the array another process created, from its spec()"""
+    name, shape, dtype = spec
+    return cls(shape, dtype, name=name)
+
+  @classmethod
+  def from_array(cls, arr: np.ndarray) -> "SharedArray":
+    ret = cls(arr.shape, arr.dtype)
+    ret.array[:] = arr
+    return ret
+
+  def spec(self) -> t.Tuple[str, t.Tuple[int, ...], str]:
+    return self.shm.name, self.shape, self.dtype.str
+
+  def close(self, unlink: bool = False):
+    del self.array
+    self.shm.close()
+    if unlink:
+      self.shm.unlink()
+
+class SlotPool:
+  """
+  free slot numbers of a ring, the oldest released is handed out first so a
+  slot just given back is reused last. acquire() blocks while every slot is
+  out, release() may be called from any thread
+  """
+  def __init__(self, n_slots: int):
+    self.n_slots = n_slots
+    self._free: t.Deque[int] = deque(range(n_slots))
+    self._cond = threading.Condition()
+
+  @property
+  def n_free(self) -> int:
+    return len(self._free)
+
+  def acquire(self) -> int:
+    with self._cond:
+      while not self._free:
+        self._cond.wait()
+      return self._free.popleft()
+
+  def release(self, slot: int):
+    with self._cond:
+      self._free.append(slot)
+      self._cond.notify()
+
+def submit_slot(executor: Executor, slots: SlotPool, fn: t.Callable[..., int], *args) -> "Future[int]":
+  """
+  run fn(slot, *args) on a free slot, fn returns the slot. the future's slot
+  belongs to the caller, a failed or cancelled call releases it
+  """
+  slot = slots.acquire()
+  try:
+    future = executor.submit(fn, slot, *args)
+  except BaseException:
+    slots.release(slot)
+    raise
+  def done(f: Future):
+    if f.cancelled() or f.exception() is not None:
+      slots.release(slot)
+  future.add_done_callback(done)
+  return future
+
+def imap_ordered(
+  executor: Executor,
+  slots: SlotPool,
+  fn: t.Callable[..., int],
+  args: t.Iterable[t.Tuple],
+  max_running: int | None = None,
+) -> t.Iterator[t.Tuple[int, int]]:
+  """
+  (k, slot) of fn(slot, *args[k]) for every k in order, while later calls keep
+  the executor busy. the caller releases each slot when done with it. at most
+  max_running calls are in flight (default: as many as there are free
+  slots), a lower limit leaves slots for whoever else shares the pool. a
+  failed call raises here, slots of an abandoned iteration are released
+  """
+  args = list(args)
+  limit = max_running or slots.n_slots
+  running: t.Dict[Future, int] = {}
+  finished: t.Dict[int, int] = {}
+  next_submit = next_yield = 0
+  try:
+    while next_yield < len(args):
+      while next_submit < len(args) and len(running) < limit and slots.n_free:
+        running[submit_slot(executor, slots, fn, *args[next_submit])] = next_submit
+        next_submit += 1
+      if next_yield not in finished:
+        if not running:
+          # every slot is out, block until one comes back
+          running[submit_slot(executor, slots, fn, *args[next_submit])] = next_submit
+          next_submit += 1
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        failed = None
+        for future in done:
+          k = running.pop(future)
+          if future.exception() is None:
+            finished[k] = future.result()
+          else:
+            failed = future
+        # after the good ones are recorded, their slots go back below
+        if failed is not None:
+          failed.result()
+        continue
+      yield next_yield, finished.pop(next_yield)
+      next_yield += 1
+  finally:
+    # hand back what the caller never saw, failed calls released their own
+    for future in running:
+      try:
+        slots.release(future.result())
+      except BaseException:
+        pass
+    for slot in finished.values():
+      slots.release(slot)
@@ -0,0 +1,144 @@
+import os
+import json
+import time
+import atexit
+import threading
+import functools
+import tracemalloc
+import typing as t
+
+# hierarchical timing spans exported as chrome trace json, open the file in
+# chrome://tracing or https://ui.perfetto.dev
+#
+#   with span("read"):
+#     ...
+#
+#   @traced()
+#   def load(...): ...
+#
+# recording is off unless enable() is called or PTK_TRACE=trace.json is set,
+# in which case the trace is written to that path at exit. while disabled
+# span() hands back one shared no-op context, so instrumented code only pays
+# for a global lookup.
+
+_enabled = False
+_trace_alloc = False
+_events: t.List[t.Dict[str, t.Any]] = []
+_local = threading.local()
+_t0 = time.perf_counter_ns()
+
+class _NullSpan:
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    return False
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+  __slots__ = ("name", "args", "start", "mem", "depth")
+
+  def __init__(self, name: str, args: t.Dict[str, t.Any] | None):
+    self.name = name
+    self.args = args
+
+  def __enter__(self):
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+      stack = _local.stack = []
+    self.depth = len(stack)
+    stack.append(self.name)
+    self.mem = tracemalloc.get_traced_memory()[0] if _trace_alloc else 0
+    self.start = time.perf_counter_ns()
+    return self
+
+  def __exit__(self, *exc):
+    end = time.perf_counter_ns()
+    stack = _local.stack
+    stack.pop()
+    args = dict(self.args) if self.args else {}
+    args["depth"] = self.depth
+    if stack:
+      args["parent"] = stack[-1]
+    if _trace_alloc:
+      # net bytes still allocated when the span closes
+      args["bytes_allocated"] = tracemalloc.get_traced_memory()[0] - self.mem
+    _events.append({
+      "name": self.name,
+      "ph": "X",
+      "ts": (self.start - _t0) / 1000,
+      "dur": (end - self.start) / 1000,
+      "pid": os.getpid(),
+      "tid": threading.get_native_id(),
+      "args": args,
+    })
+    return False
+
+def span(name: str, **args):
+  """context manager timing the enclosed block, extra kwargs end up in the event args"""
+  if not _enabled:
+    return _NULL_SPAN
+  return _Span(name, args)
+
+def traced(name: str | None = None):
+  """decorator form of span, named after the function by default"""
+  def decorator(fn):
+    span_name = name or fn.__qualname__
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+      if not _enabled:
+        return fn(*args, **kwargs)
+      with _Span(span_name, None):
+        return fn(*args, **kwargs)
+    return wrapper
+  return decorator
+
+def enable(trace_alloc: bool = False):
+  """start recording, trace_alloc also records allocations through tracemalloc (slow)"""
+  global _enabled, _trace_alloc
+  _enabled = True
+  _trace_alloc = trace_alloc
+  if trace_alloc and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+def disable():
+  global _enabled, _trace_alloc
+  _enabled = False
+  if _trace_alloc:
+    tracemalloc.stop()
+  _trace_alloc = False
+
+def is_enabled() -> bool:
+  return _enabled
+
+def clear():
+  _events.clear()
+
+def events() -> t.List[t.Dict[str, t.Any]]:
+  return list(_events)
+
+def summary() -> t.Dict[str, t.Dict[str, float]]:
+  """count and total / max milliseconds per span name"""
+  ret: t.Dict[str, t.Dict[str, float]] = {}
+  for e in _events:
+    s = ret.setdefault(e["name"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+    s["count"] += 1
+    s["total_ms"] += e["dur"] / 1000
+    s["max_ms"] = max(s["max_ms"], e["dur"] / 1000)
+  return ret
+
+def export_chrome_trace(path: str):
+  threads = {(e["pid"], e["tid"]) for e in _events}
+  names = {th.native_id: th.name for th in threading.enumerate()}
+  meta = [
+    {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": names.get(tid, str(tid))}}
+    for pid, tid in threads
+  ]
+  with open(path, "w") as f:
+    json.dump({"traceEvents": meta + _events, "displayTimeUnit": "ms"}, f)
+
+_env_path = os.environ.get("PTK_TRACE")
+if _env_path:
+  enable(trace_alloc=os.environ.get("PTK_TRACE_ALLOC", "") not in ("", "0"))
+  atexit.register(export_chrome_trace, _env_path)
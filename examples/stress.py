@@ -0,0 +1,109 @@
+import os
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from spans import traced
+
+# principal stresses of nodal component stresses, shared by the CGNS snapshot
+# post-processing (cgns_perf, cgns_batch) and the ANSYS results (rst_results)
+
+PRINCIPAL_COMPONENTS = ("S1", "S2", "S3", "SINT", "SEQV")
+
+class PrincipalStressEngine:
+  """
+  principal / equivalent stress of nodal component stresses, same results as
+  `_binary_reader.compute_principal_stress` (PRNSOL, S, PRIN) but only for the
+  requested component. rows are processed in fixed-size chunks on a thread
+  pool (numpy releases the GIL inside the ufuncs) and written straight into
+  `out`, so memory stays at one chunk of temporaries per worker.
+
+  stress: (n,6) Sx Sy Sz Sxy Syz Sxz, or (n,3) normal stresses without shear
+  dtype: np.float32 computes and stores in single precision
+  NaN rows come out as 0, like treat_nan_as_zero
+  """
+  def __init__(
+    self,
+    component: str = "SEQV",
+    dtype: t.Any = np.float64,
+    chunk_size: int = 1 << 16,
+    workers: int | None = None,
+  ):
+    if component not in PRINCIPAL_COMPONENTS:
+      raise ValueError(f"unknown component {component!r}, expect one of {PRINCIPAL_COMPONENTS}")
+    self.component = component
+    self.dtype = np.dtype(dtype)
+    self.chunk_size = chunk_size
+    self.workers = workers or os.cpu_count() or 1
+    self._pool: ThreadPoolExecutor | None = None
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+
+  def __call__(self, stress: np.ndarray, out: np.ndarray) -> np.ndarray:
+    return self.compute(stress, out)
+
+  def close(self):
+    if self._pool is not None:
+      self._pool.shutdown()
+      self._pool = None
+
+  @traced()
+  def compute(self, stress: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+    if stress.ndim != 2 or stress.shape[1] not in (3, 6):
+      raise ValueError(f"expect (n,6) or (n,3) stress, found {stress.shape}")
+    n = len(stress)
+    if out is None:
+      out = np.empty(n, dtype=self.dtype)
+    if out.shape != (n,) or out.dtype != self.dtype:
+      raise ValueError(f"expect ({n},) {self.dtype} output, found {out.shape} {out.dtype}")
+
+    c = self.chunk_size
+    if n <= c or self.workers == 1:
+      for i in range(0, n, c):
+        self._compute_chunk(stress[i:i+c], out[i:i+c])
+      return out
+    if self._pool is None:
+      self._pool = ThreadPoolExecutor(self.workers)
+    futures = [self._pool.submit(self._compute_chunk, stress[i:i+c], out[i:i+c]) for i in range(0, n, c)]
+    for f in futures:
+      f.result()
+    return out
+
+  @traced()
+  def _compute_chunk(self, stress: np.ndarray, out: np.ndarray):
+    x = stress.astype(self.dtype, copy=False)
+    sx, sy, sz = x[:, 0], x[:, 1], x[:, 2]
+    if x.shape[1] == 6:
+      sxy, syz, sxz = x[:, 3], x[:, 4], x[:, 5]
+    else:
+      sxy = syz = sxz = self.dtype.type(0)
+    shear2 = sxy*sxy + syz*syz + sxz*sxz
+
+    if self.component == "SEQV":
+      # von mises straight from the components, no eigenvalues needed
+      np.sqrt(0.5*((sx - sy)**2 + (sy - sz)**2 + (sz - sx)**2) + 3*shear2, out=out)
+    else:
+      # closed form eigenvalues of the symmetric tensor
+      q = (sx + sy + sz) / 3
+      dx, dy, dz = sx - q, sy - q, sz - q
+      p = np.sqrt((dx*dx + dy*dy + dz*dz + 2*shear2) / 6)
+      inv_p = np.divide(1, p, out=np.zeros_like(p), where=p > 0)
+      det = dx*dy*dz + 2*sxy*syz*sxz - dx*syz*syz - dy*sxz*sxz - dz*sxy*sxy
+      r = np.clip(0.5 * det * inv_p**3, -1, 1)
+      phi = np.arccos(r) / 3
+      if self.component == "SINT":
+        # s1 - s3
+        np.multiply(2*np.sqrt(self.dtype.type(3))*p, np.sin(phi + np.pi/3), out=out)
+      else:
+        s1 = q + 2*p*np.cos(phi)
+        s3 = q + 2*p*np.cos(phi + 2*np.pi/3)
+        if self.component == "S1":
+          out[:] = s1
+        elif self.component == "S3":
+          out[:] = s3
+        else:
+          np.subtract(3*q - s1, s3, out=out)
+    np.nan_to_num(out, copy=False)
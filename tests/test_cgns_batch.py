@@ -0,0 +1,52 @@
+import json
+import numpy as np
+import pytest
+import cgns_batch
+import cgns_perf
+from cgns_h5 import read_cgns_zone
+from cgns_perf import write_bin_file
+from stress import PrincipalStressEngine
+from test_cgns_h5 import write_cgns
+
+@pytest.fixture
+def batch(tmp_path, monkeypatch):
+  mesh_path = str(tmp_path / "block.cgns")
+  write_cgns(mesh_path)
+  points = np.asarray(read_cgns_zone(mesh_path).points)
+  # the solver numbers the nodes its own way
+  rng = np.random.default_rng(0)
+  solver_points = points[rng.permutation(len(points))]
+  points_path = str(tmp_path / "points.bin")
+  write_bin_file(points_path, solver_points)
+  snapshots = []
+  for k in range(7):
+    path = str(tmp_path / f"snapshot_{k}.bin")
+    write_bin_file(path, rng.normal(scale=100, size=(len(points), 6)))
+    snapshots.append(path)
+  # keep the caches out of the home directory
+  index_cache = cgns_perf.IndexMapCache(str(tmp_path / "index"))
+  surface_cache = cgns_perf.SurfaceCache(str(tmp_path / "surface"))
+  monkeypatch.setattr(cgns_batch, "cached_nn_index_map", lambda *a: cgns_perf.cached_nn_index_map(*a, cache=index_cache))
+  monkeypatch.setattr(cgns_batch, "extract_surface", lambda mesh: cgns_perf.extract_surface(mesh, cache=surface_cache))
+  return mesh_path, points_path, snapshots, solver_points
+
+@pytest.mark.parametrize("surface", [False, True])
+def test_run_batch_matches_serial(batch, tmp_path, surface):
+  mesh_path, points_path, snapshots, solver_points = batch
+  output = str(tmp_path / "seqv.npy")
+  # fewer slots than snapshots, every slot is reused
+  cgns_batch.run_batch(mesh_path, points_path, snapshots, output, surface=surface, workers=2)
+  store = np.load(output)
+  assert store.shape[0] == len(snapshots) and store.dtype == np.float32
+
+  mesh = cgns_perf.read_mesh(mesh_path)
+  idx, _ = cgns_perf.nn_index_map(solver_points, mesh.points, 1e-6)
+  engine = PrincipalStressEngine("SEQV", np.float32, workers=1)
+  point_ids = cgns_perf.extract_surface(mesh, cache=cgns_perf.SurfaceCache(str(tmp_path / "ref"))).point_ids if surface else None
+  for k, path in enumerate(snapshots):
+    expected = engine.compute(cgns_perf.read_bin_file(path, 6)[idx])
+    if surface:
+      expected = expected[point_ids]
+    assert np.array_equal(store[k], expected), k
+  with open(f"{output}.json") as f:
+    assert json.load(f)["snapshots"] == snapshots
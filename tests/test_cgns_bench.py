@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+import cgns_bench
+from cgns_h5 import read_cgns_zone
+
+def _results(**stages):
+  return {"cases": {"hex_10k": {"stages": {
+    name: {"median": median, "min": best} for name, (median, best) in stages.items()
+  }}}}
+
+def test_compare_needs_median_and_min_to_regress():
+  base = _results(read=(0.100, 0.090), step=(0.100, 0.090), tiny=(0.001, 0.001))
+  cur = _results(
+    # the best run is as fast as before, one slow repeat moved the median
+    read=(0.150, 0.091),
+    step=(0.150, 0.140),
+    # under the noise floor
+    tiny=(0.005, 0.005),
+  )
+  assert cgns_bench.compare(cur, base, 0.10) == ["hex_10k/step"]
+
+@pytest.mark.parametrize("kind", ["hex", "tet"])
+def test_make_case_writes_cgns(tmp_path, monkeypatch, kind):
+  monkeypatch.setitem(cgns_bench.SIZES, "tiny", 125)
+  mesh_path, bin_path = cgns_bench.make_case(str(tmp_path), "tiny", kind)
+  assert mesh_path.endswith(".cgns")
+  mesh = read_cgns_zone(mesh_path)
+  expected = cgns_bench.make_mesh(125, kind)
+  assert mesh.n_cells == expected.n_cells and np.isclose(mesh.volume, 1.0)
+  ret = cgns_bench.bench_case(mesh_path, bin_path, repeat=1)
+  assert ret["n_points"] == 125
+  assert set(ret["stages"]) == {"read", "index_map", "surface", "surface_cached", "face_export", "step"}
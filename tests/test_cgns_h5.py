@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+import pyvista as pv
+import cgns_perf
+from cgns_h5 import list_zones, read_cgns_zone, write_cgns_zone
+
+def write_cgns(path, boundary=True):
+  """a 2x2x1 hexahedral block, with a QUAD_4 section on its bottom face"""
+  mesh = pv.ImageData(dimensions=(3, 3, 2)).cast_to_unstructured_grid()
+  # not a regular lattice, vtkCGNSReader must not be matched by accident
+  mesh.points = np.asarray(mesh.points, dtype=np.float64) + np.random.default_rng(0).uniform(-0.1, 0.1, (mesh.n_points, 3))
+  hexes = mesh.cell_connectivity.reshape(-1, 8)
+  write_cgns_zone(path, mesh, [("Bottom", pv.CellType.PIXEL, hexes[:, :4])] if boundary else ())
+
+def _vtk_zone(path):
+  mesh = pv.read(path)
+  while isinstance(mesh, pv.MultiBlock):
+    mesh = mesh.get_block(0)
+  return mesh
+
+@pytest.mark.parametrize("boundary", [True, False])
+def test_read_cgns_zone_matches_vtk_reader(tmp_path, boundary):
+  path = str(tmp_path / "block.cgns")
+  write_cgns(path, boundary)
+  ours = read_cgns_zone(path)
+  theirs = _vtk_zone(path)
+  assert np.allclose(ours.points, theirs.points, rtol=1e-6, atol=0)
+  assert np.array_equal(ours.celltypes, theirs.celltypes)
+  assert np.array_equal(ours.cell_offsets, theirs.cell_offsets)
+  assert np.array_equal(ours.cell_connectivity, theirs.cell_connectivity)
+
+def test_read_cgns_zone_boundary_sections(tmp_path):
+  path = str(tmp_path / "block.cgns")
+  write_cgns(path)
+  (info,) = list_zones(path)
+  assert (info.n_vertices, info.n_cells, info.cell_dim) == (18, 4, 3)
+  assert read_cgns_zone(path).n_cells == 4
+  mesh = read_cgns_zone(path, volume_only=False)
+  assert list(mesh.celltypes) == [pv.CellType.HEXAHEDRON] * 4 + [pv.CellType.QUAD] * 4
+
+@pytest.mark.parametrize("error", [KeyError, ValueError, IndexError, NotImplementedError])
+def test_read_mesh_falls_back_to_vtk(tmp_path, monkeypatch, error):
+  path = str(tmp_path / "block.cgns")
+  write_cgns(path)
+  def broken(path):
+    raise error("unexpected layout")
+  monkeypatch.setattr(cgns_perf, "read_cgns_zone", broken)
+  mesh = cgns_perf.read_mesh(path)
+  assert isinstance(mesh, pv.UnstructuredGrid)
+  assert np.array_equal(mesh.cell_connectivity, _vtk_zone(path).cell_connectivity)
+
+def test_write_cgns_zone_roundtrip(tmp_path):
+  # tetrahedra then voxels, written as TETRA_4 and HEXA_8 sections
+  block = pv.ImageData(dimensions=(3, 3, 3)).cast_to_unstructured_grid()
+  tets = block.extract_cells(range(4)).triangulate()
+  mesh = tets.merge(block.extract_cells(range(4, 8)), merge_points=False)
+  path = str(tmp_path / "mixed.cgns")
+  write_cgns_zone(path, mesh)
+  ours = read_cgns_zone(path)
+  n_tets = tets.n_cells
+  assert np.array_equal(ours.points, mesh.points)
+  assert list(ours.celltypes) == [pv.CellType.TETRA] * n_tets + [pv.CellType.HEXAHEDRON] * 4
+  conn = mesh.cell_connectivity
+  assert np.array_equal(ours.cell_connectivity[:4 * n_tets], conn[:4 * n_tets])
+  assert np.array_equal(ours.cell_connectivity[4 * n_tets:].reshape(-1, 8), conn[4 * n_tets:].reshape(-1, 8)[:, [0, 1, 3, 2, 4, 5, 7, 6]])
+  assert np.array_equal(ours.cell_connectivity, _vtk_zone(path).cell_connectivity)
+  # same volume, the voxels came out as valid hexahedra
+  assert np.isclose(ours.volume, mesh.volume)
+
+def test_write_cgns_zone_node_order(tmp_path):
+  # HEXA_20 stores its mid-edge nodes in another order than vtk
+  points = np.random.default_rng(1).uniform(size=(20, 3))
+  mesh = pv.UnstructuredGrid({pv.CellType.QUADRATIC_HEXAHEDRON: np.arange(20)[None]}, points)
+  path = str(tmp_path / "hex20.cgns")
+  write_cgns_zone(path, mesh)
+  assert np.array_equal(read_cgns_zone(path).cell_connectivity, np.arange(20))
+  with pytest.raises(NotImplementedError):
+    write_cgns_zone(path, pv.UnstructuredGrid({pv.CellType.QUADRATIC_WEDGE: np.arange(15)[None]}, points[:15]))
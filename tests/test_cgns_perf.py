@@ -0,0 +1,247 @@
+import os
+import shutil
+import numpy as np
+import pytest
+import pyvista as pv
+import cgns_perf
+from cgns_perf import (
+  ArrayCache,
+  export_surface_buffers,
+  index_map_key,
+  nn_index_map,
+  read_bin_file,
+  topology_key,
+  write_bin_file,
+)
+from stress import PrincipalStressEngine
+
+def test_bin_file_roundtrip(tmp_path):
+  data = np.random.default_rng(0).normal(size=(7, 3))
+  path = str(tmp_path / "a.bin")
+  write_bin_file(path, data)
+  assert np.array_equal(read_bin_file(path, 3), data)
+  assert np.array_equal(read_bin_file(path, 3, mmap=False), data)
+  with pytest.raises(AssertionError):
+    read_bin_file(path, 4)
+
+def test_exact_index_map_accepts_only_provable_matches():
+  A = np.array([[0.0, 0.0, 0.0], [1.0, 1.0, 1.0], [0.5, 0.5, 0.5]])
+  # B[0] sits on A[2], B[1] is off every grid cell centre but next to A[1]
+  B = np.array([[0.5, 0.5, 0.5], [0.999, 0.999, 0.999]])
+  idx, dist, matched = cgns_perf._exact_index_map(A, B)
+  assert idx[0] == 2 and dist[0] == 0 and matched[0]
+  # not in A[1]'s grid cell, the matcher must leave it to the tree
+  assert not matched[1]
+
+def test_exact_index_map_margin_rule():
+  cell = 1.0 / ((1 << cgns_perf.EXACT_GRID_BITS) - 1)
+  # the [0, 1] cube spans the grid, A[2] is in the middle of grid cell 10
+  A = np.array([[0.0, 0.0, 0.0], [1.0, 1.0, 1.0], [10.5, 10.5, 10.5]])
+  A[2] *= cell
+  B = np.array([
+    # 0.02 cells from A[2], 0.48 cells from the nearest cell face: provable
+    [10.52, 10.5, 10.5],
+    # 0.45 cells from A[2] but 0.05 from the next cell, which could hold a
+    # nearer point
+    [10.95, 10.5, 10.5],
+  ]) * cell
+  idx, dist, matched = cgns_perf._exact_index_map(A, B)
+  assert (idx == 2).all()
+  assert matched[0]
+  assert not matched[1]
+
+def test_exact_index_map_rejects_shared_cells():
+  # two points of A in the same grid cell, neither is provably the nearest
+  eps = 1e-12
+  A = np.array([[0.0, 0.0, 0.0], [eps, 0.0, 0.0], [1.0, 1.0, 1.0]])
+  B = A[:1].copy()
+  _, _, matched = cgns_perf._exact_index_map(A, B)
+  assert not matched[0]
+
+def test_exact_and_tree_agree():
+  rng = np.random.default_rng(1)
+  A = rng.uniform(-5, 5, size=(2000, 3))
+  perm = rng.permutation(len(A))
+  # coincident points plus a few perturbed ones the tree has to resolve
+  B = A[perm].copy()
+  B[:50] += rng.normal(scale=1e-3, size=(50, 3))
+  idx_t, dist_t = nn_index_map(A, B, None, "tree")
+  idx_e, dist_e = nn_index_map(A, B, None, "exact")
+  assert np.array_equal(idx_t, idx_e)
+  assert np.allclose(dist_t, dist_e)
+  assert np.array_equal(idx_e[50:], perm[50:])
+
+def test_nn_index_map_tolerance_and_method():
+  A = np.zeros((1, 3))
+  B = np.ones((1, 3))
+  with pytest.raises(ValueError):
+    nn_index_map(A, B, 1e-9)
+  with pytest.raises(ValueError):
+    nn_index_map(A, A, None, "nope")
+
+def test_index_map_key():
+  A = np.arange(12, dtype=np.float64).reshape(4, 3)
+  B = A[::-1].copy()
+  key = index_map_key(A, B, 1e-9)
+  assert key == index_map_key(A.astype(np.float32), B, 1e-9)
+  assert key != index_map_key(B, A, 1e-9)
+  assert key != index_map_key(A, B, 1e-6)
+  assert key != index_map_key(A, B, None)
+  assert key == index_map_key(A, B, 1e-9, "tree")
+  assert key != index_map_key(A, B, 1e-9, "exact")
+  C = A.copy()
+  C[0, 0] += 1e-12
+  assert key != index_map_key(C, B, 1e-9)
+  # same bytes, different shape
+  assert index_map_key(A, B, 1e-9) != index_map_key(A.reshape(3, 4), B, 1e-9)
+
+def test_topology_key_ignores_coordinates():
+  mesh = pv.ImageData(dimensions=(3, 3, 3)).cast_to_unstructured_grid()
+  key = topology_key(mesh)
+  moved = mesh.copy()
+  moved.points = moved.points * 2 + 1
+  assert topology_key(moved) == key
+  assert topology_key(mesh.extract_cells(range(4)).cast_to_unstructured_grid()) != key
+
+def test_array_cache(tmp_path):
+  cache = ArrayCache(str(tmp_path / "cache"), max_bytes=1 << 20)
+  assert cache.get("a") is None
+  cache.put("a", {"x": np.arange(3), "y": np.ones(2)})
+  hit = cache.get("a")
+  assert set(hit) == {"x", "y"} and np.array_equal(hit["x"], np.arange(3))
+  cache.put("a", {"x": np.arange(4)})
+  # an entry is replaced whole
+  assert set(cache.get("a")) == {"x"}
+
+def test_array_cache_evicts_least_recently_used(tmp_path):
+  block = np.zeros(1000)
+  cache = ArrayCache(str(tmp_path / "cache"), max_bytes=int(2.5 * block.nbytes))
+  for key, mtime in (("a", 1), ("b", 2)):
+    cache.put(key, {"v": block})
+    os.utime(cache._entry(key), (mtime, mtime))
+  # a hit refreshes a, b is the oldest when c pushes the cache over budget
+  cache.get("a")
+  cache.put("c", {"v": block})
+  assert cache.get("b") is None
+  assert cache.get("a") is not None and cache.get("c") is not None
+
+def test_array_cache_hit_survives_concurrent_eviction(tmp_path, monkeypatch):
+  cache = ArrayCache(str(tmp_path / "cache"), max_bytes=1 << 20)
+  cache.put("a", {"x": np.arange(3)})
+  utime = os.utime
+  def evicted_first(path, *args, **kwargs):
+    # another process evicts the entry between the load and the refresh
+    shutil.rmtree(path)
+    return utime(path, *args, **kwargs)
+  monkeypatch.setattr(cgns_perf.os, "utime", evicted_first)
+  assert np.array_equal(cache.get("a")["x"], np.arange(3))
+  assert cache.entries() == []
+
+def test_cached_nn_index_map(tmp_path):
+  rng = np.random.default_rng(4)
+  A = rng.uniform(size=(100, 3))
+  B = A[::-1].copy()
+  cache = cgns_perf.IndexMapCache(str(tmp_path / "index"))
+  idx, dist = cgns_perf.cached_nn_index_map(A, B, cache=cache)
+  assert np.array_equal(idx, np.arange(100)[::-1])
+  assert len(cache.entries()) == 1
+  hit, _ = cgns_perf.cached_nn_index_map(A, B, cache=cache)
+  assert np.array_equal(hit, idx)
+  # other points, other entry
+  cgns_perf.cached_nn_index_map(A, B[:50], cache=cache)
+  assert len(cache.entries()) == 2
+
+def test_cached_nn_index_map_keys_on_method(tmp_path, monkeypatch):
+  A = np.random.default_rng(5).uniform(size=(100, 3))
+  cache = cgns_perf.IndexMapCache(str(tmp_path / "index"))
+  calls = []
+  nn = cgns_perf.nn_index_map
+  monkeypatch.setattr(cgns_perf, "nn_index_map", lambda A, B, tol, method: calls.append(method) or nn(A, B, tol, method))
+  cgns_perf.cached_nn_index_map(A, A, method="tree", cache=cache)
+  cgns_perf.cached_nn_index_map(A, A, method="exact", cache=cache)
+  cgns_perf.cached_nn_index_map(A, A, method="tree", cache=cache)
+  cgns_perf.cached_nn_index_map(A, A, method="exact", cache=cache)
+  # each matcher ran once, its entry served the second call
+  assert calls == ["tree", "exact"]
+  assert len(cache.entries()) == 2
+
+def _grid():
+  return pv.ImageData(dimensions=(3, 3, 3)).cast_to_unstructured_grid()
+
+def test_snapshot_applier_gathers_and_double_buffers():
+  mesh = _grid()
+  rng = np.random.default_rng(6)
+  idx = rng.permutation(mesh.n_points)
+  applier = cgns_perf.SnapshotApplier(mesh, idx, ncol=6)
+  first = rng.normal(scale=100, size=(mesh.n_points, 6))
+  scalars = applier.apply(first)
+  assert np.array_equal(mesh.point_data["stress"], first[idx])
+  assert np.array_equal(scalars, PrincipalStressEngine("SEQV").compute(first[idx]))
+  # the mesh holds the applier's buffers, not copies
+  assert np.shares_memory(mesh.point_data["stress"], applier.values)
+  assert np.shares_memory(mesh.point_data["pstress"], applier.scalars)
+  front = applier.values
+  second = rng.normal(scale=100, size=(mesh.n_points, 6))
+  applier.apply(second)
+  assert np.array_equal(mesh.point_data["stress"], second[idx])
+  # the other buffer is in front now, the previous step is still intact
+  assert not np.shares_memory(applier.values, front)
+  assert np.array_equal(front, first[idx])
+  applier.apply(first)
+  assert np.shares_memory(applier.values, front)
+
+def test_snapshot_applier_custom_derive(tmp_path):
+  mesh = _grid()
+  idx = np.arange(mesh.n_points)[::-1]
+  applier = cgns_perf.SnapshotApplier(mesh, idx, ncol=3, derive=lambda values, out: np.sum(values, axis=1, out=out))
+  data = np.arange(mesh.n_points * 3, dtype=np.float64).reshape(-1, 3)
+  path = str(tmp_path / "s.bin")
+  write_bin_file(path, data)
+  assert np.array_equal(applier.apply_file(path), data[idx].sum(axis=1))
+  with pytest.raises(AssertionError):
+    applier.apply(data[:, :2])
+  with pytest.raises(AssertionError):
+    cgns_perf.SnapshotApplier(mesh, idx + 1)
+
+def test_extract_surface_cached(tmp_path, monkeypatch):
+  mesh = _grid()
+  cache = cgns_perf.SurfaceCache(str(tmp_path / "surface"))
+  surface = cgns_perf.extract_surface(mesh, cache=cache)
+  # the 26 points around the centre, two triangles per face of the 8 cubes' hull
+  assert surface.n_points == 26 and surface.faces.shape == (48, 3)
+  assert np.array_equal(surface.scatter(mesh.points), mesh.points[surface.point_ids])
+  assert np.allclose(surface.polydata(mesh).points, mesh.points[surface.point_ids])
+  # a hit never runs the surface filter
+  monkeypatch.setattr(pv.UnstructuredGrid, "extract_surface", None)
+  moved = mesh.copy()
+  moved.points = moved.points * 2
+  hit = cgns_perf.extract_surface(moved, cache=cache)
+  assert np.array_equal(hit.point_ids, surface.point_ids) and np.array_equal(hit.faces, surface.faces)
+
+def test_surface_buffers():
+  mesh = _grid()
+  points = mesh.points.astype(np.float64)
+  surface = cgns_perf.Surface(np.array([4, 0, 26, 13]), np.array([[0, 1, 2], [1, 2, 3]]))
+  scalars = np.arange(mesh.n_points * 2, dtype=np.float64).reshape(-1, 2)
+
+  indices = surface.index_buffer()
+  assert indices.dtype == np.uint32 and indices.flags.c_contiguous
+  assert surface.index_buffer() is indices
+  vertices = surface.vertex_buffer(points)
+  assert vertices.dtype == np.float32 and vertices.flags.c_contiguous
+  assert np.array_equal(vertices, points[surface.point_ids].astype(np.float32))
+  out = np.empty((4, 3), dtype=np.float32)
+  assert surface.vertex_buffer(points, out=out) is out
+  interleaved = surface.interleaved_buffer(points, scalars)
+  assert interleaved.shape == (4, 5) and interleaved.dtype == np.float32 and interleaved.flags.c_contiguous
+  assert np.array_equal(interleaved[:, 3:], scalars[surface.point_ids])
+  # one component comes out as one column
+  assert surface.interleaved_buffer(points, scalars[:, 0]).shape == (4, 4)
+
+  buffers = export_surface_buffers(surface, points, as_memoryview=True)
+  assert set(buffers) == {"vertices", "indices"}
+  assert buffers["vertices"].format == "f" and buffers["vertices"].shape == (4, 3) and buffers["vertices"].c_contiguous
+  assert buffers["indices"].format == "I" and buffers["indices"].shape == (2, 3)
+  buffers = export_surface_buffers(surface, points, scalars)
+  assert set(buffers) == {"interleaved", "indices"}
+  assert np.array_equal(buffers["interleaved"], interleaved)
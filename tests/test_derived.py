@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+from derived import DerivedFields
+
+@pytest.fixture
+def frames():
+  rng = np.random.default_rng(3)
+  frames = []
+  for _ in range(3):
+    u, v = rng.standard_normal((2, 50))
+    # a zero vector, normalized it stays zero instead of nan
+    u[7] = v[7] = 0.0
+    frames.append({"SV_U": u, "SV_V": v})
+  return frames
+
+def _unit(v):
+  mag = np.linalg.norm(v, axis=1, keepdims=True)
+  return np.divide(v, mag, out=np.zeros_like(v), where=mag > 0)
+
+def test_derived_fields_match_numpy(frames):
+  fields = DerivedFields()
+  fields.stack("Velocity", ("SV_U", "SV_V", 0.5))
+  fields.magnitude("Speed", ("SV_U", "SV_V", 0.5))
+  fields.magnitude("VelocityMag", ("Velocity",))
+  fields.normalized("Direction", ("SV_U", "SV_V", 0.0))
+  fields.normalized("VelocityDir", ("Velocity",), n_component=3)
+  fields.expression("Speed2D", ("SV_U", "SV_V"), np.hypot)
+  for i, frame in enumerate(frames):
+    u, v = frame["SV_U"], frame["SV_V"]
+    velocity = np.stack([u, v, np.full_like(u, 0.5)], axis=1)
+    get = lambda name: fields.get(i, name, frame.__getitem__)
+    assert np.array_equal(get("Velocity"), velocity)
+    assert np.allclose(get("Speed"), np.linalg.norm(velocity, axis=1))
+    assert np.allclose(get("VelocityMag"), np.linalg.norm(velocity, axis=1))
+    direction = get("Direction")
+    assert np.allclose(direction, _unit(np.stack([u, v, np.zeros_like(u)], axis=1)))
+    assert not np.isnan(direction).any() and np.array_equal(direction[7], [0, 0, 0])
+    assert np.allclose(get("VelocityDir"), _unit(velocity))
+    assert np.allclose(get("Speed2D"), np.hypot(u, v))
+
+def test_derived_fields_need_an_array_input():
+  fields = DerivedFields()
+  fields.magnitude("Constant", (3.0, 4.0))
+  with pytest.raises(ValueError, match="at least one array"):
+    fields.get(0, "Constant", {}.__getitem__)
+  with pytest.raises(ValueError, match="depends on itself"):
+    fields.stack("Loop", ("Loop", "SV_U"))
+  with pytest.raises(ValueError, match="n_component"):
+    fields.normalized("Dir", ("Velocity",))
+
+def test_derived_fields_memo_hit_returns_the_same_buffer(frames):
+  fields = DerivedFields()
+  fields.magnitude("Speed", ("SV_U", "SV_V"))
+  calls = []
+  def source(name):
+    calls.append(name)
+    return frames[0][name]
+  first = fields.get(0, "Speed", source)
+  assert fields.get(0, "Speed", source) is first
+  assert (fields.hits, fields.misses) == (1, 1)
+  assert calls == ["SV_U", "SV_V"]
+
+def test_derived_fields_nested_input_survives_eviction(frames):
+  # room for less than one result, everything but the field just computed is evicted
+  fields = DerivedFields(budget_bytes=1)
+  fields.normalized("Velocity", ("SV_U", "SV_V", 0.0))
+  fields.expression("Velocity_Inverted", ("Velocity",), np.negative, n_component=3)
+  for i, frame in enumerate(frames):
+    expected = -_unit(np.stack([frame["SV_U"], frame["SV_V"], np.zeros(50)], axis=1))
+    assert np.allclose(fields.get(i, "Velocity_Inverted", frame.__getitem__), expected)
+    # Velocity was the input, evicted once the outer field was done
+    assert fields.nbytes == expected.nbytes
+
+def test_derived_fields_invalidate_frees_buffers(frames):
+  fields = DerivedFields()
+  fields.magnitude("Speed", ("SV_U", "SV_V"))
+  buffers = [fields.get(i, "Speed", frame.__getitem__) for i, frame in enumerate(frames)]
+  fields.invalidate(frame=1)
+  assert fields.nbytes == 2 * buffers[0].nbytes
+  assert fields.get(0, "Speed", frames[0].__getitem__) is buffers[0]
+  fields.invalidate()
+  assert fields.nbytes == 0
+  free = fields._free[(buffers[0].shape, buffers[0].dtype)]
+  assert sorted(map(id, free)) == sorted(map(id, buffers))
+  # the next results reuse the freed buffers
+  again = fields.get(1, "Speed", frames[1].__getitem__)
+  assert any(again is b for b in buffers)
+  assert np.allclose(again, np.hypot(frames[1]["SV_U"], frames[1]["SV_V"]))
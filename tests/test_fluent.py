@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+import pyvista as pv
+from fluent import attach_cell_data
+from test_fluent_io import write_dat
+
+def test_attach_cell_data_places_sections(tmp_path):
+  mesh = pv.ImageData(dimensions=(4, 3, 2)).cast_to_unstructured_grid()
+  assert mesh.n_cells == 6
+  p = np.arange(1.0, 7.0)
+  path = str(tmp_path / "FFF.dat.h5")
+  # two cell zones written out of id order, SV_V only on the second
+  write_dat(path, {
+    "SV_P": [(4, 6, p[3:]), (1, 3, p[:3])],
+    "SV_V": [(4, 6, -p[3:])],
+  })
+  dat = attach_cell_data(mesh, path, fields=("SV_P", "SV_V"))
+  assert set(dat.cell_data) == {"SV_P", "SV_V"}
+  assert np.array_equal(mesh.cell_data["SV_P"], p)
+  assert np.array_equal(mesh.cell_data["SV_V"], [0, 0, 0, -4, -5, -6])
+
+def test_attach_cell_data_checks_the_mesh(tmp_path):
+  mesh = pv.ImageData(dimensions=(3, 2, 2)).cast_to_unstructured_grid()
+  path = str(tmp_path / "FFF.dat.h5")
+  write_dat(path, {"SV_P": [(1, 6, np.zeros(6))]})
+  with pytest.raises(ValueError, match="outside the mesh's 2 cells"):
+    attach_cell_data(mesh, path)
@@ -0,0 +1,89 @@
+import os
+import shutil
+import numpy as np
+import pytest
+import vtk
+import pyvista as pv
+from vtk.util import numpy_support
+from vtkmodules.vtkIOFLUENTCFF import vtkFLUENTCFFReader
+import fluent_case
+from fluent_case import read_case, topology_path
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+CASES = ["Fluent-result/FFF-5.cas.h5", "3D-Pipe/FFF.1-1.cas.h5"]
+
+@pytest.fixture(params=CASES)
+def case_file(request, tmp_path):
+  src = os.path.join(DATA_DIR, request.param)
+  if not os.path.exists(src):
+    pytest.skip(f"missing {request.param}")
+  # the topology sidecar is written next to the case, keep it out of data/
+  dst = tmp_path / os.path.basename(src)
+  shutil.copy(src, dst)
+  return str(dst)
+
+def _cells(grid):
+  cells = grid.GetCells()
+  return (
+    pv.wrap(grid).celltypes,
+    numpy_support.vtk_to_numpy(cells.GetOffsetsArray()),
+    numpy_support.vtk_to_numpy(cells.GetConnectivityArray()),
+  )
+
+def test_read_case_matches_vtk_reader(case_file):
+  reader = vtkFLUENTCFFReader()
+  reader.SetFileName(case_file)
+  reader.Update()
+  expected = reader.GetOutput().GetBlock(0)
+  mesh = read_case(case_file, cache=False)
+  assert mesh.GetNumberOfCells() == expected.GetNumberOfCells()
+  # vtk keeps float32 coordinates
+  assert np.allclose(np.asarray(mesh.points), numpy_support.vtk_to_numpy(expected.GetPoints().GetData()), rtol=1e-6, atol=0)
+  for ours, theirs in zip(_cells(mesh), _cells(expected)):
+    assert np.array_equal(ours, theirs)
+
+def test_read_case_cells_are_valid(case_file):
+  mesh = read_case(case_file, cache=False)
+  validator = vtk.vtkCellValidator()
+  validator.SetInputData(mesh)
+  validator.Update()
+  state = numpy_support.vtk_to_numpy(validator.GetOutput().GetCellData().GetArray("ValidityState"))
+  assert not state.any()
+
+def test_topology_sidecar(case_file, monkeypatch):
+  first = read_case(case_file)
+  sidecar = topology_path(case_file)
+  assert os.path.exists(sidecar)
+
+  # a current sidecar is used as is
+  def no_build(mesh):
+    raise AssertionError("topology rebuilt")
+  monkeypatch.setattr(fluent_case, "_build_topology", no_build)
+  cached = read_case(case_file)
+  assert np.array_equal(np.asarray(cached.points), np.asarray(first.points))
+  for a, b in zip(_cells(cached), _cells(first)):
+    assert np.array_equal(a, b)
+  with pytest.raises(AssertionError, match="rebuilt"):
+    read_case(case_file, rebuild=True)
+  monkeypatch.undo()
+
+  # a touched case file invalidates it
+  st = os.stat(case_file)
+  os.utime(case_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+  built = []
+  build = fluent_case._build_topology
+  monkeypatch.setattr(fluent_case, "_build_topology", lambda mesh: built.append(1) or build(mesh))
+  read_case(case_file)
+  read_case(case_file)
+  assert built == [1]
+
+  # so does a corrupt one
+  with open(sidecar, "wb") as f:
+    f.write(b"not a zip")
+  read_case(case_file)
+  assert built == [1, 1]
+
+def test_case_key_tracks_version(case_file, monkeypatch):
+  key = fluent_case._case_key(case_file)
+  monkeypatch.setattr(fluent_case, "TOPOLOGY_VERSION", fluent_case.TOPOLOGY_VERSION + 1)
+  assert not np.array_equal(key, fluent_case._case_key(case_file))
@@ -0,0 +1,72 @@
+import glob
+import json
+import os
+import shutil
+import pytest
+import fluent_catalog
+from fluent_catalog import CATALOG_NAME, build_catalog, frame_at
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "Fluent-result")
+
+@pytest.fixture
+def project(tmp_path):
+  files = sorted(glob.glob(os.path.join(DATA_DIR, "FFF-6-*.dat.h5")))[:3]
+  if len(files) < 3:
+    pytest.skip("no Fluent sample data")
+  for f in files:
+    shutil.copy(f, tmp_path)
+  return str(tmp_path)
+
+def test_frame_at():
+  times = [0.0, 1.0, 1.0, 3.0]
+  assert frame_at(times, -1) == 0
+  assert frame_at(times, 0.5) == 0
+  # the last of the repeated steps
+  assert frame_at(times, 1.0) == 2
+  assert frame_at(times, 10) == 3
+
+def test_catalog_orders_by_flow_time(project):
+  entries = build_catalog(project)
+  assert len(entries) == 3
+  times = [e.flow_time for e in entries]
+  assert times == sorted(times)
+  assert all(os.path.isabs(e.path) or e.path.startswith(project) for e in entries)
+  assert "SV_P" in entries[0].fields
+  with open(os.path.join(project, CATALOG_NAME)) as f:
+    index = json.load(f)
+  assert index["version"] == fluent_catalog.CATALOG_VERSION
+  # relative paths, the project directory can move
+  assert not any(os.path.isabs(e["path"]) for e in index["entries"])
+
+def test_catalog_rereads_only_changed_files(project, monkeypatch):
+  entries = build_catalog(project)
+  index_path = os.path.join(project, CATALOG_NAME)
+  mtime = os.stat(index_path).st_mtime_ns
+
+  read = []
+  read_entry = fluent_catalog.read_entry
+  monkeypatch.setattr(fluent_catalog, "read_entry", lambda path: read.append(path) or read_entry(path))
+  assert [e.path for e in build_catalog(project)] == [e.path for e in entries]
+  assert read == []
+  # nothing changed, the index is not rewritten
+  assert os.stat(index_path).st_mtime_ns == mtime
+
+  touched = entries[1].path
+  st = os.stat(touched)
+  os.utime(touched, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+  build_catalog(project)
+  assert read == [touched]
+
+  os.remove(entries[0].path)
+  assert [e.path for e in build_catalog(project)] == [e.path for e in entries[1:]]
+  with open(index_path) as f:
+    assert len(json.load(f)["entries"]) == 2
+
+def test_catalog_ignores_other_versions(project, monkeypatch):
+  build_catalog(project)
+  monkeypatch.setattr(fluent_catalog, "CATALOG_VERSION", fluent_catalog.CATALOG_VERSION + 1)
+  read = []
+  read_entry = fluent_catalog.read_entry
+  monkeypatch.setattr(fluent_catalog, "read_entry", lambda path: read.append(path) or read_entry(path))
+  build_catalog(project)
+  assert len(read) == 3
@@ -0,0 +1,126 @@
+import glob
+import os
+import h5py
+import numpy as np
+import pytest
+from fluent_io import FluentData, LazyArray, NamedArray, ScatterPlan, Section, load_dat_file
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "Fluent-result")
+
+def frame(sections, n_component=1, name="SV_P"):
+  return FluentData(1, {name: NamedArray(name, n_component, [Section(lo, hi, np.asarray(d)) for lo, hi, d in sections])})
+
+def test_scatter_plan_places_sections():
+  # two cell zones, listed out of cell order, cell 5 has no value
+  dat = frame([(6, 8, [6.0, 7.0, 8.0]), (1, 4, [1.0, 2.0, 3.0, 4.0])])
+  plan = ScatterPlan.from_frame(dat, 8)
+  assert plan.shape("SV_P") == (8,)
+  out = np.full(8, -1.0)
+  plan.scatter(dat.cell_data["SV_P"], out)
+  assert out.tolist() == [1, 2, 3, 4, -1, 6, 7, 8]
+  assembled = plan.assemble(dat.cell_data["SV_P"], np.float32)
+  assert assembled.dtype == np.float32 and assembled.tolist() == [1, 2, 3, 4, 0, 6, 7, 8]
+
+def test_scatter_plan_vectors():
+  data = np.arange(12.0).reshape(4, 3)
+  dat = frame([(1, 4, data)], n_component=3, name="SV_V")
+  plan = ScatterPlan.from_frame(dat, 4)
+  assert plan.shape("SV_V") == (4, 3)
+  # a single section covering the mesh in the right dtype is returned as is
+  assert plan.assemble(dat.cell_data["SV_V"], np.float64) is dat.cell_data["SV_V"].sections[0].array
+  assert np.array_equal(plan.assemble(dat.cell_data["SV_V"], np.float32), data)
+
+def test_scatter_plan_rejects_bad_layouts():
+  with pytest.raises(ValueError, match="outside"):
+    ScatterPlan.from_frame(frame([(1, 5, np.zeros(5))]), 4)
+  with pytest.raises(ValueError, match="overlap"):
+    ScatterPlan.from_frame(frame([(1, 3, np.zeros(3)), (3, 4, np.zeros(2))]), 4)
+
+def test_scatter_plan_checks_every_frame():
+  plan = ScatterPlan.from_frame(frame([(1, 2, np.zeros(2)), (3, 4, np.zeros(2))]), 4)
+  out = np.zeros(4)
+  with pytest.raises(ValueError, match="moved"):
+    plan.scatter(frame([(1, 3, np.zeros(3)), (4, 4, np.zeros(1))]).cell_data["SV_P"], out)
+  with pytest.raises(ValueError, match="sections"):
+    plan.scatter(frame([(1, 4, np.zeros(4))]).cell_data["SV_P"], out)
+  with pytest.raises(ValueError, match="components"):
+    plan.scatter(frame([(1, 2, np.zeros((2, 2))), (3, 4, np.zeros((2, 2)))], n_component=2).cell_data["SV_P"], out)
+  with pytest.raises(ValueError, match="not in the scatter plan"):
+    plan.scatter(frame([(1, 4, np.zeros(4))], name="SV_U").cell_data["SV_U"], out)
+  with pytest.raises(ValueError, match="output shape"):
+    plan.scatter(frame([(1, 2, np.zeros(2)), (3, 4, np.zeros(2))]).cell_data["SV_P"], np.zeros(5))
+
+def test_named_array_requires_tiling():
+  arr = frame([(1, 2, [1.0, 2.0]), (4, 4, [4.0])]).cell_data["SV_P"]
+  with pytest.raises(ValueError, match="gap"):
+    arr.array
+  arr = frame([(3, 4, [3.0, 4.0]), (1, 2, [1.0, 2.0])]).cell_data["SV_P"]
+  assert arr.array.tolist() == [1, 2, 3, 4]
+
+def write_dat(path, fields, step=0, flow_time=0.0):
+  """a .dat.h5 with one phase, fields maps a name to its [(min_id, max_id, data)] sections"""
+  with h5py.File(path, "w") as f:
+    variables = f"(1 ((time-step {step}) (flow-time {flow_time!r})))"
+    f.create_dataset("settings/Data Variables", data=np.array([variables.encode()]))
+    cells = f.create_group("results/1/phase-1/cells")
+    cells.create_dataset("fields", data=np.array([";".join(fields).encode() + b";"]))
+    for name, sections in fields.items():
+      group = cells.create_group(name)
+      group.attrs["nSections"] = np.array([len(sections)], dtype=np.uint64)
+      for k, (lo, hi, data) in enumerate(sections, 1):
+        dset = group.create_dataset(str(k), data=np.asarray(data))
+        dset.attrs["minId"] = np.array([lo], dtype=np.uint64)
+        dset.attrs["maxId"] = np.array([hi], dtype=np.uint64)
+
+def test_load_dat_file_sections(tmp_path):
+  path = str(tmp_path / "a.dat.h5")
+  write_dat(path, {
+    "SV_P": [(4, 5, [4.0, 5.0]), (1, 3, [1.0, 2.0, 3.0])],
+    "SV_U": [(1, 5, np.ones((5, 3)))],
+    # declared for no zone
+    "SV_T": [],
+  })
+  dat = load_dat_file(path)
+  assert set(dat.cell_data) == {"SV_P", "SV_U"}
+  p = dat.cell_data["SV_P"]
+  assert p.n_component == 1
+  assert [(s.min_id, s.max_id) for s in p.sections] == [(4, 5), (1, 3)]
+  assert dat.cell_data["SV_U"].n_component == 3
+  assert load_dat_file(path, ["SV_T"]).cell_data == {}
+
+def test_load_dat_file_rejects_mixed_components(tmp_path):
+  path = str(tmp_path / "a.dat.h5")
+  write_dat(path, {"SV_U": [(1, 2, np.ones((2, 3))), (3, 4, np.ones(2))]})
+  with pytest.raises(ValueError, match="components"):
+    load_dat_file(path)
+  write_dat(path, {"SV_P": [(1, 3, np.ones(2))]})
+  with pytest.raises(ValueError, match="rows"):
+    load_dat_file(path)
+
+@pytest.fixture
+def dat_file():
+  files = sorted(glob.glob(os.path.join(DATA_DIR, "*.dat.h5")))
+  if not files:
+    pytest.skip("no Fluent sample data")
+  return files[0]
+
+def test_load_dat_file_lazy_and_filtered(dat_file):
+  lazy = load_dat_file(dat_file, ["SV_U", "SV_P"])
+  assert set(lazy.cell_data) == {"SV_U", "SV_P"}
+  section = lazy.cell_data["SV_P"].sections[0]
+  assert isinstance(section.data, LazyArray) and not section.data.loaded
+  eager = load_dat_file(dat_file, ["SV_U", "SV_P"], lazy=False)
+  assert eager.cell_data["SV_P"].sections[0].data.loaded
+  for name in ("SV_U", "SV_P"):
+    assert np.array_equal(lazy.cell_data[name].array, eager.cell_data[name].array)
+  lazy.release()
+  assert not section.data.loaded
+
+def test_load_dat_file_converts_dtype(dat_file):
+  f64 = load_dat_file(dat_file, ["SV_P"])
+  f32 = load_dat_file(dat_file, ["SV_P"], np.float32)
+  a32 = f32.cell_data["SV_P"].array
+  assert a32.dtype == np.float32
+  assert np.allclose(a32, f64.cell_data["SV_P"].array, rtol=1e-6)
+  # read straight into the float32 buffer, the header size is the converted one
+  assert f32.nbytes == a32.nbytes
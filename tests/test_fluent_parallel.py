@@ -0,0 +1,68 @@
+import glob
+import os
+import numpy as np
+import pytest
+from multiprocessing import shared_memory
+from fluent_parallel import ParallelFrameLoader
+from fluent_io import ScatterPlan, load_dat_file
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "Fluent-result")
+FIELDS = ["SV_U", "SV_P"]
+
+@pytest.fixture(scope="module")
+def series():
+  files = sorted(glob.glob(os.path.join(DATA_DIR, "FFF-6-*.dat.h5")))[:6]
+  if not files:
+    pytest.skip("no Fluent sample data")
+  first = load_dat_file(files[0], FIELDS)
+  n_cells = max(s.max_id for arr in first.cell_data.values() for s in arr.sections)
+  plan = ScatterPlan.from_frame(first, n_cells)
+  expected = []
+  for f in files:
+    dat = load_dat_file(f, FIELDS, np.float32)
+    expected.append({name: plan.assemble(arr, np.float32) for name, arr in dat.cell_data.items()})
+  return files, plan, expected
+
+def test_parallel_loader_matches_serial(series):
+  files, plan, expected = series
+  # fewer slots than frames, every slot is reused
+  with ParallelFrameLoader(files, plan, FIELDS, n_slots=2, workers=1) as loader:
+    seen = []
+    for index, slot in loader.imap(range(len(files))):
+      seen.append(index)
+      for name, array in loader.arrays(slot).items():
+        assert np.array_equal(array, expected[index][name]), (index, name)
+      loader.release(slot)
+    assert seen == list(range(len(files)))
+    slot = loader.load(3)
+    assert np.array_equal(loader.arrays(slot)["SV_P"], expected[3]["SV_P"])
+    loader.release(slot)
+
+def test_parallel_loader_abandoned_imap_returns_slots(series):
+  files, plan, _ = series
+  with ParallelFrameLoader(files, plan, FIELDS, n_slots=3, workers=1) as loader:
+    it = loader.imap(range(len(files)))
+    index, slot = next(it)
+    loader.release(slot)
+    it.close()
+    assert loader._slots.n_free == 3
+
+def test_parallel_loader_failed_decode_returns_slot(series, tmp_path):
+  files, plan, _ = series
+  broken = str(tmp_path / "broken.dat.h5")
+  with open(broken, "wb") as f:
+    f.write(b"not hdf5")
+  with ParallelFrameLoader([files[0], broken], plan, FIELDS, n_slots=1, workers=1) as loader:
+    with pytest.raises(OSError):
+      loader.load(1)
+    # the only slot is free again
+    loader.release(loader.load(0))
+
+def test_parallel_loader_unlinks_shared_memory(series):
+  files, plan, _ = series
+  loader = ParallelFrameLoader(files, plan, FIELDS, n_slots=2, workers=1)
+  names = [ring.shm.name for ring in loader._ring.values()]
+  loader.close()
+  for name in names:
+    with pytest.raises(FileNotFoundError):
+      shared_memory.SharedMemory(name=name)
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from fluent_io import load_dat_file
+from fluent_store import FluentStore, pack_series
+from test_fluent_io import write_dat
+
+N_CELLS = 9
+
+def _frame(k):
+  """two cell zones, listed out of order; SV_T only on the fluid zone, cell 9 is in none"""
+  p = np.arange(1.0, 9.0) + 10 * k
+  u = np.stack([p, -p, 2 * p], axis=1)
+  return {
+    "SV_P": [(5, 8, p[4:]), (1, 4, p[:4])],
+    "SV_U": [(5, 8, u[4:]), (1, 4, u[:4])],
+    "SV_T": [(1, 4, p[:4] + 0.5)],
+  }
+
+@pytest.fixture
+def series(tmp_path):
+  paths = []
+  for k in range(5):
+    path = str(tmp_path / f"FFF-{k}.dat.h5")
+    write_dat(path, _frame(k), step=10 * k, flow_time=0.25 * k)
+    paths.append(path)
+  return paths
+
+@pytest.mark.parametrize("output", ["series.h5", "series"])
+def test_pack_series_roundtrip(series, tmp_path, output):
+  path = pack_series(series, str(tmp_path / output), n_cells=N_CELLS, dtype=np.float64, frames_per_chunk=2)
+  with FluentStore(path) as store:
+    assert store.n_frames == 5
+    assert store.steps.tolist() == [0, 10, 20, 30, 40]
+    assert np.allclose(store.flow_times, [0, 0.25, 0.5, 0.75, 1.0])
+    assert set(store.fields) == {"SV_P", "SV_U", "SV_T"}
+    assert store.n_components("SV_U") == 3 and np.isnan(store.fill_value)
+    for k in range(5):
+      frame = store.frame(k)
+      expected = _frame(k)
+      for name, sections in expected.items():
+        assert frame[name].shape[0] == N_CELLS
+        covered = np.zeros(N_CELLS, dtype=bool)
+        for lo, hi, data in sections:
+          assert np.array_equal(frame[name][lo - 1:hi], data), (k, name)
+          covered[lo - 1:hi] = True
+        # cells of zones without the field hold the fill value
+        assert np.isnan(frame[name][~covered]).all()
+    history = store.history("SV_P", [0, 7])
+    assert np.array_equal(history, [[1.0 + 10 * k, 8.0 + 10 * k] for k in range(5)])
+    # a store frame loads as one full-mesh section
+    dat = load_dat_file(f"{path}#3", ["SV_U"])
+    (section,) = dat.cell_data["SV_U"].sections
+    assert (section.min_id, section.max_id) == (1, N_CELLS)
+    assert np.array_equal(section.array, store.frame(3)["SV_U"], equal_nan=True)
+
+def test_pack_series_checks_the_layout(series, tmp_path):
+  # the default cell count is the highest cell id, 8
+  with FluentStore(pack_series(series, str(tmp_path / "s.h5"), fill_value=-1.0)) as store:
+    assert store.frame(0)["SV_T"].tolist() == [1.5, 2.5, 3.5, 4.5, -1, -1, -1, -1]
+  moved = _frame(5)
+  moved["SV_P"] = [(1, 8, np.arange(8.0))]
+  write_dat(series[-1], moved)
+  with pytest.raises(ValueError, match="FFF-4.dat.h5: SV_P"):
+    pack_series(series, str(tmp_path / "t.h5"))
+  with pytest.raises(ValueError, match="not found"):
+    pack_series(series, str(tmp_path / "u.h5"), fields=["SV_X"])
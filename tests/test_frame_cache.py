@@ -0,0 +1,181 @@
+import threading
+import pytest
+from frame_cache import FrameCache
+
+class Frame:
+  def __init__(self, index: int, nbytes: int = 10):
+    self.index = index
+    self.nbytes = nbytes
+
+  def __repr__(self):
+    return f"Frame({self.index})"
+
+class Loader:
+  def __init__(self):
+    self.loads = []
+    self.lock = threading.Lock()
+
+  def __call__(self, i: int) -> Frame:
+    with self.lock:
+      self.loads.append(i)
+    return Frame(i)
+
+def make_cache(n_frames=10, budget_frames=3, prefetch=0, **kwargs):
+  loader = Loader()
+  evicted = []
+  cache = FrameCache(
+    loader, n_frames, budget_bytes=budget_frames * 10, prefetch=prefetch,
+    on_evict=evicted.append, **kwargs,
+  )
+  return cache, loader, evicted
+
+def test_hits_and_misses():
+  cache, loader, _ = make_cache()
+  with cache:
+    a = cache.get(1)
+    assert cache.get(1) is a
+    assert loader.loads == [1]
+    assert cache.stats.hits == 1 and cache.stats.misses == 1
+    with pytest.raises(IndexError):
+      cache.get(10)
+
+def test_evicts_least_recently_used_within_budget():
+  cache, _, evicted = make_cache(budget_frames=3)
+  with cache:
+    for i in (0, 1, 2):
+      cache.get(i)
+    # 0 used again, 1 is the oldest
+    cache.get(0)
+    cache.get(3)
+    assert 1 not in cache and {0, 2, 3} <= {i for i in range(10) if i in cache}
+    assert [f.index for f in evicted] == [1]
+    assert cache.nbytes <= cache.budget_bytes
+    assert cache.stats.evictions == 1
+
+def test_never_evicts_the_current_frame():
+  cache, _, evicted = make_cache(budget_frames=1)
+  with cache:
+    cache.get(0)
+    # loaded next to the current frame, over budget: the older one goes, not 0
+    cache.get(1, advance=False)
+    cache.get(2, advance=False)
+    assert 0 in cache
+    assert 0 not in [f.index for f in evicted]
+
+def test_advance_false_keeps_position_and_direction():
+  cache, _, _ = make_cache(prefetch=0)
+  with cache:
+    cache.get(5)
+    cache.get(4)
+    assert cache._current == 4 and cache._direction == -1
+    cache.get(9, advance=False)
+    assert cache._current == 4 and cache._direction == -1
+
+def test_prefetch_follows_playback_direction():
+  cache, loader, _ = make_cache(n_frames=20, budget_frames=20, prefetch=3)
+  with cache:
+    cache.get(10)
+    cache.get(11)
+    for future in list(cache._pending.values()):
+      future.result()
+    assert {12, 13, 14} <= {i for i in range(20) if i in cache}
+    cache.get(9)
+    for future in list(cache._pending.values()):
+      future.result()
+    assert {8, 7, 6} <= {i for i in range(20) if i in cache}
+    assert cache.get(12) is not None
+    assert loader.loads.count(12) == 1
+
+def test_prefetch_wraps_when_looping():
+  cache, _, _ = make_cache(n_frames=5, budget_frames=5, prefetch=2)
+  with cache:
+    cache.get(3)
+    cache.get(4)
+    for future in list(cache._pending.values()):
+      future.result()
+    assert 0 in cache and 1 in cache
+
+def test_on_evict_clear_and_duplicates():
+  cache, _, evicted = make_cache(budget_frames=5)
+  with cache:
+    first = cache.get(2)
+    # a second load of a cached frame (a miss racing the prefetch) keeps the
+    # first copy and hands the duplicate to on_evict
+    duplicate = Frame(2)
+    assert cache._insert(2, duplicate) is first
+    assert evicted == [duplicate]
+    cache.get(3)
+    cache.clear()
+    assert len(cache) == 0 and cache.nbytes == 0
+    assert {f.index for f in evicted[1:]} == {2, 3}
+
+def test_failed_load_is_retried():
+  calls = []
+  def loader(i):
+    calls.append(i)
+    if len(calls) == 1:
+      raise OSError("flaky")
+    return Frame(i)
+  with FrameCache(loader, 3, budget_bytes=100, prefetch=0) as cache:
+    with pytest.raises(OSError):
+      cache.get(0)
+    assert cache.get(0).index == 0
+    assert calls == [0, 0]
+
+def test_pinned_frames_are_not_evicted():
+  cache, _, evicted = make_cache(budget_frames=1)
+  with cache:
+    cache.get(0, advance=False, pin=True)
+    cache.get(1)
+    cache.get(2)
+    # 0 is kept over budget, the unpinned 1 goes
+    assert 0 in cache and cache.pinned(0)
+    assert [f.index for f in evicted] == [1]
+    # the last pin gone, the budget is enforced again
+    cache.unpin(0)
+    assert 0 not in cache and [f.index for f in evicted] == [1, 0]
+    with pytest.raises(ValueError):
+      cache.unpin(0)
+
+def test_pins_are_counted():
+  cache, _, evicted = make_cache(budget_frames=1)
+  with cache:
+    cache.get(0, advance=False, pin=True)
+    cache.get(0, advance=False, pin=True)
+    cache.unpin(0)
+    cache.get(1)
+    cache.get(2)
+    assert 0 in cache
+    cache.unpin(0)
+    assert not cache.pinned(0) and 0 not in cache
+
+def test_on_evict_never_sees_a_pinned_frame():
+  # like the playback: a slot goes back to the loader on evict, the frames
+  # being read are pinned
+  released = []
+  cache = None
+  def on_evict(frame):
+    assert not cache.pinned(frame.index), frame
+    released.append(frame.index)
+  # no prefetch, on_evict runs on this thread and its assert fails the test
+  cache = FrameCache(Loader(), 20, budget_bytes=20, prefetch=0, on_evict=on_evict)
+  with cache:
+    bound = None
+    for i in list(range(20)) * 2:
+      cache.get(i, pin=True)
+      for k in ((i + 1) % 20, (i + 5) % 20):
+        cache.get(k, advance=False, pin=True)
+        cache.unpin(k)
+      if bound is not None:
+        cache.unpin(bound)
+      bound = i
+    cache.unpin(bound)
+    assert not cache._pins and released
+
+def test_failed_pinned_load_drops_the_pin():
+  def loader(i):
+    raise OSError("broken")
+  with FrameCache(loader, 3, budget_bytes=100, prefetch=0) as cache:
+    with pytest.raises(OSError):
+      cache.get(0, pin=True)
+    assert not cache.pinned(0)
@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+from scipy.interpolate import PchipInterpolator
+from frame_cache import FrameCache
+from frame_interp import FrameInterpolator
+
+def make_interp(times, values, method):
+  """frames are {"v": (n_cells,) float64} with values[i] at times[i]"""
+  values = np.asarray(values, dtype=np.float64)
+  cache = FrameCache(lambda i: {"v": values[i]}, len(times), budget_bytes=1 << 20, prefetch=0, sizeof=lambda f: f["v"].nbytes)
+  return cache, FrameInterpolator(cache, times, lambda frame: frame, method)
+
+def series(times, n_cells=16, seed=0):
+  rng = np.random.default_rng(seed)
+  return np.cumsum(rng.normal(size=(len(times), n_cells)), axis=0)
+
+def test_linear_matches_np_interp():
+  times = [0.0, 0.5, 1.5, 2.0, 4.0]
+  values = series(times)
+  cache, interp = make_interp(times, values, "linear")
+  with cache:
+    for t in np.linspace(-1, 5, 61):
+      out = interp.sample(t)["v"]
+      expected = [np.interp(t, times, values[:, c]) for c in range(values.shape[1])]
+      assert np.allclose(out, expected)
+
+def test_cubic_matches_pchip():
+  times = [0.0, 0.5, 1.5, 2.0, 4.0, 4.2]
+  values = series(times, seed=1)
+  cache, interp = make_interp(times, values, "cubic")
+  # scipy's end slopes differ, compare the interior intervals
+  pchip = PchipInterpolator(times, values, axis=0)
+  with cache:
+    for t in np.linspace(times[1], times[-2], 41):
+      assert np.allclose(interp.sample(t)["v"], pchip(t)), t
+
+def test_cubic_does_not_overshoot():
+  times = [0.0, 1.0, 2.0, 3.0]
+  # a step, a cubic through it would ring below 0 and above 1
+  values = np.array([[0.0], [0.0], [1.0], [1.0]])
+  cache, interp = make_interp(times, values, "cubic")
+  with cache:
+    samples = [interp.sample(t)["v"][0] for t in np.linspace(0, 3, 31)]
+  assert min(samples) >= 0 and max(samples) <= 1
+
+def test_hits_frames_exactly_and_reuses_buffers():
+  times = [0.0, 1.0, 2.0]
+  values = series(times)
+  cache, interp = make_interp(times, values, "cubic")
+  with cache:
+    first = interp.sample(1.0)["v"]
+    assert np.array_equal(first, values[1])
+    second = interp.sample(1.5)["v"]
+    # written into the same buffer, never into a frame
+    assert second is first
+    assert np.array_equal(cache.get(1, advance=False)["v"], values[1])
+
+def test_repeated_times():
+  times = [0.0, 1.0, 1.0, 2.0, 3.0]
+  values = series(times)
+  cache, interp = make_interp(times, values, "linear")
+  with cache:
+    assert interp.bracket(1.0) == (2, 3, 0.0)
+    # between the repeated step and the next one, blends from the later copy
+    assert np.allclose(interp.sample(1.5)["v"], 0.5 * (values[2] + values[3]))
+  # the cubic's outer neighbour skips the repeated step, like pchip over the
+  # series without it
+  unique = [0, 2, 3, 4]
+  pchip = PchipInterpolator(np.asarray(times)[unique], values[unique], axis=0)
+  cache, interp = make_interp(times, values, "cubic")
+  with cache:
+    for t in (1.25, 1.5, 1.75):
+      assert np.allclose(interp.sample(t)["v"], pchip(t))
+
+def test_validates_times():
+  cache = FrameCache(lambda i: {}, 3, budget_bytes=1)
+  with cache:
+    with pytest.raises(ValueError):
+      FrameInterpolator(cache, [0.0, 1.0], lambda f: f)
+    with pytest.raises(ValueError):
+      FrameInterpolator(cache, [0.0, 2.0, 1.0], lambda f: f)
+    with pytest.raises(ValueError):
+      FrameInterpolator(cache, [0.0, 1.0, 2.0], lambda f: f, "quadratic")
+
+@pytest.mark.parametrize("method", ["linear", "cubic"])
+def test_frames_are_not_recycled_while_blended(method):
+  times = [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+  values = series(times, seed=2)
+  # budget for one frame, an evicted frame's buffer is overwritten like a
+  # shared-memory slot handed to the next load
+  def poison(frame):
+    frame["v"][:] = np.nan
+  cache = FrameCache(
+    lambda i: {"v": values[i].copy()}, len(times), budget_bytes=values[0].nbytes,
+    prefetch=0, sizeof=lambda f: f["v"].nbytes, on_evict=poison,
+  )
+  interp = FrameInterpolator(cache, times, lambda frame: frame, method)
+  ref = FrameInterpolator(make_interp(times, values, method)[0], times, lambda frame: frame, method)
+  with cache, ref.cache:
+    for t in np.linspace(0, 5, 23):
+      out = interp.sample(t)["v"]
+      assert np.isfinite(out).all(), t
+      assert np.allclose(out, ref.sample(t)["v"]), t
+      assert not cache._pins
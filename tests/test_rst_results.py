@@ -0,0 +1,155 @@
+import os
+import shutil
+import numpy as np
+import pytest
+from ansys.mapdl import reader as pymapdl_reader
+import rst_results
+from rst_results import DeformedView, RangeStats, displacements, principal_stress
+
+RST = os.path.join(os.path.dirname(__file__), "..", "data", "file_1.rst")
+
+def test_range_stats_percentiles():
+  rng = np.random.default_rng(0)
+  stats = RangeStats(4096)
+  chunks = []
+  # ranges that keep growing on both sides, every update may merge bins
+  for k in range(40):
+    c = rng.lognormal(k * 0.05, 1, 2000) * (1 if k % 2 else -0.1)
+    chunks.append(c)
+    stats.update(c)
+  values = np.concatenate(chunks)
+  assert stats.count == values.size
+  assert stats.min == values.min() and stats.max == values.max()
+  width = (values.max() - values.min()) / 4096 * 2
+  for q in (0, 1, 25, 50, 75, 99, 100):
+    assert abs(stats.percentile(q) - np.percentile(values, q)) <= width, q
+
+def test_range_stats_merges_bins_without_losing_counts():
+  stats = RangeStats(8)
+  stats.update(np.array([0.0, 1.0, 2.0, 3.0]))
+  lo, width = stats.lo, stats.width
+  stats.update(np.array([100.0]))
+  assert stats.width > width and stats.lo == lo
+  stats.update(np.array([-50.0]))
+  assert stats.lo < lo
+  assert stats.count == 6
+  assert stats.lo <= -50 and stats.lo + 8 * stats.width > 100
+
+def test_range_stats_constant_and_empty():
+  stats = RangeStats(8)
+  with pytest.raises(ValueError):
+    stats.percentile(50)
+  stats.update(np.array([]))
+  stats.update(np.full(10, 3.0))
+  assert stats.clim() == (3.0, 3.0)
+  stats.update(np.array([5.0]))
+  lo, hi = stats.clim(0, 100)
+  assert (lo, hi) == (3.0, 5.0)
+
+def test_range_stats_roundtrip():
+  stats = RangeStats(16)
+  stats.update(np.random.default_rng(1).normal(size=100))
+  again = RangeStats.from_dict(stats.to_dict())
+  assert np.array_equal(again.counts, stats.counts)
+  assert again.clim() == stats.clim()
+
+@pytest.fixture
+def rst(tmp_path):
+  if not os.path.exists(RST):
+    pytest.skip("no ANSYS sample data")
+  path = tmp_path / "file.rst"
+  shutil.copy(RST, path)
+  return pymapdl_reader.read_binary(str(path))
+
+def _touch(path):
+  st = os.stat(path)
+  os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+def test_displacements(rst):
+  disp = displacements(rst)
+  _, ref = rst.nodal_displacement(0)
+  assert disp.shape == (rst.nsets, rst.grid.n_points, 3) and disp.dtype == np.float32
+  assert np.allclose(disp[0], np.nan_to_num(ref[:, :3]))
+  nodes = np.arange(0, rst.grid.n_points, 7)
+  assert np.array_equal(displacements(rst, nodes=nodes), disp[:, nodes])
+
+def test_displacements_sidecar(rst, tmp_path, monkeypatch):
+  path = str(tmp_path / "disp.npy")
+  first = displacements(rst, path=path)
+  assert isinstance(first, np.memmap) and os.path.exists(f"{path}.json")
+
+  filled = []
+  fill = rst_results._fill
+  monkeypatch.setattr(rst_results, "_fill", lambda *a: filled.append(1) or fill(*a))
+  assert np.array_equal(displacements(rst, path=path), first)
+  assert filled == []
+  # another node subset is another array
+  displacements(rst, nodes=np.arange(10), path=path)
+  assert filled == [1]
+  displacements(rst, nodes=np.arange(1, 11), path=path)
+  assert filled == [1, 1]
+  _touch(rst.filename)
+  displacements(rst, nodes=np.arange(1, 11), path=path)
+  assert filled == [1, 1, 1]
+
+def test_deformed_view_leaves_the_grid_alone(rst):
+  disp = displacements(rst) * 1000
+  before = np.array(rst.grid.points)
+  view = DeformedView(rst.grid, disp)
+  grid = view.show(0, scale=2.0)
+  assert np.allclose(grid.points, before.astype(np.float32) + 2.0 * disp[0], atol=1e-5)
+  assert np.array_equal(rst.grid.points, before)
+  assert grid.n_cells == rst.grid.n_cells
+  # the same points object, only its buffer is rewritten
+  points = grid.GetPoints()
+  view.show(0, scale=0.0)
+  assert grid.GetPoints() is points
+  assert np.allclose(grid.points, before, atol=1e-5)
+
+def test_principal_stress_matches_mapdl(rst):
+  _, ref = rst.principal_nodal_stress(0)
+  ref = np.nan_to_num(ref)
+  for i, component in enumerate(("S1", "S2", "S3", "SINT", "SEQV")):
+    values, stats = principal_stress(rst, component, dtype=np.float64, workers=0)
+    assert np.allclose(values[0], ref[:, i], rtol=0, atol=1e-9 * np.abs(ref).max()), component
+    assert stats.min == values.min() and stats.max == values.max()
+
+def test_principal_stress_pool_and_sidecar(rst, tmp_path, monkeypatch):
+  sets = [0] * 5
+  serial, serial_stats = principal_stress(rst, "SEQV", sets=sets, workers=0)
+  path = str(tmp_path / "seqv.npy")
+  pooled, pooled_stats = principal_stress(rst, "SEQV", sets=sets, workers=2, path=path)
+  assert np.array_equal(serial, pooled)
+  assert np.array_equal(serial_stats.counts, pooled_stats.counts)
+
+  computed = []
+  compute = rst_results._principal_set
+  monkeypatch.setattr(rst_results, "_principal_set", lambda *a, **k: computed.append(1) or compute(*a, **k))
+  cached, cached_stats = principal_stress(rst, "SEQV", sets=sets, path=path)
+  assert computed == []
+  assert np.array_equal(cached, serial) and cached_stats.clim() == serial_stats.clim()
+  # a different component or an updated file is computed again
+  principal_stress(rst, "S1", sets=sets, workers=0, path=path)
+  assert len(computed) == 5
+  _touch(rst.filename)
+  principal_stress(rst, "S1", sets=sets, workers=0, path=path)
+  assert len(computed) == 10
+
+def test_principal_stress_serial_uses_the_open_reader(rst, monkeypatch):
+  def read_binary(filename):
+    raise AssertionError(f"{filename} opened again")
+  monkeypatch.setattr(rst_results.pymapdl_reader, "read_binary", read_binary)
+  values, _ = principal_stress(rst, "SEQV", sets=[0, 0], workers=0)
+  assert values.shape == (2, rst.grid.n_points)
+  assert rst_results.worker_state == {}
+
+def test_pool_workers_default_to_serial(monkeypatch):
+  monkeypatch.setattr(rst_results.os, "cpu_count", lambda: 8)
+  assert rst_results._pool_workers(None, 1) == 0
+  assert rst_results._pool_workers(None, rst_results.POOL_MIN_SETS - 1) == 0
+  assert rst_results._pool_workers(None, rst_results.POOL_MIN_SETS) == 8
+  # never more processes than sets
+  assert rst_results._pool_workers(4, 2) == 2
+  assert rst_results._pool_workers(0, 100) == 0
+  monkeypatch.setattr(rst_results.os, "cpu_count", lambda: 1)
+  assert rst_results._pool_workers(None, 1000) == 0
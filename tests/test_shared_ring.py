@@ -0,0 +1,106 @@
+import threading
+import time
+import numpy as np
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from shared_ring import SharedArray, SlotPool, imap_ordered, submit_slot
+
+class Ring:
+  """fill(slot, k) writes k into the slot, later tasks finish first"""
+  def __init__(self, n_slots, n_tasks):
+    self.array = np.full(n_slots, -1)
+    self.n_tasks = n_tasks
+    self.running = 0
+    self.max_running = 0
+    self.lock = threading.Lock()
+
+  def fill(self, slot, k):
+    with self.lock:
+      self.running += 1
+      self.max_running = max(self.max_running, self.running)
+    time.sleep(0.002 * (self.n_tasks - k) / self.n_tasks)
+    if k < 0:
+      raise OSError("broken")
+    self.array[slot] = k
+    with self.lock:
+      self.running -= 1
+    return slot
+
+def test_imap_ordered_yields_in_order():
+  ring = Ring(3, 20)
+  slots = SlotPool(3)
+  with ThreadPoolExecutor(4) as pool:
+    seen = []
+    for k, slot in imap_ordered(pool, slots, ring.fill, [(k,) for k in range(20)]):
+      seen.append(ring.array[slot])
+      assert ring.array[slot] == k
+      slots.release(slot)
+  assert seen == list(range(20))
+  assert slots.n_free == 3
+  # never more in flight than there are slots
+  assert ring.max_running <= 3
+
+def test_imap_ordered_max_running():
+  ring = Ring(6, 10)
+  slots = SlotPool(6)
+  with ThreadPoolExecutor(6) as pool:
+    for _, slot in imap_ordered(pool, slots, ring.fill, [(k,) for k in range(10)], max_running=2):
+      slots.release(slot)
+  assert ring.max_running <= 2
+  assert slots.n_free == 6
+
+def test_imap_ordered_waits_for_held_slots():
+  # the caller keeps every slot but the last, tasks go one at a time
+  ring = Ring(2, 4)
+  slots = SlotPool(2)
+  held = []
+  with ThreadPoolExecutor(2) as pool:
+    for k, slot in imap_ordered(pool, slots, ring.fill, [(k,) for k in range(4)]):
+      assert ring.array[slot] == k
+      if held:
+        slots.release(held.pop())
+      held.append(slot)
+  slots.release(held.pop())
+  assert slots.n_free == 2
+
+def test_imap_ordered_releases_abandoned_slots():
+  ring = Ring(4, 10)
+  slots = SlotPool(4)
+  with ThreadPoolExecutor(4) as pool:
+    it = imap_ordered(pool, slots, ring.fill, [(k,) for k in range(10)])
+    _, slot = next(it)
+    slots.release(slot)
+    it.close()
+  assert slots.n_free == 4
+
+def test_imap_ordered_failure_releases_every_slot():
+  ring = Ring(4, 8)
+  slots = SlotPool(4)
+  with ThreadPoolExecutor(4) as pool:
+    with pytest.raises(OSError):
+      for _, slot in imap_ordered(pool, slots, ring.fill, [(k,) for k in (0, 1, -1, 3, 4, 5)]):
+        slots.release(slot)
+    # the callbacks of failed calls may still be running
+    pool.shutdown(wait=True)
+  assert slots.n_free == 4
+
+def test_submit_slot_releases_on_failure():
+  slots = SlotPool(1)
+  def broken(slot):
+    raise ValueError(slot)
+  with ThreadPoolExecutor(1) as pool:
+    future = submit_slot(pool, slots, broken)
+    with pytest.raises(ValueError):
+      future.result()
+    pool.shutdown(wait=True)
+  assert slots.n_free == 1
+
+def test_shared_array_attach():
+  owner = SharedArray.from_array(np.arange(6, dtype=np.float32).reshape(2, 3))
+  try:
+    view = SharedArray.attach(owner.spec())
+    view.array[1, 2] = 42
+    assert owner.array[1, 2] == 42
+    view.close()
+  finally:
+    owner.close(unlink=True)
@@ -0,0 +1,83 @@
+import json
+import threading
+import pytest
+import spans
+from spans import span, traced
+
+@pytest.fixture
+def recording():
+  spans.clear()
+  spans.enable()
+  yield
+  spans.disable()
+  spans.clear()
+
+@traced()
+def _load(n):
+  with span("decode", frame=n):
+    return n * 2
+
+def test_disabled_spans_are_free():
+  assert not spans.is_enabled()
+  spans.clear()
+  # one shared no-op context, nothing is recorded
+  assert span("a") is span("b", x=1)
+  with span("a"):
+    assert _load(3) == 6
+  assert spans.events() == []
+
+def test_spans_nest(recording):
+  with span("frame", index=7):
+    _load(1)
+    _load(2)
+  events = spans.events()
+  # events close innermost first
+  assert [e["name"] for e in events] == ["decode", "_load", "decode", "_load", "frame"]
+  decode, load, _, _, frame = events
+  assert decode["args"] == {"frame": 1, "depth": 2, "parent": "_load"}
+  assert load["args"] == {"depth": 1, "parent": "frame"}
+  assert frame["args"] == {"index": 7, "depth": 0}
+  # children lie inside their parent
+  assert frame["ts"] <= load["ts"] <= decode["ts"]
+  assert decode["ts"] + decode["dur"] <= load["ts"] + load["dur"] <= frame["ts"] + frame["dur"]
+  summary = spans.summary()
+  assert summary["_load"]["count"] == 2 and summary["frame"]["count"] == 1
+  assert summary["frame"]["total_ms"] >= summary["_load"]["max_ms"]
+
+def test_spans_per_thread(recording):
+  def work():
+    with span("worker"):
+      pass
+  with span("main"):
+    th = threading.Thread(target=work, name="loader")
+    th.start()
+    th.join()
+  worker = next(e for e in spans.events() if e["name"] == "worker")
+  # another thread's stack, not a child of main
+  assert worker["args"] == {"depth": 0}
+
+def test_span_closes_on_error(recording):
+  with pytest.raises(ValueError):
+    with span("outer"):
+      with span("inner"):
+        raise ValueError
+  with span("after"):
+    pass
+  assert spans.events()[-1]["args"] == {"depth": 0}
+
+def test_chrome_trace(recording, tmp_path):
+  with span("frame"):
+    _load(1)
+  path = str(tmp_path / "trace.json")
+  spans.export_chrome_trace(path)
+  with open(path) as f:
+    trace = json.load(f)
+  assert trace["displayTimeUnit"] == "ms"
+  meta = [e for e in trace["traceEvents"] if e["ph"] == "M"]
+  complete = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+  assert [e["name"] for e in meta] == ["thread_name"]
+  assert meta[0]["args"]["name"] == threading.current_thread().name
+  assert [e["name"] for e in complete] == ["decode", "_load", "frame"]
+  for e in complete:
+    assert {"name", "ph", "ts", "dur", "pid", "tid", "args"} <= set(e)
+    assert (e["pid"], e["tid"]) == (meta[0]["pid"], meta[0]["tid"])
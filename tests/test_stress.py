@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from ansys.mapdl.reader import _binary_reader
+from stress import PRINCIPAL_COMPONENTS, PrincipalStressEngine
+
+@pytest.mark.parametrize("ncol", [6, 3])
+def test_principal_stress_engine_matches_mapdl(ncol):
+  rng = np.random.default_rng(2)
+  stress = rng.normal(scale=100, size=(1000, 6))
+  stress[:, 3:] *= ncol == 6
+  stress[5] = np.nan
+  ref, isnan = _binary_reader.compute_principal_stress(np.ascontiguousarray(stress))
+  ref[isnan] = 0
+  scale = np.abs(ref).max()
+  for i, component in enumerate(PRINCIPAL_COMPONENTS):
+    out64 = PrincipalStressEngine(component, np.float64, workers=1).compute(stress[:, :ncol])
+    assert np.allclose(out64, ref[:, i], rtol=0, atol=1e-9 * scale), component
+    out32 = PrincipalStressEngine(component, np.float32, workers=1).compute(stress[:, :ncol])
+    assert out32.dtype == np.float32
+    assert np.allclose(out32, ref[:, i], rtol=0, atol=1e-4 * scale), component
+    # NaN rows come out as 0, like treat_nan_as_zero
+    assert out64[5] == 0
+
+def test_principal_stress_engine_chunks_on_threads():
+  stress = np.random.default_rng(3).normal(size=(10000, 6))
+  serial = PrincipalStressEngine("S1", chunk_size=1 << 20, workers=1).compute(stress)
+  with PrincipalStressEngine("S1", chunk_size=1000, workers=4) as engine:
+    assert np.array_equal(engine.compute(stress), serial)
+
+def test_principal_stress_engine_validates():
+  with pytest.raises(ValueError):
+    PrincipalStressEngine("S4")
+  engine = PrincipalStressEngine()
+  with pytest.raises(ValueError):
+    engine.compute(np.zeros((3, 4)))
+  with pytest.raises(ValueError):
+    engine.compute(np.zeros((3, 6)), out=np.zeros(3, dtype=np.float32))
@@ -0,0 +1,95 @@
+import numpy as np
+import pyvista as pv
+from vtk.util import numpy_support
+from fluent_io import FluentData, NamedArray, ScatterPlan, Section
+from time_series import CellDataBinding, Frame, FrameInfo, SurfaceBinding
+
+def _grid():
+  # 3 x 3 x 3 hexahedra, all but the center one have faces on the surface (54)
+  return pv.ImageData(dimensions=(4, 4, 4)).cast_to_unstructured_grid()
+
+def _frame(n_cells, k):
+  p = np.arange(n_cells, dtype=np.float64) + 100 * k
+  u = np.stack([p, -p, 2 * p], axis=1)
+  half = n_cells // 2
+  dat = FluentData(phase_count=1, cell_data={
+    # two zones, written out of id order
+    "SV_P": NamedArray("SV_P", 1, [Section(half + 1, n_cells, p[half:]), Section(1, half, p[:half])]),
+    "SV_U": NamedArray("SV_U", 3, [Section(half + 1, n_cells, u[half:]), Section(1, half, u[:half])]),
+  })
+  return Frame(FrameInfo("case.cas.h5", f"FFF-{k}.dat.h5", k), None, dat), p, u
+
+def _plan(n_cells):
+  frame, _, _ = _frame(n_cells, 0)
+  return ScatterPlan.from_frame(frame.dat, n_cells)
+
+def test_cell_data_binding_prepares_in_the_vtk_dtype():
+  grid = _grid()
+  binding = CellDataBinding(grid, _plan(grid.n_cells))
+  frame, p, u = _frame(grid.n_cells, 1)
+  binding.prepare(frame)
+  for name, expected in (("SV_P", p), ("SV_U", u)):
+    array = frame.cell_arrays[name]
+    assert array.dtype == np.float32 and array.flags.c_contiguous
+    assert np.array_equal(array, expected.astype(np.float32))
+    # the vtk array wraps the frame buffer, no copy
+    assert np.shares_memory(numpy_support.vtk_to_numpy(frame.vtk_arrays[name]), array)
+    assert frame.vtk_arrays[name].GetName() == name
+  assert frame.nbytes == sum(a.nbytes for a in frame.cell_arrays.values())
+
+def test_cell_data_binding_swaps_arrays():
+  grid = _grid()
+  binding = CellDataBinding(grid, _plan(grid.n_cells))
+  frames = [_frame(grid.n_cells, k)[0] for k in range(2)]
+  for frame in frames:
+    binding.prepare(frame)
+  for frame in frames + frames:
+    binding.bind_frame(frame)
+    for name in ("SV_P", "SV_U"):
+      # showing a frame points the dataset at its arrays
+      assert grid.GetCellData().GetArray(name) is frame.vtk_arrays[name]
+      assert binding.view(name) is frame.cell_arrays[name]
+  assert grid.GetCellData().GetNumberOfArrays() == 2
+
+def test_cell_data_binding_bind_array_in_place():
+  grid = _grid()
+  binding = CellDataBinding(grid, _plan(grid.n_cells))
+  speed = np.zeros(grid.n_cells, dtype=np.float32)
+  binding.bind_array("Speed", speed, scalars=True)
+  vtk_array = grid.GetCellData().GetArray("Speed")
+  assert grid.GetCellData().GetScalars() is vtk_array
+  mtime = vtk_array.GetMTime()
+  # rewritten in place: same vtk array, marked modified
+  speed[:] = 3.0
+  binding.bind_array("Speed", speed)
+  assert grid.GetCellData().GetArray("Speed") is vtk_array
+  assert vtk_array.GetMTime() > mtime
+  assert (numpy_support.vtk_to_numpy(vtk_array) == 3.0).all()
+  # a different buffer gets its own vtk array
+  binding.bind_array("Speed", np.ones(grid.n_cells, dtype=np.float32))
+  assert grid.GetCellData().GetArray("Speed") is not vtk_array
+
+def test_surface_binding_gathers_surface_cells():
+  grid = _grid()
+  binding = SurfaceBinding(grid, _plan(grid.n_cells))
+  surface = binding.dataset
+  assert surface.GetNumberOfCells() == len(binding.cell_ids) == 54
+  # the original ids are kept by the binding, not left on the polydata
+  assert surface.GetCellData().GetNumberOfArrays() == 0
+  centers = grid.cell_centers().points
+  on_boundary = ((centers < 1) | (centers > 2)).any(axis=1)
+  assert set(binding.cell_ids) == set(np.flatnonzero(on_boundary))
+  frames = [_frame(grid.n_cells, k)[0] for k in range(2)]
+  for frame in frames:
+    binding.prepare(frame)
+  binding.bind_frame(frames[0])
+  arrays = {name: surface.GetCellData().GetArray(name) for name in ("SV_P", "SV_U")}
+  mtimes = {name: a.GetMTime() for name, a in arrays.items()}
+  for frame in frames[1:]:
+    binding.bind_frame(frame)
+    for name, array in frame.cell_arrays.items():
+      vtk_array = surface.GetCellData().GetArray(name)
+      # one buffer per field, refilled and marked modified
+      assert vtk_array is arrays[name] and vtk_array.GetMTime() > mtimes[name]
+      assert np.array_equal(numpy_support.vtk_to_numpy(vtk_array), array[binding.cell_ids])
+  assert binding.view("SV_U").shape == (54, 3)